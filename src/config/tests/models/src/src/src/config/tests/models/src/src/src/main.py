@@ -9,7 +9,9 @@ from pathlib import Path
 from typing import Optional
 
 from src.config import config
+from src.file_handler import natural_sort_key
 from src.image_processor import ImageProcessor
+from src.job_manifest import JobManifest, source_signature
 from src.logger import get_logger
 from src.translator import MangaTranslator
 
@@ -130,28 +132,56 @@ class MangaTranslatorApp:
             results = []
             
             if input_path.is_file():
-                # معالجة ملف واحد
-                result = self.process_image(input_path)
-                results.append(result)
+                image_files = [input_path]
             else:
-                # معالجة مجلد كامل
+                # معالجة مجلد كامل بالترتيب الطبيعي للصفحات
                 image_extensions = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp"}
-                image_files = [
-                    f for f in input_path.iterdir()
-                    if f.is_file() and f.suffix.lower() in image_extensions
-                ]
+                image_files = sorted(
+                    (f for f in input_path.iterdir()
+                     if f.is_file() and f.suffix.lower() in image_extensions),
+                    key=lambda f: natural_sort_key(f.name)
+                )
                 
                 logger.info(f"وجدت {len(image_files)} صورة")
-                
+            
+            # سجل المهمة في مجلد المخرج: كل صفحة مكتملة تُسجل فوراً، وإعادة
+            # التشغيل بعد أي توقف تستخدم النتائج المسجلة بدلاً من إعادة المعالجة.
+            # اللغات والنموذج جزء من وصف المهمة، فتغييرها يبدأ سجلاً جديداً
+            manifest = JobManifest(output_path / JobManifest.FILE_NAME, {
+                "input": str(input_path.resolve()),
+                "params": {
+                    "source_language": self.config.SOURCE_LANGUAGE,
+                    "target_language": self.config.TARGET_LANGUAGE,
+                    "model": self.config.MODEL_NAME,
+                },
+            })
+            resumed = 0
+            
+            try:
                 for image_file in image_files:
+                    source = source_signature(image_file)
+                    if manifest.is_done(image_file.name, source):
+                        results.append(manifest.result(image_file.name))
+                        resumed += 1
+                        continue
+                    
                     result = self.process_image(image_file)
                     results.append(result)
+                    
+                    if isinstance(result, dict) and result.get("status") == "error":
+                        manifest.mark_failed(image_file.name, result.get("message", ""))
+                    else:
+                        manifest.mark_done(image_file.name, source=source, result=result)
+            finally:
+                manifest.close()
             
-            logger.info(f"انتهت المعالجة. تم معالجة {len(results)} صورة")
+            logger.info(f"انتهت المعالجة. تم معالجة {len(results)} صورة "
+                        f"({resumed} من تشغيل سابق)")
             
             return {
                 "status": "success",
                 "total_images": len(results),
+                "resumed_images": resumed,
                 "results": results,
                 "output_path": str(output_path)
             }
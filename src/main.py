@@ -3,18 +3,47 @@
 Main script for Manga AI Translator
 """
 
+import argparse
 import os
 import sys
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional
 import logging
 
+import cv2
+import numpy as np
+
 # استيراد ملف الإعدادات
 from config.config import (
     BASE_DIR, OUTPUT_DIR, DATA_DIR,
     SUPPORTED_IMAGE_FORMATS, SUPPORTED_ARCHIVE_FORMATS,
+    SOURCE_LANGUAGE, TARGET_LANGUAGE, TRANSLATION_MODEL,
+    DETECTOR_BACKEND, DETECTOR_OPTIONS, WORKING_MAX_SIDE, ARABIC_FONT_PATH,
+    ERASE_SOURCE_TEXT, INPAINT_RADIUS, SAVE_LAYERS, LAYERS_DIR, JPEG_QUALITY,
+    PDF_DPI, NUM_WORKERS,
+    PAGE_INDEX_FILE, PAGE_HASH_MAX_DISTANCE, PAGE_CROP_TOLERANCE, DIRECTORY_INDEX_FILE,
+    WATCH_LEDGER_FILE, WATCH_SETTLE_SECONDS, WATCH_POLL_INTERVAL, JOBS_DIR,
+    USE_ARTIFACT_CACHE, ARTIFACT_CACHE_DIR, ARTIFACT_CACHE_MAX_BYTES,
+    PASSTHROUGH_TEXTLESS_PAGES, PASSTHROUGH_LINK_MODE,
     LOG_LEVEL, LOG_FILE
 )
+from src.image_processor import ImageProcessor
+from src.text_extractor import TextExtractor
+from src.translator import AITranslator
+from src.text_renderer import TextRenderer
+from src.text_eraser import TextEraser
+from src.layer_store import LayerStore
+from src.archive_stream import ArchiveReader, ArchiveWriter
+from src.pdf_source import PdfPageSource
+from src.pdf_writer import StreamingPdfWriter
+from src.file_handler import FileHandler, natural_sort_key
+from src.page_index import PageIndex
+from src.dir_index import DirectoryIndex
+from src.folder_watcher import FolderWatcher
+from src.job_manifest import JobManifest, source_signature
+from src.artifact_cache import ArtifactCache, content_key, data_key
+from src.crop_arena import CropArena
+from src.data_model import Page
 
 # إعداد نظام التسجيل (Logging)
 logging.basicConfig(
@@ -40,6 +69,39 @@ class MangaTranslator:
         self.output_dir = OUTPUT_DIR
         self.data_dir = DATA_DIR
         
+        # مكونات خط المعالجة
+        self.image_processor = ImageProcessor(DETECTOR_BACKEND,
+                                              DETECTOR_OPTIONS.get(DETECTOR_BACKEND))
+        self.image_processor.working_max_side = WORKING_MAX_SIDE
+        self.text_extractor = TextExtractor()
+        self.ai_translator = AITranslator(SOURCE_LANGUAGE, TARGET_LANGUAGE)
+        self.text_renderer = TextRenderer(ARABIC_FONT_PATH,
+                                          rtl=TARGET_LANGUAGE in ('ar', 'fa', 'he', 'ur'))
+        self.text_eraser = TextEraser(INPAINT_RADIUS)
+        
+        # مخزن قصاصات الفقاعات المعاد استخدامه بين الصفحات
+        self.crop_arena = CropArena()
+        
+        # فهرس الصفحات المعالجة لإعادة استخدام النتائج
+        self.page_index = PageIndex(str(PAGE_INDEX_FILE), PAGE_HASH_MAX_DISTANCE,
+                                    PAGE_CROP_TOLERANCE)
+        
+        # طبقات المخرجات لإعادة الرسم الجزئي بعد التعديل
+        self.layer_store = LayerStore(LAYERS_DIR, self.text_renderer, self.image_processor)
+        
+        # فهرس المجلدات: إعادة الفحص تسرد المجلدات المتغيرة فقط
+        self.dir_index = DirectoryIndex(DIRECTORY_INDEX_FILE)
+        
+        # ذاكرة مخرجات المراحل: إعادة المعالجة تعيد فقط المراحل التي تغيرت إعداداتها
+        self.artifact_cache = (ArtifactCache(ARTIFACT_CACHE_DIR, ARTIFACT_CACHE_MAX_BYTES)
+                               if USE_ARTIFACT_CACHE else None)
+        
+        # إخراج الصفحات بدون نص بالربط أو الاستنساخ بدلاً من إعادة الترميز
+        self.file_handler = FileHandler()
+        
+        # آخر صفحة تمت ترجمتها (لمعرفة هل احتوت على نص)
+        self.last_page: Optional[Page] = None
+        
     def process_image(self, image_path: str) -> bool:
         """
         معالجة صورة واحدة
@@ -53,12 +115,266 @@ class MangaTranslator:
         """
         try:
             logger.info(f"معالجة الصورة: {image_path}")
-            # سيتم إضافة الكود الفعلي لاحقاً
-            return True
+            
+            source = Path(image_path)
+            name = source.name
+            output_path = self.output_dir / name
+            
+            # الصفحة المعروفة بأنها بدون نص تُخرج دون فك ترميزها
+            data = source.read_bytes()
+            textless_key = self._textless_key(data)
+            if self._is_textless(textless_key):
+                return self._passthrough_file(source, output_path)
+            
+            image = self.image_processor.decode_image(data, name)
+            if image is None:
+                return False
+            
+            # اسم الصفحة مسبوق بمجلدها حتى لا تتصادم طبقات 001.jpg من فصلين
+            result = self.translate_page_image(image, f"{source.parent.name}/{name}",
+                                               output_path)
+            if result is None:
+                return False
+            
+            if PASSTHROUGH_TEXTLESS_PAGES and not self.last_page.bubbles:
+                self._mark_textless(textless_key)
+                return self._passthrough_file(source, output_path)
+            
+            return self.image_processor.save_image(result, str(output_path))
+            
         except Exception as e:
             logger.error(f"خطأ في معالجة الصورة: {str(e)}")
             return False
     
+    def _textless_key(self, data: bytes) -> Optional[str]:
+        """
+        مفتاح ذاكرة "صفحة بدون نص" لبايتات الملف
+        Cache key recording that a file's page has no text under the current
+        detection and OCR settings
+        
+        Returns:
+            المفتاح أو None إذا تعذر الاعتماد على النتيجة (مثلاً OCR غير محمل)
+        """
+        if (not PASSTHROUGH_TEXTLESS_PAGES or self.artifact_cache is None
+                or self.text_extractor.ocr is None):
+            return None
+        
+        fingerprint = {
+            'detect': self.image_processor.cache_fingerprint(),
+            'ocr': self.text_extractor.cache_fingerprint(),
+            'preprocess': self.image_processor.preprocess_fingerprint(),
+        }
+        return ArtifactCache.stage_key('textless', data_key(data), fingerprint)
+    
+    def _is_textless(self, key: Optional[str]) -> bool:
+        """هل سُجلت الصفحة سابقاً كصفحة بدون نص؟"""
+        return key is not None and self.artifact_cache.get(key, 'textless') is not None
+    
+    def _mark_textless(self, key: Optional[str]):
+        """تسجيل الصفحة كصفحة بدون نص"""
+        if key is not None:
+            self.artifact_cache.put(key, 'textless', True)
+    
+    def _passthrough_file(self, source: Path, output_path: Path) -> bool:
+        """إخراج الملف الأصلي كما هو (reflink أو ربط صلب أو نسخ)"""
+        return self.file_handler.link_file(str(source), str(output_path),
+                                           PASSTHROUGH_LINK_MODE) is not None
+    
+    def process_page(self, image: np.ndarray, name: str, output_path: Path) -> bool:
+        """
+        معالجة صفحة محملة في الذاكرة وحفظها
+        Run the pipeline on an already decoded page and save it
+        
+        Args:
+            image: الصفحة (من ملف أو من أرشيف)
+            name: اسم الصفحة
+            output_path: مسار حفظ المخرج
+            
+        Returns:
+            True إذا نجحت المعالجة
+        """
+        image = self.translate_page_image(image, name, output_path)
+        if image is None:
+            return False
+        return self.image_processor.save_image(image, str(output_path))
+    
+    def translate_page_image(self, image: np.ndarray, name: str, output_path: Optional[Path],
+                             container: Optional[Path] = None) -> Optional[np.ndarray]:
+        """
+        ترجمة صفحة وإرجاع الصورة النهائية دون حفظها
+        Translate a page and return the rendered image without saving it
+        
+        Args:
+            image: الصفحة
+            name: اسم الصفحة
+            output_path: مسار المخرج (يُسجل مع الطبقات لإعادة الرسم) - None لصفحات
+                الأرشيف أو PDF
+            container: الأرشيف أو ملف PDF الناتج الذي تُكتب فيه الصفحة - اختياري
+            
+        Returns:
+            الصورة المترجمة أو None
+        """
+        try:
+            page = Page.from_image(name, image, self.image_processor.last_image_hash)
+            self.last_page = page
+            key = content_key(image) if self.artifact_cache is not None else None
+            
+            # إعادة استخدام نتائج صفحة مطابقة معالجة سابقاً بعد التحقق من بكسلاتها
+            cached = self.page_index.find(page.page_hash, page.size, image)
+            
+            if cached is not None:
+                logger.info(f"إعادة استخدام نتائج صفحة مكررة: {name}")
+                page.bubbles = Page.from_dict(cached).bubbles
+                results_key = (ArtifactCache.stage_key('indexed', key, page.to_dict())
+                               if key is not None else None)
+            else:
+                results_key = self._analyze_page(image, page, key)
+                
+                # لا يتم تخزين النتائج إذا لم تكن النماذج محملة
+                if self.text_extractor.ocr is not None and self.ai_translator.model is not None:
+                    self.page_index.add(page.page_hash, page.to_dict(), image)
+            
+            # صفحة بدون نص: لا مسح ولا رسم ولا طبقات
+            if not page.bubbles:
+                return image
+            
+            # الصفحة المرسومة تُخزن بمفتاح النتائج وإعدادات الخط والمسح؛ مع حفظ
+            # الطبقات تبقى الطبقات هي مصدر إعادة الرسم فلا تُستخدم الذاكرة
+            render_key = None
+            if results_key is not None and not SAVE_LAYERS:
+                render_key = ArtifactCache.stage_key('render', results_key,
+                                                     self._render_fingerprint())
+                rendered = self.artifact_cache.get(render_key, 'render')
+                if rendered is not None:
+                    return cv2.imdecode(np.frombuffer(rendered, np.uint8), cv2.IMREAD_UNCHANGED)
+            
+            # مسح النص الأصلي داخل الفقاعات فقط ثم رسم الترجمة
+            if ERASE_SOURCE_TEXT:
+                image = self.text_eraser.erase_page(image, page)
+            
+            if SAVE_LAYERS:
+                return self.layer_store.save_page(page, image, output_path, container)
+            
+            image = self.text_renderer.render_page(image, page)
+            if render_key is not None:
+                encoded = self.image_processor.encode_image(image, '.png')
+                if encoded is not None:
+                    self.artifact_cache.put(render_key, 'render', encoded)
+            return image
+            
+        except Exception as e:
+            logger.error(f"خطأ في معالجة الصفحة: {str(e)}")
+            return None
+    
+    def _analyze_page(self, image: np.ndarray, page: Page,
+                      key: Optional[str] = None) -> Optional[str]:
+        """
+        كشف الفقاعات واستخراج نصوصها وترجمتها
+        Detect bubbles, extract their text and translate it
+        
+        الكشف و OCR يتمان على صورة العمل المصغرة، ثم تُعاد الإحداثيات
+        إلى الصفحة الأصلية ليتم الرسم بالدقة الكاملة. مخرج كل مرحلة يُخزن بمفتاح
+        مدخلها وإعداداتها، لذا تغيير نموذج الترجمة يعيد الترجمة فقط
+        Detection and OCR run on the working-resolution image; coordinates are
+        mapped back so rendering happens at full quality. Each stage output is cached
+        under its input key and settings, so a new translation model re-runs
+        translation only.
+        
+        Args:
+            image: صورة الصفحة بدقتها الأصلية
+            page: الصفحة المراد تعبئة فقاعاتها
+            key: مفتاح محتوى الصفحة - اختياري (بدونه لا تُستخدم الذاكرة)
+            
+        Returns:
+            مفتاح مرحلة الترجمة أو None إذا لم تُخزن النتائج
+        """
+        working, transform = self.image_processor.normalize_resolution(image)
+        
+        def detect():
+            return self.image_processor.detect_bubbles(working)
+        
+        def extract():
+            corrected = self.image_processor.correct_distortion(working, page.bubbles)
+            self.text_extractor.extract_page_text(page, corrected, self.crop_arena)
+            return page.bubbles
+        
+        def translate():
+            self.ai_translator.translate_page(page)
+            return page.bubbles
+        
+        key, page.bubbles = self._cached_stage(
+            'detect', key, self.image_processor.cache_fingerprint(), detect)
+        
+        ocr_fingerprint = dict(self.text_extractor.cache_fingerprint(),
+                               preprocess=self.image_processor.preprocess_fingerprint())
+        key, page.bubbles = self._cached_stage(
+            'ocr', key, ocr_fingerprint, extract, store=self.text_extractor.ocr is not None)
+        
+        key, page.bubbles = self._cached_stage(
+            'translate', key, self.ai_translator.cache_fingerprint(), translate,
+            store=self.ai_translator.model is not None)
+        
+        # الاحتفاظ بالفقاعات التي تحتوي على نص فقط
+        page.bubbles = page.text_bubbles()
+        page.map_to_original(transform)
+        return key
+    
+    def _cached_stage(self, stage: str, parent_key: Optional[str], fingerprint: Dict,
+                      compute, store: bool = True):
+        """
+        تنفيذ مرحلة أو قراءة مخرجها من الذاكرة
+        Run a stage, or load its output cached under (parent key, fingerprint)
+        
+        Args:
+            stage: اسم المرحلة
+            parent_key: مفتاح المرحلة السابقة (None لتعطيل الذاكرة)
+            fingerprint: إعدادات المرحلة
+            compute: دالة تنفيذ المرحلة
+            store: تخزين المخرج (False إذا لم يكن النموذج محملاً)
+            
+        Returns:
+            (مفتاح المرحلة أو None، المخرج)
+        """
+        if self.artifact_cache is None or parent_key is None:
+            return None, compute()
+        
+        key = ArtifactCache.stage_key(stage, parent_key, fingerprint)
+        value = self.artifact_cache.get(key, stage)
+        if value is not None:
+            return key, value
+        
+        value = compute()
+        if not store:
+            # مخرج غير صالح للتخزين: المراحل التالية لا تُخزن أيضاً
+            return None, value
+        
+        self.artifact_cache.put(key, stage, value)
+        return key, value
+    
+    def _render_fingerprint(self) -> Dict:
+        """إعدادات الرسم والمسح التي تحدد الصفحة النهائية"""
+        return {
+            'renderer': self.text_renderer.cache_fingerprint(),
+            'eraser': self.text_eraser.cache_fingerprint() if ERASE_SOURCE_TEXT else None,
+        }
+    
+    def rerender_page(self, page_name: str, edits: Dict[int, str]) -> bool:
+        """
+        إعادة رسم فقاعات معدلة من الطبقات المحفوظة
+        Re-render edited bubbles from the saved layers
+        
+        لا يُعاد الكشف أو OCR أو الترجمة؛ تُرسم الفقاعات المعدلة فقط
+        Detection, OCR and translation are not re-run; only edited bubbles are redrawn.
+        
+        Args:
+            page_name: اسم الصفحة
+            edits: الترجمات الجديدة حسب ترتيب الفقاعة
+            
+        Returns:
+            True إذا نجحت إعادة الرسم
+        """
+        return self.layer_store.update_translations(page_name, edits)
+    
     def process_folder(self, folder_path: str) -> int:
         """
         معالجة مجلد كامل من الصور
@@ -79,18 +395,40 @@ class MangaTranslator:
                 return 0
             
             success_count = 0
-            image_files = []
             
-            # البحث عن جميع صور المجلد
-            for ext in SUPPORTED_IMAGE_FORMATS:
-                image_files.extend(folder.glob(f"*{ext}"))
+            # البحث عن جميع صور المجلد بالترتيب الطبيعي (دون تمييز حالة الامتداد)
+            image_files = self.dir_index.scan(folder, SUPPORTED_IMAGE_FORMATS, recursive=False)
             
             logger.info(f"وجدت {len(image_files)} صورة للمعالجة")
             
-            for image_file in image_files:
-                if self.process_image(str(image_file)):
-                    success_count += 1
+            # سجل المهمة: إعادة تشغيل نفس المهمة تتخطى الصفحات المكتملة
+            # كل إعداد يغير الصفحة الناتجة جزء من هوية المهمة حتى لا تُتخطى صفحات قديمة
+            manifest = JobManifest.for_job(JOBS_DIR, folder, self.output_dir,
+                                           source=SOURCE_LANGUAGE, target=TARGET_LANGUAGE,
+                                           model=TRANSLATION_MODEL,
+                                           detect=self.image_processor.cache_fingerprint(),
+                                           ocr=self.text_extractor.cache_fingerprint(),
+                                           preprocess=self.image_processor.preprocess_fingerprint(),
+                                           render=self._render_fingerprint(),
+                                           erase=ERASE_SOURCE_TEXT, layers=SAVE_LAYERS)
+            
+            try:
+                for image_file in image_files:
+                    source = source_signature(image_file)
+                    if manifest.is_done(image_file.name, source):
+                        success_count += 1
+                        continue
+                    
+                    if self.process_image(str(image_file)):
+                        manifest.mark_done(image_file.name, self.output_dir / image_file.name,
+                                           source)
+                        success_count += 1
+                    else:
+                        manifest.mark_failed(image_file.name)
+            finally:
+                manifest.close()
             
+            logger.info(f"حالة المهمة: {manifest.summary()}")
             return success_count
             
         except Exception as e:
@@ -110,26 +448,202 @@ class MangaTranslator:
         """
         try:
             logger.info(f"معالجة الملف المضغوط: {archive_path}")
-            # سيتم إضافة الكود الفعلي لاحقاً
-            return 0
+            
+            # الصفحات تُقرأ وتُفك في الذاكرة واحدة تلو الأخرى دون استخراج الأرشيف،
+            # وكل صفحة مكتملة تُضاف مباشرة إلى الأرشيف الناتج
+            archive_path = Path(archive_path)
+            suffix = archive_path.suffix.lower()
+            output_archive = self.output_dir / (archive_path.stem +
+                                                ('.cbz' if suffix in ('.rar', '.cbr') else suffix))
+            success_count = 0
+            
+            with ArchiveReader(archive_path, SUPPORTED_IMAGE_FORMATS) as reader, \
+                    ArchiveWriter(output_archive) as writer:
+                logger.info(f"وجدت {len(reader)} صفحة في الأرشيف")
+                
+                for name, data in reader:
+                    # الصفحات بدون نص تُضاف ببايتاتها الأصلية دون إعادة ترميز
+                    textless_key = self._textless_key(data)
+                    if self._is_textless(textless_key):
+                        writer.add(name, data)
+                        success_count += 1
+                        continue
+                    
+                    image = self.image_processor.decode_image(data, name)
+                    if image is None:
+                        continue
+                    
+                    page_name = f"{archive_path.stem}/{name}"
+                    image = self.translate_page_image(image, page_name, None, output_archive)
+                    if image is None:
+                        continue
+                    
+                    if PASSTHROUGH_TEXTLESS_PAGES and not self.last_page.bubbles:
+                        self._mark_textless(textless_key)
+                        writer.add(name, data)
+                        success_count += 1
+                        continue
+                    
+                    encoded = self.image_processor.encode_image(image, Path(name).suffix,
+                                                                JPEG_QUALITY)
+                    if encoded is not None:
+                        writer.add(name, encoded)
+                        success_count += 1
+            
+            return success_count
         except Exception as e:
             logger.error(f"خطأ في معالجة الملف المضغوط: {str(e)}")
             return 0
     
-    def export_results(self, format: str = 'png') -> bool:
+    def process_pdf(self, pdf_path: str, pages: Optional[str] = None) -> int:
+        """
+        معالجة ملف PDF
+        Process a PDF document page by page
+        
+        الصفحات تُرسم مسبقاً في عمليات متوازية وتدخل خط المعالجة فور جاهزيتها،
+        والصفحات المكونة من صورة مضمنة واحدة تُستخرج دون رسم
+        Pages are rasterized ahead in worker processes and enter the pipeline as soon
+        as they are ready; single-image pages are extracted without rasterizing.
+        
+        Args:
+            pdf_path: مسار ملف PDF
+            pages: نطاق الصفحات (مثل "1-5,8") - افتراضياً الكل
+            
+        Returns:
+            عدد الصفحات المعالجة بنجاح
+        """
+        try:
+            logger.info(f"معالجة ملف PDF: {pdf_path}")
+            
+            source = PdfPageSource(pdf_path, PDF_DPI, pages, workers=NUM_WORKERS)
+            logger.info(f"سيتم معالجة {len(source)} صفحة")
+            
+            # كل صفحة مكتملة تُضاف مباشرة إلى ملف PDF الناتج
+            output_pdf = self.output_dir / f"{Path(pdf_path).stem}.pdf"
+            success_count = 0
+            
+            with StreamingPdfWriter(output_pdf, PDF_DPI) as writer:
+                for pdf_page in source:
+                    if pdf_page.is_embedded:
+                        image = self.image_processor.decode_image(pdf_page.data, pdf_page.name)
+                    else:
+                        image = self.image_processor.prepare_image(pdf_page.image)
+                    if image is None:
+                        continue
+                    
+                    page_name = f"{Path(pdf_path).stem}/{pdf_page.name}"
+                    image = self.translate_page_image(image, page_name, None, output_pdf)
+                    if image is None:
+                        continue
+                    
+                    # صفحة JPEG مضمنة بدون نص تُضمن ببايتاتها الأصلية
+                    if (PASSTHROUGH_TEXTLESS_PAGES and pdf_page.is_embedded
+                            and not self.last_page.bubbles
+                            and Path(pdf_page.name).suffix.lower() in ('.jpg', '.jpeg')):
+                        writer.add_jpeg(pdf_page.data)
+                    else:
+                        writer.add_image(image, JPEG_QUALITY)
+                    success_count += 1
+            
+            logger.info(f"صفحات PDF: {source.stats}")
+            return success_count
+            
+        except Exception as e:
+            logger.error(f"خطأ في معالجة ملف PDF: {str(e)}")
+            return 0
+    
+    def process_input(self, input_path: str) -> int:
+        """
+        معالجة مدخل حسب نوعه (مجلد، أرشيف، PDF، صورة)
+        Dispatch an input to the matching pipeline
+        
+        Args:
+            input_path: مسار المدخل
+            
+        Returns:
+            عدد الصفحات المعالجة بنجاح
+        """
+        path = Path(input_path)
+        suffix = path.suffix.lower()
+        
+        if path.is_dir():
+            return self.process_folder(str(path))
+        if suffix == '.pdf':
+            return self.process_pdf(str(path))
+        if ArchiveReader.is_supported(str(path)):
+            return self.process_archive(str(path))
+        if suffix in SUPPORTED_IMAGE_FORMATS:
+            return int(self.process_image(str(path)))
+        
+        logger.warning(f"نوع مدخل غير مدعوم: {input_path}")
+        return 0
+    
+    def watch(self, folder_path: Optional[str] = None, once: bool = False):
+        """
+        مراقبة مجلد الإدخال ومعالجة المدخلات الجديدة
+        Continuously process new chapters and archives dropped into a folder
+        
+        Args:
+            folder_path: المجلد المراقب - افتراضياً DATA_DIR
+            once: فحص واحد ثم الخروج (بدلاً من المراقبة المستمرة)
+        """
+        input_suffixes = (tuple(SUPPORTED_IMAGE_FORMATS) + ('.pdf',) +
+                          ArchiveReader.ZIP_SUFFIXES + ArchiveReader.SEVEN_ZIP_SUFFIXES +
+                          ArchiveReader.RAR_SUFFIXES)
+        
+        watcher = FolderWatcher(folder_path or DATA_DIR, self.process_input,
+                                WATCH_LEDGER_FILE, input_suffixes, SUPPORTED_IMAGE_FORMATS,
+                                settle_seconds=WATCH_SETTLE_SECONDS,
+                                poll_interval=WATCH_POLL_INTERVAL)
+        watcher.run(once=once)
+    
+    def export_results(self, format: str = 'png', output_path: Optional[str] = None) -> bool:
         """
         تصدير النتائج
         Export results
         
+        الصفحات المترجمة في مجلد الإخراج تُضاف بالترتيب الطبيعي صفحة بصفحة،
+        وملفات JPEG تُضمن في PDF كما هي دون إعادة ترميز
+        Translated pages in the output folder are streamed in natural order; JPEG
+        pages are embedded in the PDF as-is.
+        
         Args:
             format: صيغة الإخراج (png, jpg, pdf, 7z, zip)
+            output_path: مسار الملف الناتج - اختياري
             
         Returns:
             True إذا نجح التصدير
         """
         try:
             logger.info(f"تصدير النتائج بصيغة: {format}")
-            # سيتم إضافة الكود الفعلي لاحقاً
+            format = format.lower()
+            
+            # الصور محفوظة بالفعل في مجلد الإخراج
+            if format in ('png', 'jpg'):
+                return True
+            
+            pages = sorted((path for path in self.output_dir.iterdir()
+                            if path.is_file() and path.suffix.lower() in SUPPORTED_IMAGE_FORMATS),
+                           key=natural_sort_key)
+            if not pages:
+                logger.error("لا توجد صفحات للتصدير")
+                return False
+            
+            output_path = Path(output_path or self.output_dir / f"manga_translated.{format}")
+            
+            if format == 'pdf':
+                with StreamingPdfWriter(output_path) as writer:
+                    for page_path in pages:
+                        writer.add_file(page_path)
+            elif format in ('zip', '7z'):
+                with ArchiveWriter(output_path, format) as writer:
+                    for page_path in pages:
+                        writer.add_file(page_path)
+            else:
+                logger.error(f"صيغة غير مدعومة: {format}")
+                return False
+            
+            logger.info(f"تم تصدير {len(pages)} صفحة إلى: {output_path}")
             return True
         except Exception as e:
             logger.error(f"خطأ في التصدير: {str(e)}")
@@ -141,6 +655,13 @@ def main():
     الدالة الرئيسية
     Main function
     """
+    parser = argparse.ArgumentParser(description="Manga AI Translator")
+    parser.add_argument('--watch', nargs='?', const=str(DATA_DIR), metavar='DIR',
+                        help="مراقبة مجلد ومعالجة المدخلات الجديدة (افتراضياً DATA_DIR)")
+    parser.add_argument('--once', action='store_true',
+                        help="فحص مجلد المراقبة مرة واحدة ثم الخروج")
+    args = parser.parse_args()
+    
     logger.info("=" * 50)
     logger.info("تطبيق ترجمة المانجا بالذكاء الاصطناعي")
     logger.info("Manga AI Translator")
@@ -149,6 +670,10 @@ def main():
     # إنشاء كائن المترجم
     translator = MangaTranslator()
     
+    if args.watch:
+        translator.watch(args.watch, once=args.once)
+        return
+    
     # مثال على الاستخدام
     print("\n" + "="*50)
     print("تم تهيئة التطبيق بنجاح!")
@@ -0,0 +1,96 @@
+"""
+سجل JSON Lines يُضاف إليه فقط
+Append-only JSON Lines log that survives crashes
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Iterator, Union
+
+logger = logging.getLogger(__name__)
+
+
+class AppendOnlyLog:
+    """
+    فئة سجل يُضاف إليه فقط
+    Append-only JSON Lines file with one record per line
+
+    كل سجل يُكتب في سطر واحد باستدعاء write واحد ثم fsync، لذا انقطاع العملية
+    لا يفسد إلا السطر الأخير غير المكتمل، والذي يُتجاهل عند القراءة ويُغلق
+    بسطر جديد قبل أول إضافة لاحقة
+    Each record is one line written with a single write() and fsync'd, so a crash
+    can only leave a torn last line; readers skip it and the next append starts on
+    a fresh line.
+    """
+
+    def __init__(self, path: Union[str, Path], fsync: bool = True):
+        """
+        Args:
+            path: مسار الملف
+            fsync: مزامنة كل سجل مع القرص
+        """
+        self.path = Path(path)
+        self.fsync = fsync
+        self._file = None
+
+    def __enter__(self) -> "AppendOnlyLog":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _open(self):
+        """فتح الملف للإضافة وإصلاح السطر الأخير غير المكتمل"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'ab')
+
+        if self._file.tell() > 0:
+            with open(self.path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    self._file.write(b'\n')
+
+    def append(self, record: Dict):
+        """
+        إضافة سجل إلى نهاية الملف
+        Append one record durably
+
+        Args:
+            record: السجل (قابل للتحويل إلى JSON)
+        """
+        if self._file is None:
+            self._open()
+
+        # القيم غير القابلة للتحويل (مثل المسارات) تُكتب كنص
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str) + '\n'
+        self._file.write(line.encode('utf-8'))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def records(self) -> Iterator[Dict]:
+        """
+        قراءة السجلات بالترتيب مع تجاهل الأسطر التالفة
+        Yield records in order, skipping torn or corrupt lines
+        """
+        if not self.path.exists():
+            return
+
+        with open(self.path, 'rb') as f:
+            for number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line.decode('utf-8'))
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    # سطر غير مكتمل من عملية سابقة متوقفة
+                    logger.warning(f"تجاهل سطر تالف {number} في {self.path}")
+
+    def close(self):
+        """إغلاق الملف"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,379 @@
+"""
+قراءة وكتابة صفحات الأرشيفات مباشرة دون مجلدات وسيطة
+Streaming page reader and writer for zip/cbz, 7z and rar archives
+"""
+
+import logging
+import os
+import posixpath
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src.file_handler import natural_sort_key
+
+logger = logging.getLogger(__name__)
+
+
+class ArchiveReader:
+    """
+    فئة قراءة صور الأرشيف بالترتيب الطبيعي للصفحات
+    Iterates the image members of an archive in natural page order
+
+    كل صفحة تُقرأ إلى الذاكرة فقط عند الوصول إليها، فتبدأ المعالجة بعد قراءة
+    الصفحة الأولى ولا يُكتب أي شيء إلى القرص
+    Each member is read into memory only when the iterator reaches it, so the first
+    page is available immediately and nothing is written to disk.
+
+    مثال / Example:
+        with ArchiveReader('chapter.cbz') as reader:
+            for name, data in reader:
+                image = image_processor.decode_image(data)
+    """
+
+    ZIP_SUFFIXES = ('.zip', '.cbz')
+    SEVEN_ZIP_SUFFIXES = ('.7z', '.cb7')
+    RAR_SUFFIXES = ('.rar', '.cbr')
+
+    def __init__(self, archive_path: str,
+                 extensions: Sequence[str] = ('.png', '.jpg', '.jpeg', '.webp')):
+        """
+        Args:
+            archive_path: مسار الأرشيف
+            extensions: صيغ الصور المقبولة
+        """
+        self.archive_path = Path(archive_path)
+        self.extensions = tuple(ext.lower() for ext in extensions)
+        self.kind = self._detect_kind(self.archive_path)
+        self._archive = None
+        self._members: Optional[List[str]] = None
+        # الاسم الآمن ← الاسم الأصلي داخل الأرشيف
+        self._raw_names: Dict[str, str] = {}
+
+    @classmethod
+    def _detect_kind(cls, path: Path) -> Optional[str]:
+        suffix = path.suffix.lower()
+        if suffix in cls.ZIP_SUFFIXES:
+            return 'zip'
+        if suffix in cls.SEVEN_ZIP_SUFFIXES:
+            return '7z'
+        if suffix in cls.RAR_SUFFIXES:
+            return 'rar'
+        return None
+
+    @classmethod
+    def is_supported(cls, path: str) -> bool:
+        """هل صيغة الأرشيف مدعومة؟"""
+        return cls._detect_kind(Path(path)) is not None
+
+    @staticmethod
+    def safe_name(member_name: str) -> Optional[str]:
+        """
+        اسم العضو بعد التطبيع أو None إذا كان يخرج عن جذر الأرشيف
+        Normalized member name, or None if it is absolute or escapes the root
+        """
+        name = member_name.replace('\\', '/')
+        if name.startswith('/') or re.match(r'^[A-Za-z]:', name):
+            return None
+
+        name = posixpath.normpath(name)
+        if name in ('.', '..') or name.startswith('../'):
+            return None
+        return name
+
+    def __enter__(self) -> "ArchiveReader":
+        self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def open(self):
+        """فتح الأرشيف (قراءة الفهرس فقط)"""
+        if self._archive is not None:
+            return
+
+        if self.kind == 'zip':
+            import zipfile
+            self._archive = zipfile.ZipFile(self.archive_path, 'r')
+        elif self.kind == '7z':
+            import py7zr
+            self._archive = py7zr.SevenZipFile(self.archive_path, 'r')
+        elif self.kind == 'rar':
+            import rarfile
+            self._archive = rarfile.RarFile(self.archive_path, 'r')
+        else:
+            raise ValueError(f"نوع الأرشيف غير مدعوم: {self.archive_path.suffix}")
+
+    def close(self):
+        """إغلاق الأرشيف"""
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+
+    def members(self) -> List[str]:
+        """
+        أسماء صور الأرشيف بالترتيب الطبيعي
+        Image member names in natural page order (page2 before page10)
+
+        الأسماء مطبعة، والأعضاء ذات المسارات المطلقة أو التي تحتوي على ..
+        تُتجاهل حتى لا يكتب المخرج خارج مجلده
+        Names are normalized; absolute members and members that climb out with ..
+        are skipped so page names can never point outside the output.
+        """
+        if self._members is None:
+            self.open()
+
+            if self.kind == '7z':
+                names = [entry.filename for entry in self._archive.list() if not entry.is_directory]
+            elif self.kind == 'zip':
+                names = [info.filename for info in self._archive.infolist() if not info.is_dir()]
+            else:
+                names = [info.filename for info in self._archive.infolist() if not info.isdir()]
+
+            # تجاهل ملفات النظام المخفية مثل __MACOSX و ._page.jpg
+            names = [name for name in names
+                     if Path(name).suffix.lower() in self.extensions
+                     and not any(part.startswith(('.', '__MACOSX'))
+                                 for part in Path(name).parts)]
+
+            self._raw_names = {}
+            for raw in names:
+                name = self.safe_name(raw)
+                if name is None:
+                    logger.error(f"مسار غير آمن داخل الأرشيف: {raw}")
+                    continue
+                self._raw_names.setdefault(name, raw)
+
+            self._members = sorted(self._raw_names, key=natural_sort_key)
+
+        return self._members
+
+    def __len__(self) -> int:
+        return len(self.members())
+
+    def __iter__(self) -> Iterator[Tuple[str, bytes]]:
+        """
+        المرور على الصفحات كـ (الاسم، البايتات)
+        Yield (member name, raw bytes) pairs lazily
+        """
+        members = self.members()
+
+        if self.kind == '7z':
+            yield from self._iter_7z(members)
+            return
+
+        for name in members:
+            yield name, self._archive.read(self._raw_names[name])
+
+    def _iter_7z(self, members: List[str]) -> Iterator[Tuple[str, bytes]]:
+        """
+        قراءة أرشيف 7z كتلة مضغوطة واحدة في كل مرة
+        Read a 7z archive one solid block at a time
+
+        فك ضغط أي عضو في كتلة صلبة يتطلب فك كل ما قبله في الكتلة، لذا تُقرأ
+        صفحات الكتلة كلها في تمرير واحد عند الوصول إلى أول صفحة منها، فيُفك
+        كل كتلة مرة واحدة فقط والذاكرة محدودة بصفحات كتلة واحدة
+        Decoding any member of a solid block decodes everything before it in the
+        block, so all wanted pages of a block are read in one pass when the iterator
+        first reaches it: each block is decoded once and memory is bounded by one
+        block's pages.
+        """
+        wanted = {self._raw_names[name]: name for name in members}
+        blocks: Dict[int, List[str]] = {}
+        block_of: Dict[str, int] = {}
+        for entry in self._archive.files:
+            if entry.filename in wanted:
+                block = id(entry.folder) if entry.folder is not None else -1
+                blocks.setdefault(block, []).append(entry.filename)
+                block_of[entry.filename] = block
+
+        pending: Dict[str, bytes] = {}
+        for name in members:
+            raw = self._raw_names[name]
+            if raw not in pending and raw in block_of:
+                targets = blocks.pop(block_of[raw], [])
+                if targets:
+                    self._archive.reset()
+                    contents = self._archive.read(targets=targets)
+                    for target in targets:
+                        stream = contents.get(target)
+                        if stream is not None:
+                            pending[target] = stream.read()
+
+            data = pending.pop(raw, None)
+            if data is None:
+                logger.warning(f"تعذرت قراءة العضو من الأرشيف: {name}")
+                continue
+            yield name, data
+
+
+class ArchiveWriter:
+    """
+    فئة كتابة الأرشيف أثناء اكتمال الصفحات
+    Appends finished pages to a zip/cbz or 7z archive as the pipeline emits them
+
+    الصور المضغوطة مسبقاً (JPEG/PNG/WebP) تُخزن دون إعادة ضغط، والكتابة تتم في
+    ملف مؤقت بجوار الهدف ثم يُستبدل به الهدف دفعة واحدة عند الإغلاق، فلا يظهر
+    أرشيف ناقص أبداً
+    Already-compressed images are stored rather than deflated. Everything is written
+    to a temporary file next to the target, which replaces the target atomically on
+    close, so a partial archive is never visible.
+
+    في 7z يستخدم كل أرشيف مفتوح للكتابة مرشحاً واحداً، لذا تُكتب الصور بمرشح
+    النسخ أثناء المعالجة وتُجمع الملفات الأخرى في الذاكرة ثم تُضاف عند الإغلاق
+    في كتلة LZMA2 منفصلة
+    A 7z writer uses one filter chain, so images are streamed into a COPY block and
+    other members are held in memory and appended as a separate LZMA2 block on close.
+
+    مثال / Example:
+        with ArchiveWriter('chapter.cbz') as writer:
+            writer.add('001.jpg', data)
+    """
+
+    COMPRESSED_SUFFIXES = ('.jpg', '.jpeg', '.png', '.webp', '.gif', '.avif')
+
+    def __init__(self, archive_path: str, archive_format: Optional[str] = None,
+                 compresslevel: int = 6):
+        """
+        Args:
+            archive_path: مسار الأرشيف الهدف
+            archive_format: الصيغة (zip أو 7z) - افتراضياً من امتداد الملف
+            compresslevel: مستوى ضغط الملفات غير المضغوطة
+        """
+        self.archive_path = Path(archive_path)
+        self.format = (archive_format or
+                       ('7z' if self.archive_path.suffix.lower() in ArchiveReader.SEVEN_ZIP_SUFFIXES
+                        else 'zip')).lower()
+        self.compresslevel = compresslevel
+        self.count = 0
+        self._archive = None
+        self._file = None
+        self._temp_path: Optional[Path] = None
+        # ملفات 7z غير المضغوطة بانتظار كتلة LZMA2
+        self._pending: List[Tuple[str, bytes]] = []
+
+    def __enter__(self) -> "ArchiveWriter":
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def open(self):
+        """إنشاء الملف المؤقت وفتح الأرشيف للكتابة"""
+        if self._archive is not None:
+            return
+
+        self.archive_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_name = tempfile.mkstemp(prefix=f'.{self.archive_path.name}.',
+                                         suffix='.part', dir=self.archive_path.parent)
+        # المقبض يبقى مفتوحاً للكتابة حتى يُزامن قبل الإغلاق (fsync على مقبض
+        # للقراءة فقط يفشل في Windows)
+        self._file = os.fdopen(fd, 'w+b')
+        self._temp_path = Path(temp_name)
+
+        if self.format == 'zip':
+            import zipfile
+            self._archive = zipfile.ZipFile(self._file, 'w')
+        elif self.format == '7z':
+            import py7zr
+            # مرشح النسخ للصور فقط: الصفحات مضغوطة مسبقاً فلا فائدة من LZMA
+            self._archive = py7zr.SevenZipFile(self._file, 'w',
+                                               filters=[{'id': py7zr.FILTER_COPY}])
+        else:
+            self._file.close()
+            self._file = None
+            self._temp_path.unlink()
+            raise ValueError(f"صيغة غير مدعومة: {self.format}")
+
+    def add(self, arcname: str, data: bytes):
+        """
+        إضافة ملف إلى الأرشيف
+        Append one member
+
+        Args:
+            arcname: الاسم داخل الأرشيف
+            data: محتوى الملف
+        """
+        self.open()
+        arcname = arcname.replace('\\', '/')
+
+        if self.format == 'zip':
+            import zipfile
+            info = zipfile.ZipInfo(arcname, time.localtime()[:6])
+            if Path(arcname).suffix.lower() in self.COMPRESSED_SUFFIXES:
+                info.compress_type = zipfile.ZIP_STORED
+                self._archive.writestr(info, data)
+            else:
+                info.compress_type = zipfile.ZIP_DEFLATED
+                self._archive.writestr(info, data, compresslevel=self.compresslevel)
+        elif Path(arcname).suffix.lower() in self.COMPRESSED_SUFFIXES:
+            self._archive.writestr(data, arcname)
+        else:
+            self._pending.append((arcname, bytes(data)))
+
+        self.count += 1
+
+    def add_file(self, file_path: str, arcname: Optional[str] = None):
+        """
+        إضافة ملف من القرص
+        Append a file from disk
+
+        Args:
+            file_path: مسار الملف
+            arcname: الاسم داخل الأرشيف - افتراضياً اسم الملف
+        """
+        file_path = Path(file_path)
+        self.add(arcname or file_path.name, file_path.read_bytes())
+
+    def close(self):
+        """
+        إنهاء الأرشيف واستبدال الهدف به دفعة واحدة
+        Finalize the archive and atomically move it into place
+        """
+        if self._archive is None:
+            return
+
+        self._archive.close()
+        self._archive = None
+
+        if self._pending:
+            import py7zr
+            self._file.seek(0)
+            with py7zr.SevenZipFile(self._file, 'a', filters=[
+                    {'id': py7zr.FILTER_LZMA2, 'preset': self.compresslevel}]) as archive:
+                for arcname, data in self._pending:
+                    archive.writestr(data, arcname)
+            self._pending = []
+
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
+        os.replace(self._temp_path, self.archive_path)
+        self._temp_path = None
+
+        logger.info(f"تم إنشاء الأرشيف: {self.archive_path} ({self.count} ملف)")
+
+    def abort(self):
+        """إلغاء الكتابة وحذف الملف المؤقت (الهدف لا يتغير)"""
+        try:
+            if self._archive is not None:
+                self._archive.close()
+        except Exception:
+            pass
+        self._archive = None
+        self._pending = []
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        if self._temp_path is not None and self._temp_path.exists():
+            self._temp_path.unlink()
+        self._temp_path = None
@@ -0,0 +1,242 @@
+"""
+ذاكرة تخزين مخرجات مراحل المعالجة حسب المحتوى
+Content-addressed per-stage artifact cache
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def content_key(image: np.ndarray) -> str:
+    """
+    مفتاح محتوى الصفحة (بصمة البكسلات والأبعاد)
+    Exact content key of a decoded page: hash of its pixels and shape
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(repr((image.shape, image.dtype.str)).encode('ascii'))
+    digest.update(np.ascontiguousarray(image).data)
+    return digest.hexdigest()
+
+
+def data_key(data: bytes) -> str:
+    """مفتاح محتوى ملف مضغوط (بصمة البايتات دون فك الترميز)"""
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+def file_identity(file_path: Union[str, Path, None]) -> Optional[Tuple[int, int]]:
+    """(الحجم، تاريخ التعديل) لملف نموذج أو خط، أو None"""
+    if not file_path:
+        return None
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+class ArtifactCache:
+    """
+    فئة تخزين مخرجات المراحل
+    Disk cache of pipeline stage outputs keyed by content and configuration
+
+    مفتاح كل مرحلة يُبنى من مفتاح المرحلة السابقة وإعدادات المرحلة وإصدار
+    نموذجها (الكشف ← OCR ← الترجمة ← الرسم)، لذا تغيير الخط يعيد الرسم فقط،
+    وتغيير نموذج الترجمة يعيد الترجمة والرسم دون OCR. الحجم الكلي محدود
+    ويُحذف الأقدم استخداماً عند تجاوزه
+    Each stage key hashes the previous stage's key with the stage's config and
+    model version (detect -> ocr -> translate -> render), so changing the font
+    re-runs rendering only and changing the translation model re-runs translation
+    and rendering but not OCR. Total size is capped with LRU eviction.
+
+    مثال / Example:
+        key = cache.stage_key('detect', content_key(image), processor.cache_fingerprint())
+        bubbles = cache.get(key)
+        if bubbles is None:
+            bubbles = processor.detect_bubbles(image)
+            cache.put(key, 'detect', bubbles)
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS artifacts (
+            key TEXT PRIMARY KEY,
+            stage TEXT,
+            size INTEGER,
+            created REAL,
+            last_access REAL
+        );
+        CREATE INDEX IF NOT EXISTS artifacts_lru ON artifacts(last_access);
+    """
+
+    def __init__(self, root: Union[str, Path], max_bytes: int = 2 * 1024 ** 3):
+        """
+        Args:
+            root: مجلد التخزين
+            max_bytes: الحد الأقصى للحجم الكلي بالبايت
+        """
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        (self.root / 'objects').mkdir(parents=True, exist_ok=True)
+
+        self._db = sqlite3.connect(str(self.root / 'index.sqlite'))
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(self.SCHEMA)
+        self.total_bytes = self._db.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM artifacts').fetchone()[0]
+
+        # إحصائيات كل مرحلة
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def stage_key(stage: str, parent_key: str, fingerprint: Dict) -> str:
+        """
+        مفتاح مخرج مرحلة
+        Key of a stage output from its input key and stage fingerprint
+
+        Args:
+            stage: اسم المرحلة
+            parent_key: مفتاح المحتوى أو المرحلة السابقة
+            fingerprint: إعدادات المرحلة وإصدار نموذجها
+
+        Returns:
+            المفتاح (hex)
+        """
+        payload = json.dumps([stage, parent_key, fingerprint], sort_keys=True, default=str)
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=20).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / 'objects' / key[:2] / key
+
+    def _count(self, stage: str, field: str):
+        counts = self.stats.setdefault(stage, {'hits': 0, 'misses': 0, 'stored': 0})
+        counts[field] += 1
+
+    def get(self, key: str, stage: str = '') -> Optional[Any]:
+        """
+        قراءة مخرج مخزن
+        Load a cached artifact
+
+        Args:
+            key: المفتاح
+            stage: اسم المرحلة (للإحصائيات)
+
+        Returns:
+            القيمة أو None
+        """
+        try:
+            with open(self._path(key), 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            self._count(stage, 'misses')
+            return None
+        except Exception as e:
+            logger.warning(f"مدخل تالف في ذاكرة المراحل {key}: {str(e)}")
+            self._remove(key)
+            self._count(stage, 'misses')
+            return None
+
+        with self._db:
+            self._db.execute('UPDATE artifacts SET last_access = ? WHERE key = ?',
+                             (time.time(), key))
+        self._count(stage, 'hits')
+        return value
+
+    def put(self, key: str, stage: str, value: Any) -> bool:
+        """
+        تخزين مخرج مرحلة
+        Store a stage output atomically, evicting old entries if needed
+
+        Args:
+            key: المفتاح
+            stage: اسم المرحلة
+            value: القيمة (قابلة لـ pickle)
+
+        Returns:
+            True إذا تم التخزين
+        """
+        try:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            if len(data) > self.max_bytes:
+                return False
+
+            path = self._path(key)
+            path.parent.mkdir(exist_ok=True)
+            fd, temp_name = tempfile.mkstemp(prefix='.', suffix='.part', dir=path.parent)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_name, path)
+
+            now = time.time()
+            with self._db:
+                row = self._db.execute('SELECT size FROM artifacts WHERE key = ?',
+                                       (key,)).fetchone()
+                self._db.execute(
+                    'INSERT OR REPLACE INTO artifacts (key, stage, size, created, last_access) '
+                    'VALUES (?, ?, ?, ?, ?)', (key, stage, len(data), now, now))
+            self.total_bytes += len(data) - (row[0] if row else 0)
+            self._count(stage, 'stored')
+
+            if self.total_bytes > self.max_bytes:
+                self.evict()
+            return True
+
+        except Exception as e:
+            logger.error(f"خطأ في تخزين مخرج المرحلة {stage}: {str(e)}")
+            return False
+
+    def _remove(self, key: str):
+        """حذف مدخل من القرص والفهرس"""
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+        with self._db:
+            row = self._db.execute('SELECT size FROM artifacts WHERE key = ?', (key,)).fetchone()
+            if row:
+                self._db.execute('DELETE FROM artifacts WHERE key = ?', (key,))
+                self.total_bytes -= row[0]
+
+    def evict(self, target_bytes: Optional[int] = None) -> int:
+        """
+        حذف الأقدم استخداماً حتى ينخفض الحجم عن الهدف
+        Evict least recently used artifacts down to target_bytes
+
+        الهدف الافتراضي 90% من الحد الأقصى حتى لا يتكرر الحذف مع كل إضافة
+        The default target is 90% of the cap so eviction does not run on every put.
+
+        Returns:
+            عدد المدخلات المحذوفة
+        """
+        if target_bytes is None:
+            target_bytes = int(self.max_bytes * 0.9)
+
+        removed = 0
+        rows = self._db.execute('SELECT key, size FROM artifacts ORDER BY last_access').fetchall()
+        for key, size in rows:
+            if self.total_bytes <= target_bytes:
+                break
+            self._remove(key)
+            removed += 1
+
+        if removed:
+            logger.info(f"حذف {removed} مدخل من ذاكرة المراحل "
+                        f"({self.total_bytes / 1024 ** 2:.1f} MB متبقية)")
+        return removed
+
+    def clear(self):
+        """حذف جميع المدخلات"""
+        self.evict(0)
+
+    def close(self):
+        self._db.close()
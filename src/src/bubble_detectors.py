@@ -0,0 +1,304 @@
+"""
+واجهات كشف الفقاعات القابلة للاستبدال
+Pluggable batched speech-bubble detector backends
+"""
+
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Type
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# سجل الواجهات المتاحة حسب الاسم
+DETECTOR_BACKENDS: Dict[str, Type["BubbleDetector"]] = {}
+
+
+def register_detector(name: str) -> Callable:
+    """
+    تسجيل واجهة كشف جديدة
+    Register a detector backend under a name
+
+    Args:
+        name: اسم الواجهة
+
+    Returns:
+        مزخرف الفئة
+    """
+    def decorator(cls: Type["BubbleDetector"]) -> Type["BubbleDetector"]:
+        cls.name = name
+        DETECTOR_BACKENDS[name] = cls
+        return cls
+    return decorator
+
+
+def create_detector(name: str, **kwargs) -> "BubbleDetector":
+    """
+    إنشاء واجهة كشف حسب الاسم
+    Create a detector backend by name
+
+    Args:
+        name: اسم الواجهة (contour, onnx)
+        **kwargs: معاملات الواجهة
+
+    Returns:
+        كائن الواجهة
+    """
+    if name not in DETECTOR_BACKENDS:
+        raise ValueError(f"واجهة كشف غير معروفة: {name} (المتاح: {', '.join(DETECTOR_BACKENDS)})")
+    return DETECTOR_BACKENDS[name](**kwargs)
+
+
+class BubbleDetector:
+    """
+    الواجهة الأساسية لكشف الفقاعات
+    Base class for batched bubble detectors
+
+    كل واجهة تستقبل قائمة صفحات وتعيد لكل صفحة قائمة قواميس
+    {'bbox': (x, y, w, h), 'confidence': float, 'mask': ndarray أو None}
+    حيث القناع محلي بأبعاد الصندوق
+    Every backend takes a list of pages and returns, per page, a list of
+    {'bbox', 'confidence', 'mask'} dicts; masks are ROI-local uint8 or None.
+    """
+
+    name = 'base'
+
+    def is_available(self) -> bool:
+        """هل الواجهة جاهزة للاستخدام؟"""
+        return True
+
+    def detect_batch(self, pages: List[np.ndarray]) -> List[List[Dict]]:
+        """
+        كشف الفقاعات في مجموعة صفحات
+        Detect bubbles in a batch of pages
+
+        Args:
+            pages: قائمة الصفحات
+
+        Returns:
+            قائمة نتائج لكل صفحة
+        """
+        raise NotImplementedError
+
+    def detect(self, page: np.ndarray) -> List[Dict]:
+        """
+        كشف الفقاعات في صفحة واحدة
+        Detect bubbles in a single page
+        """
+        return self.detect_batch([page])[0]
+
+
+@register_detector('contour')
+class ContourBubbleDetector(BubbleDetector):
+    """
+    كشف الفقاعات بالعتبة الثنائية والحدود
+    Threshold + external contours detector (the original method)
+    """
+
+    def __init__(self, min_bubble_area: int = 100, threshold: int = 150):
+        """
+        Args:
+            min_bubble_area: الحد الأدنى لمساحة الفقاعة
+            threshold: قيمة العتبة الثنائية
+        """
+        self.min_bubble_area = min_bubble_area
+        self.threshold = threshold
+
+    def detect_batch(self, pages: List[np.ndarray]) -> List[List[Dict]]:
+        return [self._detect_page(page) for page in pages]
+
+    def _detect_page(self, page: np.ndarray) -> List[Dict]:
+        gray = cv2.cvtColor(page, cv2.COLOR_BGR2GRAY) if page.ndim == 3 else page
+        _, binary = cv2.threshold(gray, self.threshold, 255, cv2.THRESH_BINARY)
+        contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        detections = []
+        for contour in contours:
+            if cv2.contourArea(contour) <= self.min_bubble_area:
+                continue
+
+            x, y, w, h = cv2.boundingRect(contour)
+
+            # قناع محلي بأبعاد الصندوق فقط
+            mask = np.zeros((h, w), dtype=np.uint8)
+            cv2.drawContours(mask, [contour], -1, 255, thickness=-1, offset=(-x, -y))
+
+            detections.append({'bbox': (x, y, w, h), 'confidence': 1.0, 'mask': mask})
+
+        return detections
+
+
+@register_detector('onnx')
+class OnnxBubbleDetector(BubbleDetector):
+    """
+    كشف الفقاعات بنموذج YOLO مُصدَّر إلى ONNX عبر ONNX Runtime على المعالج
+    YOLO (ultralytics export) detector running on ONNX Runtime CPU
+    """
+
+    def __init__(self, model_path: str, input_size: int = 640,
+                 confidence: float = 0.5, iou: float = 0.45,
+                 batch_size: int = 8, num_threads: Optional[int] = None):
+        """
+        Args:
+            model_path: مسار ملف النموذج (.onnx)
+            input_size: حجم مدخل النموذج
+            confidence: الحد الأدنى للثقة
+            iou: عتبة تداخل NMS
+            batch_size: عدد الصفحات في كل تمرير
+            num_threads: عدد خيوط المعالج - اختياري
+        """
+        self.input_size = input_size
+        self.confidence = confidence
+        self.iou = iou
+        self.batch_size = batch_size
+        self.fixed_batch = False
+        self.session = None
+
+        try:
+            import onnxruntime as ort
+
+            options = ort.SessionOptions()
+            if num_threads:
+                options.intra_op_num_threads = num_threads
+
+            self.session = ort.InferenceSession(str(model_path), options,
+                                                providers=['CPUExecutionProvider'])
+            model_input = self.session.get_inputs()[0]
+            self.input_name = model_input.name
+
+            # النماذج المصدرة بدفعة ثابتة تقبل هذا العدد بالضبط في كل تمرير
+            if isinstance(model_input.shape[0], int):
+                self.batch_size = model_input.shape[0]
+                self.fixed_batch = True
+
+            logger.info(f"تم تحميل نموذج ONNX بنجاح: {model_path}")
+
+        except ImportError:
+            logger.warning("لم يتم تثبيت onnxruntime - قد تحتاج إلى تثبيته")
+        except Exception as e:
+            logger.error(f"خطأ في تحميل نموذج ONNX: {str(e)}")
+
+    def is_available(self) -> bool:
+        return self.session is not None
+
+    def _letterbox(self, page: np.ndarray):
+        """تحجيم الصفحة مع الحفاظ على النسبة وإضافة حشوة"""
+        h, w = page.shape[:2]
+        ratio = min(self.input_size / h, self.input_size / w)
+        nh, nw = round(h * ratio), round(w * ratio)
+
+        rgb = cv2.cvtColor(page, cv2.COLOR_GRAY2RGB if page.ndim == 2 else cv2.COLOR_BGR2RGB)
+        resized = cv2.resize(rgb, (nw, nh), interpolation=cv2.INTER_LINEAR)
+
+        canvas = np.full((self.input_size, self.input_size, 3), 114, dtype=np.uint8)
+        pad_x, pad_y = (self.input_size - nw) // 2, (self.input_size - nh) // 2
+        canvas[pad_y:pad_y+nh, pad_x:pad_x+nw] = resized
+
+        return canvas, ratio, pad_x, pad_y
+
+    def detect_batch(self, pages: List[np.ndarray]) -> List[List[Dict]]:
+        if self.session is None:
+            logger.error("نموذج ONNX غير محمل")
+            return [[] for _ in pages]
+
+        results = []
+        for start in range(0, len(pages), self.batch_size):
+            chunk = pages[start:start + self.batch_size]
+            letterboxed = [self._letterbox(page) for page in chunk]
+
+            # NHWC uint8 -> NCHW float32
+            batch = np.stack([item[0] for item in letterboxed])
+            batch = batch.transpose(0, 3, 1, 2).astype(np.float32) / 255.0
+
+            # الدفعة الأخيرة الناقصة تُكمل بصفحات فارغة لنموذج بدفعة ثابتة
+            if self.fixed_batch and len(chunk) < self.batch_size:
+                padding = np.zeros((self.batch_size - len(chunk),) + batch.shape[1:], batch.dtype)
+                batch = np.concatenate([batch, padding])
+
+            output = self.session.run(None, {self.input_name: batch})[0][:len(chunk)]
+
+            for page, prediction, (_, ratio, pad_x, pad_y) in zip(chunk, output, letterboxed):
+                results.append(self._decode(prediction, page.shape, ratio, pad_x, pad_y))
+
+        return results
+
+    def _decode(self, prediction: np.ndarray, shape, ratio: float,
+                pad_x: int, pad_y: int) -> List[Dict]:
+        """
+        تحويل مخرجات YOLOv8 (4 + عدد الفئات، عدد المرشحين) إلى صناديق
+        Decode a YOLOv8 head output (4 + classes, candidates) into page boxes
+        """
+        prediction = prediction.T
+        scores = prediction[:, 4:].max(axis=1)
+        keep = scores >= self.confidence
+        if not np.any(keep):
+            return []
+
+        boxes, scores = prediction[keep, :4], scores[keep]
+
+        # (cx, cy, w, h) في فضاء النموذج -> (x, y, w, h) في الصفحة الأصلية
+        xywh = np.empty_like(boxes)
+        xywh[:, 0] = (boxes[:, 0] - boxes[:, 2] / 2 - pad_x) / ratio
+        xywh[:, 1] = (boxes[:, 1] - boxes[:, 3] / 2 - pad_y) / ratio
+        xywh[:, 2] = boxes[:, 2] / ratio
+        xywh[:, 3] = boxes[:, 3] / ratio
+
+        indices = cv2.dnn.NMSBoxes(xywh.tolist(), scores.tolist(), self.confidence, self.iou)
+
+        page_h, page_w = shape[:2]
+        detections = []
+        for i in np.array(indices).flatten():
+            x, y, w, h = xywh[i]
+            x0, y0 = max(0, int(round(x))), max(0, int(round(y)))
+            x1, y1 = min(page_w, int(round(x + w))), min(page_h, int(round(y + h)))
+            if x1 > x0 and y1 > y0:
+                detections.append({
+                    'bbox': (x0, y0, x1 - x0, y1 - y0),
+                    'confidence': float(scores[i]),
+                    'mask': None,
+                })
+
+        return detections
+
+
+def benchmark_detectors(pages: List[np.ndarray], detectors: Dict[str, BubbleDetector],
+                        batch_size: int = 8, warmup: int = 1) -> Dict[str, Dict[str, float]]:
+    """
+    قياس سرعة كل واجهة على نفس مجموعة الصفحات
+    Measure pages/s of each backend on the same corpus
+
+    Args:
+        pages: الصفحات المستخدمة في القياس
+        detectors: الواجهات المراد قياسها حسب الاسم
+        batch_size: عدد الصفحات في كل استدعاء
+        warmup: عدد الدفعات التمهيدية غير المحسوبة
+
+    Returns:
+        لكل واجهة: pages_per_second وseconds وbubbles
+    """
+    report = {}
+
+    for name, detector in detectors.items():
+        if not detector.is_available():
+            logger.warning(f"تخطي الواجهة غير المتاحة: {name}")
+            continue
+
+        for _ in range(warmup):
+            detector.detect_batch(pages[:batch_size])
+
+        bubbles = 0
+        start = time.perf_counter()
+        for i in range(0, len(pages), batch_size):
+            bubbles += sum(len(found) for found in detector.detect_batch(pages[i:i + batch_size]))
+        elapsed = time.perf_counter() - start
+
+        report[name] = {
+            'pages_per_second': len(pages) / elapsed if elapsed > 0 else float('inf'),
+            'seconds': elapsed,
+            'bubbles': bubbles,
+        }
+        logger.info(f"{name}: {report[name]['pages_per_second']:.2f} صفحة/ثانية")
+
+    return report
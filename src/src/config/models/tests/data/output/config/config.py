@@ -13,6 +13,7 @@ CONFIG_DIR = BASE_DIR / "config"
 MODELS_DIR = BASE_DIR / "models"
 DATA_DIR = BASE_DIR / "data"
 OUTPUT_DIR = BASE_DIR / "output"
+CACHE_DIR = BASE_DIR / "cache"
 
 # ========== إعدادات المدخلات ==========
 # الصيغ المدعومة
@@ -23,6 +24,10 @@ SUPPORTED_DOCUMENT_FORMATS = ['.pdf']
 # حجم الصور الأقصى
 MAX_IMAGE_SIZE = (4096, 4096)
 MIN_IMAGE_SIZE = (256, 256)
+# دقة رسم صفحات PDF التي لا تحتوي على صورة مضمنة واحدة
+PDF_DPI = 300
+# أقصى بُعد لصورة العمل المستخدمة في الكشف و OCR (الرسم يتم بالدقة الأصلية)
+WORKING_MAX_SIDE = 2048
 
 # ========== إعدادات المعالجة ==========
 # معاملات PaddleOCR
@@ -44,6 +49,22 @@ DETECTRON2_CONFIG = {
     'model_name': 'COCO-InstanceSegmentation/mask_rcnn_R_50_FPN_3x.yaml',
 }
 
+# واجهة كشف الفقاعات (contour, onnx)
+DETECTOR_BACKEND = 'contour'
+# معاملات كل واجهة
+DETECTOR_OPTIONS = {
+    'contour': {
+        'min_bubble_area': 100,
+    },
+    'onnx': {
+        'model_path': MODELS_DIR / 'yolov8m-bubbles.onnx',
+        'input_size': 640,
+        'confidence': YOLO_CONFIG['confidence'],
+        'iou': YOLO_CONFIG['iou'],
+        'batch_size': 8,
+    },
+}
+
 # ========== إعدادات الترجمة ==========
 # نموذج الترجمة
 TRANSLATION_MODEL = 'facebook/m2m100_418M'
@@ -54,6 +75,12 @@ TARGET_LANGUAGE = 'ar'  # العربية
 # حجم الخط الافتراضي
 DEFAULT_FONT_SIZE = 14
 DEFAULT_FONT = 'Arial'
+# خط TrueType يدعم العربية (بدونه تُستخدم خطوط Hershey التي لا ترسم العربية)
+ARABIC_FONT_PATH = MODELS_DIR / 'fonts' / 'NotoNaskhArabic-Regular.ttf'
+
+# مسح النص الأصلي داخل الفقاعات قبل رسم الترجمة
+ERASE_SOURCE_TEXT = True
+INPAINT_RADIUS = 3
 
 # الألوان
 TEXT_COLOR = (0, 0, 0)  # أسود
@@ -70,6 +97,45 @@ NUM_WORKERS = 4
 OUTPUT_FORMATS = ['png', 'jpg', 'pdf', '7z', 'zip']
 # جودة الصور JPEG
 JPEG_QUALITY = 95
+# حفظ الطبقات (الصفحة الممسوحة وطبقة لكل فقاعة) لإعادة رسم الفقاعات المعدلة فقط
+# معطل افتراضياً: يضيف صورة PNG كاملة وطبقات لكل صفحة
+SAVE_LAYERS = False
+LAYERS_DIR = OUTPUT_DIR / 'layers'
+
+# ========== إعدادات إعادة استخدام النتائج ==========
+# فهرس الصفحات المعالجة حسب البصمة الإدراكية
+PAGE_INDEX_FILE = CACHE_DIR / 'page_index.jsonl'
+# أقصى مسافة Hamming لاعتبار الصفحتين متطابقتين
+PAGE_HASH_MAX_DISTANCE = 4
+# أقصى فرق بين بكسلات الصور المصغرة للفقاعات لتأكيد التطابق
+PAGE_CROP_TOLERANCE = 32
+# فهرس محتوى المجلدات لتسريع إعادة الفحص
+DIRECTORY_INDEX_FILE = CACHE_DIR / 'directory_index.sqlite'
+
+# ========== إعدادات مراقبة المجلد ==========
+# سجل المدخلات المعالجة (لا تُعالج مرة أخرى ما لم تتغير)
+WATCH_LEDGER_FILE = CACHE_DIR / 'watch_ledger.jsonl'
+# مدة ثبات الحجم والتاريخ قبل اعتبار المدخل مكتمل الكتابة (بالثواني)
+WATCH_SETTLE_SECONDS = 5.0
+# الفاصل الزمني للفحص الدوري عند عدم توفر inotify (بالثواني)
+WATCH_POLL_INTERVAL = 2.0
+
+# ========== إعدادات استئناف المهام ==========
+# سجلات تقدم المهام (تُتخطى الصفحات المكتملة عند إعادة التشغيل)
+JOBS_DIR = CACHE_DIR / 'jobs'
+
+# ========== ذاكرة مخرجات المراحل ==========
+# تخزين نتائج الكشف و OCR والترجمة والرسم حسب المحتوى والإعدادات
+USE_ARTIFACT_CACHE = True
+ARTIFACT_CACHE_DIR = CACHE_DIR / 'artifacts'
+# الحد الأقصى لحجم الذاكرة (يُحذف الأقدم استخداماً عند تجاوزه)
+ARTIFACT_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+# ========== إخراج الصفحات بدون نص ==========
+# الصفحات بدون نص (الأغلفة ومشاهد الحركة) تُخرج كما هي دون إعادة ترميز
+PASSTHROUGH_TEXTLESS_PAGES = True
+# طريقة إخراج الملفات: auto (reflink ثم ربط صلب ثم نسخ) أو hardlink أو copy
+PASSTHROUGH_LINK_MODE = 'auto'
 
 # ========== إعدادات التسجيل ==========
 LOG_LEVEL = 'INFO'
@@ -0,0 +1,287 @@
+"""
+مساحة مسبقة الحجز لتجميع قصاصات الفقاعات
+Preallocated, reusable arena that packs bubble crops for batched OCR
+"""
+
+import logging
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class CropArena:
+    """
+    فئة تجميع قصاصات الفقاعات في مخزن واحد
+    Packs bubble crops into one buffer using shelf packing
+
+    القصاصات تُنسخ مرة واحدة إلى المخزن وتُعاد كعروض (views) دون نسخ إضافي،
+    وجدول الإزاحات يربط كل قصاصة بإحداثياتها في الصفحة الأصلية
+    Each crop is copied once into the buffer and handed out as a view; the offset
+    table maps every crop back to its page and bubble coordinates. The buffer is
+    kept between pages and only grows when a batch does not fit.
+    """
+
+    OFFSET_DTYPE = np.dtype([
+        ('page', np.int32), ('bubble', np.int32),
+        ('arena_x', np.int32), ('arena_y', np.int32),
+        ('x', np.int32), ('y', np.int32), ('w', np.int32), ('h', np.int32),
+    ])
+
+    def __init__(self, width: int = 2048, height: int = 4096, channels: int = 1,
+                 padding: int = 48, fill_value: int = 255):
+        """
+        تهيئة المخزن
+        Initialize the arena
+
+        Args:
+            width: عرض المخزن
+            height: ارتفاع المخزن المبدئي
+            channels: عدد القنوات (1 للرمادي أو 3 للملون)
+            padding: الحشوة بين القصاصات (سطر نص على الأقل حتى لا يدمج OCR
+                أسطر قصاصتين متجاورتين)
+            fill_value: قيمة تعبئة الحشوة (أبيض)
+        """
+        self.channels = channels
+        self.padding = padding
+        self.fill_value = fill_value
+
+        self.buffer = self._allocate(height, width)
+        self.offsets = np.zeros(64, dtype=self.OFFSET_DTYPE)
+        self.count = 0
+
+        # حالة التعبئة بالرفوف
+        self._cursor_x = 0
+        self._cursor_y = 0
+        self._shelf_height = 0
+        self._shelf_tops = [0]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _allocate(self, height: int, width: int) -> np.ndarray:
+        shape = (height, width) if self.channels == 1 else (height, width, self.channels)
+        return np.full(shape, self.fill_value, dtype=np.uint8)
+
+    @property
+    def used_height(self) -> int:
+        """الارتفاع المستخدم من المخزن"""
+        return min(self.buffer.shape[0], self._cursor_y + self._shelf_height + 2 * self.padding)
+
+    def reset(self):
+        """
+        إعادة تدوير المخزن لصفحة أو دفعة جديدة
+        Recycle the arena for the next page or batch
+        """
+        self.buffer[:self.used_height] = self.fill_value
+        self.count = 0
+        self._cursor_x = 0
+        self._cursor_y = 0
+        self._shelf_height = 0
+        self._shelf_tops = [0]
+
+    def _reserve(self, w: int, h: int) -> Tuple[int, int]:
+        """حجز مكان لقصاصة بأبعاد (w, h) وإرجاع موضعها"""
+        pad = self.padding
+        width = self.buffer.shape[1]
+
+        # القصاصات الأعرض من المخزن توسع العرض
+        if w + 2 * pad > width:
+            self._grow(self.buffer.shape[0], w + 2 * pad)
+            width = self.buffer.shape[1]
+
+        # بدء رف جديد إذا لم تتسع القصاصة في الرف الحالي
+        if self._cursor_x + w + 2 * pad > width:
+            self._cursor_y += self._shelf_height + pad
+            self._cursor_x = 0
+            self._shelf_height = 0
+            self._shelf_tops.append(self._cursor_y)
+
+        if self._cursor_y + h + 2 * pad > self.buffer.shape[0]:
+            self._grow(max(2 * self.buffer.shape[0], self._cursor_y + h + 2 * pad), width)
+
+        ax, ay = self._cursor_x + pad, self._cursor_y + pad
+        self._cursor_x += w + pad
+        self._shelf_height = max(self._shelf_height, h)
+        return ax, ay
+
+    def _grow(self, height: int, width: int):
+        """توسيع المخزن مع الاحتفاظ بالمحتوى الحالي"""
+        logger.info(f"توسيع مخزن القصاصات إلى {width}x{height}")
+        grown = self._allocate(height, width)
+        old_h, old_w = self.buffer.shape[:2]
+        grown[:old_h, :old_w] = self.buffer
+        self.buffer = grown
+
+    def add(self, image: np.ndarray, bubble: Tuple[int, int, int, int],
+            page_index: int = 0, bubble_index: Optional[int] = None) -> Optional[np.ndarray]:
+        """
+        نسخ قصاصة فقاعة إلى المخزن
+        Copy one bubble crop into the arena
+
+        العروض السابقة تبقى صالحة ما لم يتوسع المخزن؛ استخدم view() بعد الانتهاء
+        Earlier views stay valid unless the arena grows; use view() once packing is done.
+
+        Args:
+            image: صورة الصفحة
+            bubble: إحداثيات الفقاعة (x, y, w, h)
+            page_index: رقم الصفحة في الدفعة
+            bubble_index: رقم الفقاعة في الصفحة - اختياري
+
+        Returns:
+            عرض (view) للقصاصة داخل المخزن أو None إذا كانت فارغة
+        """
+        crop, x, y = self._crop(image, bubble)
+        if crop is None:
+            return None
+
+        ax, ay = self._reserve(crop.shape[1], crop.shape[0])
+        return self._place(crop, ax, ay, x, y, page_index, bubble_index)
+
+    def add_page(self, image: np.ndarray, bubbles: List[Tuple[int, int, int, int]],
+                 page_index: int = 0) -> List[Optional[np.ndarray]]:
+        """
+        نسخ جميع فقاعات صفحة إلى المخزن
+        Pack all bubbles of a page
+
+        يتم حجز جميع المواقع أولاً حتى تبقى جميع العروض المعادة صالحة
+        All slots are reserved first so every returned view stays valid.
+
+        Args:
+            image: صورة الصفحة
+            bubbles: إحداثيات الفقاعات
+            page_index: رقم الصفحة في الدفعة
+
+        Returns:
+            قائمة العروض بنفس ترتيب الفقاعات
+        """
+        crops = [self._crop(image, bubble) for bubble in bubbles]
+        slots = [self._reserve(c[0].shape[1], c[0].shape[0]) if c[0] is not None else None
+                 for c in crops]
+
+        views = []
+        for i, ((crop, x, y), slot) in enumerate(zip(crops, slots)):
+            views.append(None if slot is None else
+                         self._place(crop, slot[0], slot[1], x, y, page_index, i))
+        return views
+
+    @staticmethod
+    def _crop(image: np.ndarray, bubble: Tuple[int, int, int, int]):
+        """قص منطقة الفقاعة من الصفحة (بدون نسخ) بعد قصرها على حدود الصفحة"""
+        x, y, w, h = bubble
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(image.shape[1], x + w), min(image.shape[0], y + h)
+        crop = image[y0:y1, x0:x1]
+        return (crop if crop.size else None), x0, y0
+
+    def _place(self, crop: np.ndarray, ax: int, ay: int, x: int, y: int,
+               page_index: int, bubble_index: Optional[int]) -> np.ndarray:
+        """نسخ القصاصة إلى موقعها وتسجيلها في جدول الإزاحات"""
+        h, w = crop.shape[:2]
+        view = self.buffer[ay:ay+h, ax:ax+w]
+
+        # التحويل بين القنوات يتم مرة واحدة أثناء النسخ
+        if crop.ndim == 3 and self.channels == 1:
+            view[...] = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+        elif crop.ndim == 2 and self.channels == 3:
+            view[...] = crop[:, :, None]
+        else:
+            view[...] = crop
+
+        if self.count == len(self.offsets):
+            self.offsets = np.resize(self.offsets, 2 * len(self.offsets))
+
+        self.offsets[self.count] = (page_index,
+                                    self.count if bubble_index is None else bubble_index,
+                                    ax, ay, x, y, w, h)
+        self.count += 1
+        return view
+
+    def get_offsets(self) -> np.ndarray:
+        """جدول الإزاحات للقصاصات الحالية"""
+        return self.offsets[:self.count]
+
+    def view(self, index: int) -> np.ndarray:
+        """العرض الخاص بقصاصة حسب ترتيبها"""
+        entry = self.offsets[index]
+        ay, ax = entry['arena_y'], entry['arena_x']
+        return self.buffer[ay:ay + entry['h'], ax:ax + entry['w']]
+
+    def packed_image(self) -> np.ndarray:
+        """
+        الجزء المستخدم من المخزن كصورة واحدة للمعالجة الدفعية
+        The used part of the arena as one image for a single OCR pass
+        """
+        return self.buffer[:self.used_height]
+
+    def packed_slices(self, max_side: int) -> List[Tuple[int, np.ndarray]]:
+        """
+        الجزء المستخدم مقسماً عند حدود الرفوف إلى أجزاء لا يتجاوز ارتفاعها max_side
+        The used part split at shelf boundaries into slices at most max_side tall
+
+        كاشف OCR يصغر أي صورة يتجاوز بُعدها حده الأقصى، لذا يُمرر كل جزء على حدة
+        حتى لا يُصغر النص الصغير. الرف الأطول من الحد يبقى جزءاً واحداً
+        The OCR detector downscales images above its side limit, so each slice is
+        passed separately to keep small text at full resolution. A single shelf
+        taller than the limit stays one slice.
+
+        Args:
+            max_side: أقصى ارتفاع للجزء
+
+        Returns:
+            قائمة (بداية الجزء في المخزن، عرض الجزء)
+        """
+        used = self.used_height
+        cuts, previous = [0], 0
+        for boundary in self._shelf_tops[1:] + [used]:
+            if boundary - cuts[-1] > max_side and previous > cuts[-1]:
+                cuts.append(previous)
+            previous = boundary
+        cuts.append(used)
+
+        return [(y0, self.buffer[y0:y1]) for y0, y1 in zip(cuts, cuts[1:]) if y1 > y0]
+
+    def locate(self, arena_x: float, arena_y: float) -> int:
+        """
+        إيجاد القصاصة التي تحتوي نقطة من المخزن
+        Find the crop containing an arena point
+
+        Returns:
+            ترتيب القصاصة أو -1
+        """
+        table = self.get_offsets()
+        inside = ((table['arena_x'] <= arena_x) & (arena_x < table['arena_x'] + table['w']) &
+                  (table['arena_y'] <= arena_y) & (arena_y < table['arena_y'] + table['h']))
+        hits = np.flatnonzero(inside)
+        return int(hits[0]) if len(hits) else -1
+
+    def overlapping(self, x0: float, y0: float, x1: float, y1: float) -> np.ndarray:
+        """
+        القصاصات التي يتقاطع موقعها مع صندوق من المخزن
+        Indices of crops whose arena slot intersects a box
+
+        Returns:
+            مصفوفة الترتيبات (فارغة إذا وقع الصندوق في الحشوة فقط)
+        """
+        table = self.get_offsets()
+        hits = ((table['arena_x'] < x1) & (x0 < table['arena_x'] + table['w']) &
+                (table['arena_y'] < y1) & (y0 < table['arena_y'] + table['h']))
+        return np.flatnonzero(hits)
+
+    def to_page_coords(self, index: int, points: np.ndarray) -> np.ndarray:
+        """
+        تحويل نقاط من المخزن إلى إحداثيات الصفحة
+        Map arena points of a crop back to page coordinates
+
+        Args:
+            index: ترتيب القصاصة
+            points: مصفوفة نقاط (N, 2) بإحداثيات المخزن
+
+        Returns:
+            النقاط بإحداثيات الصفحة
+        """
+        entry = self.offsets[index]
+        shift = np.array([entry['x'] - entry['arena_x'], entry['y'] - entry['arena_y']])
+        return np.asarray(points, dtype=np.float32) + shift
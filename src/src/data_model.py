@@ -0,0 +1,290 @@
+"""
+نموذج بيانات مضغوط للصفحات والفقاعات والنصوص
+Compact slotted data model for pages, bubbles and text items
+"""
+
+import math
+import pickle
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.rle_mask import RLEMask
+
+
+class PageTransform:
+    """
+    التحويل بين صورة العمل والصفحة الأصلية
+    Scale transform between the working image and the original page
+    """
+
+    __slots__ = ('width', 'height', 'work_width', 'work_height')
+
+    def __init__(self, width: int, height: int, work_width: int, work_height: int):
+        self.width, self.height = int(width), int(height)
+        self.work_width, self.work_height = int(work_width), int(work_height)
+
+    def __reduce__(self):
+        return PageTransform, (self.width, self.height, self.work_width, self.work_height)
+
+    @property
+    def scale_x(self) -> float:
+        return self.width / self.work_width
+
+    @property
+    def scale_y(self) -> float:
+        return self.height / self.work_height
+
+    @property
+    def is_identity(self) -> bool:
+        return self.width == self.work_width and self.height == self.work_height
+
+    def to_original_box(self, box: Sequence[int]) -> Tuple[int, int, int, int]:
+        """
+        تحويل صندوق (x, y, w, h) إلى الإحداثيات الأصلية مع تغطية كاملة
+        Map an (x, y, w, h) box to original coordinates, rounding outwards
+        """
+        x, y, w, h = box
+        x0 = max(0, math.floor(x * self.scale_x))
+        y0 = max(0, math.floor(y * self.scale_y))
+        x1 = min(self.width, math.ceil((x + w) * self.scale_x))
+        y1 = min(self.height, math.ceil((y + h) * self.scale_y))
+        return x0, y0, x1 - x0, y1 - y0
+
+    def to_original_points(self, points: Sequence[Sequence[float]]) -> List[Tuple[float, float]]:
+        """تحويل نقاط (x, y) إلى الإحداثيات الأصلية"""
+        return [(px * self.scale_x, py * self.scale_y) for px, py in points]
+
+
+class TextItem:
+    """
+    نص مستخرج بواسطة OCR
+    One OCR line: text, confidence and its polygon in page coordinates
+
+    يدعم الوصول بأسلوب القاموس ('text', 'confidence', 'bbox') للتوافق مع الكود القديم
+    Supports dict-style access for code written against the old dict results.
+    """
+
+    __slots__ = ('text', 'confidence', 'bbox')
+
+    def __init__(self, text: str, confidence: float,
+                 bbox: Sequence[Sequence[float]]):
+        self.text = text
+        self.confidence = float(confidence)
+        self.bbox = tuple((float(px), float(py)) for px, py in bbox)
+
+    def __reduce__(self):
+        return TextItem, (self.text, self.confidence, self.bbox)
+
+    def __repr__(self) -> str:
+        return f"TextItem({self.text!r}, {self.confidence:.2f})"
+
+    def __getitem__(self, key: str):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        """الوصول بأسلوب القاموس"""
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    @property
+    def box(self) -> Tuple[int, int, int, int]:
+        """الصندوق المحيط (x, y, w, h)"""
+        xs = [px for px, _ in self.bbox]
+        ys = [py for _, py in self.bbox]
+        x, y = int(min(xs)), int(min(ys))
+        return x, y, int(max(xs)) - x, int(max(ys)) - y
+
+
+class TextStyle:
+    """
+    نمط رسم نص داخل فقاعة
+    Per-job rendering style; None fields fall back to the renderer defaults
+    """
+
+    __slots__ = ('color', 'background', 'font_size', 'padding')
+
+    def __init__(self, color: Optional[Tuple[int, int, int]] = None,
+                 background: Optional[Tuple[int, int, int]] = None,
+                 font_size: Optional[int] = None, padding: Optional[int] = None):
+        """
+        Args:
+            color: لون النص (BGR)
+            background: لون تعبئة الفقاعة قبل الرسم - اختياري
+            font_size: حجم خط ثابت بالبكسل (None للملاءمة التلقائية)
+            padding: الحشوة داخل الفقاعة
+        """
+        self.color = color
+        self.background = background
+        self.font_size = font_size
+        self.padding = padding
+
+    def __reduce__(self):
+        return TextStyle, (self.color, self.background, self.font_size, self.padding)
+
+    def __repr__(self) -> str:
+        return (f"TextStyle(color={self.color}, background={self.background}, "
+                f"font_size={self.font_size}, padding={self.padding})")
+
+
+class Bubble:
+    """
+    فقاعة كلام مع نصوصها وترجمتها
+    A speech bubble with its OCR items and translation
+
+    تتصرف كصف (x, y, w, h) عند التفكيك أو الفهرسة، لذا تعمل مع الدوال القديمة
+    Unpacks and indexes like an (x, y, w, h) tuple, so existing box code keeps working.
+    """
+
+    __slots__ = ('x', 'y', 'w', 'h', 'confidence', 'mask', 'items', 'text', 'translation')
+
+    def __init__(self, x: int, y: int, w: int, h: int, confidence: float = 1.0,
+                 mask: Optional[RLEMask] = None, items: Optional[List[TextItem]] = None,
+                 text: str = '', translation: str = ''):
+        self.x, self.y, self.w, self.h = int(x), int(y), int(w), int(h)
+        self.confidence = float(confidence)
+        self.mask = mask
+        self.items = items if items is not None else []
+        self.text = text
+        self.translation = translation
+
+    def __reduce__(self):
+        return Bubble, (self.x, self.y, self.w, self.h, self.confidence,
+                        self.mask, self.items, self.text, self.translation)
+
+    def __repr__(self) -> str:
+        return f"Bubble({self.x}, {self.y}, {self.w}, {self.h})"
+
+    def __iter__(self) -> Iterator[int]:
+        return iter((self.x, self.y, self.w, self.h))
+
+    def __len__(self) -> int:
+        return 4
+
+    def __getitem__(self, index):
+        return (self.x, self.y, self.w, self.h)[index]
+
+    @property
+    def bbox(self) -> Tuple[int, int, int, int]:
+        """الصندوق المحيط (x, y, w, h)"""
+        return self.x, self.y, self.w, self.h
+
+    @property
+    def area(self) -> int:
+        return self.w * self.h
+
+    def roi_mask(self) -> Optional[np.ndarray]:
+        """قناع الفقاعة الكثيف بأبعاد صندوقها فقط (أو None)"""
+        return self.mask.to_roi(self.bbox) if self.mask is not None else None
+
+    def map_to_original(self, transform: PageTransform):
+        """
+        تحويل الصندوق والقناع والنصوص من صورة العمل إلى الصفحة الأصلية
+        Map box, mask and text items from the working image to the original page
+        """
+        if transform.is_identity:
+            return
+
+        working_box = self.bbox
+        self.x, self.y, self.w, self.h = transform.to_original_box(working_box)
+
+        if self.mask is not None:
+            self.mask = self.mask.resize(self.bbox, (transform.height, transform.width),
+                                         working_box)
+
+        for item in self.items:
+            item.bbox = tuple(transform.to_original_points(item.bbox))
+
+
+class Page:
+    """
+    حالة صفحة واحدة عبر مراحل المعالجة
+    Page-level state shared by all pipeline stages
+    """
+
+    __slots__ = ('name', 'width', 'height', 'channels', 'page_hash', 'bubbles')
+
+    def __init__(self, name: str, width: int, height: int, channels: int = 1,
+                 page_hash: Optional[int] = None, bubbles: Optional[List[Bubble]] = None):
+        self.name = name
+        self.width = int(width)
+        self.height = int(height)
+        self.channels = int(channels)
+        self.page_hash = page_hash
+        self.bubbles = bubbles if bubbles is not None else []
+
+    @classmethod
+    def from_image(cls, name: str, image: np.ndarray,
+                   page_hash: Optional[int] = None) -> "Page":
+        """إنشاء صفحة من أبعاد الصورة"""
+        channels = 1 if image.ndim == 2 else image.shape[2]
+        return cls(name, image.shape[1], image.shape[0], channels, page_hash)
+
+    def __reduce__(self):
+        return Page, (self.name, self.width, self.height, self.channels,
+                      self.page_hash, self.bubbles)
+
+    def __repr__(self) -> str:
+        return f"Page({self.name!r}, {self.width}x{self.height}, {len(self.bubbles)} bubbles)"
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """(العرض، الارتفاع)"""
+        return self.width, self.height
+
+    def boxes(self) -> np.ndarray:
+        """صناديق جميع الفقاعات كمصفوفة (N, 4) من int32"""
+        return np.array([b.bbox for b in self.bubbles], dtype=np.int32).reshape(-1, 4)
+
+    def map_to_original(self, transform: PageTransform):
+        """
+        تحويل جميع الفقاعات إلى إحداثيات الصفحة الأصلية
+        Map every bubble back to original page coordinates
+        """
+        for bubble in self.bubbles:
+            bubble.map_to_original(transform)
+        self.width, self.height = transform.width, transform.height
+
+    def text_bubbles(self) -> List[Bubble]:
+        """الفقاعات التي تحتوي على نص"""
+        return [b for b in self.bubbles if b.text]
+
+    def to_bytes(self) -> bytes:
+        """
+        تسلسل مضغوط للنقل بين العمليات
+        Compact binary serialization for cross-process transport
+        """
+        return pickle.dumps(self, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def from_bytes(data: bytes) -> "Page":
+        """استعادة الصفحة من to_bytes"""
+        return pickle.loads(data)
+
+    def to_dict(self) -> Dict:
+        """
+        تمثيل JSON للنتائج (بدون الأقنعة)
+        JSON-friendly summary of the page results (masks are not included)
+        """
+        text_bubbles = self.text_bubbles()
+        return {
+            'name': self.name,
+            'size': [self.width, self.height],
+            'channels': self.channels,
+            'bubbles': [list(b.bbox) for b in text_bubbles],
+            'texts': [b.text for b in text_bubbles],
+            'translations': [b.translation for b in text_bubbles],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict, name: Optional[str] = None) -> "Page":
+        """استعادة الصفحة من to_dict"""
+        width, height = data['size']
+        page = cls(name or data.get('name', ''), width, height, data.get('channels', 1))
+        page.bubbles = [
+            Bubble(*box, text=text, translation=translation)
+            for box, text, translation in zip(data['bubbles'], data['texts'],
+                                              data['translations'])
+        ]
+        return page
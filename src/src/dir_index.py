@@ -0,0 +1,246 @@
+"""
+فهرس دائم لمحتوى المجلدات
+Persistent directory index for fast repeated scans
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from src.file_handler import natural_sort_key
+
+logger = logging.getLogger(__name__)
+
+
+class DirectoryIndex:
+    """
+    فئة فهرسة المجلدات في قاعدة SQLite
+    SQLite index of (path, size, mtime, content hash) for a file library
+
+    تاريخ تعديل المجلد يتغير عند إضافة أو حذف أو إعادة تسمية مدخلاته، لذا
+    المجلد غير المتغير يُستخدم محتواه المخزن مباشرة باستدعاء stat واحد فقط،
+    ولا يُعاد سرد إلا المجلدات المتغيرة
+    A directory's mtime changes whenever entries are added, removed or renamed, so
+    an unchanged directory costs one stat and its stored listing is reused; only
+    changed directories are listed again. Files rewritten in place keep the directory
+    mtime, so use scan(..., full=True) when that matters.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS dirs (
+            path TEXT PRIMARY KEY,
+            parent TEXT,
+            mtime_ns INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS dirs_parent ON dirs(parent);
+        CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY,
+            dir TEXT,
+            name TEXT,
+            size INTEGER,
+            mtime_ns INTEGER,
+            hash TEXT
+        );
+        CREATE INDEX IF NOT EXISTS files_dir ON files(dir);
+    """
+
+    def __init__(self, db_path: Union[str, Path]):
+        """
+        Args:
+            db_path: مسار قاعدة البيانات
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.db_path))
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(self.SCHEMA)
+
+        # إحصائيات آخر فحص
+        self.stats = {'dirs_reused': 0, 'dirs_listed': 0, 'files_stat': 0}
+
+    def close(self):
+        """إغلاق قاعدة البيانات"""
+        self._db.close()
+
+    def scan(self, folder_path: Union[str, Path], extensions: Optional[Sequence[str]] = None,
+             recursive: bool = True, full: bool = False) -> List[Path]:
+        """
+        فحص مجلد وتحديث الفهرس
+        Scan a folder, refreshing only changed directories
+
+        Args:
+            folder_path: مسار المجلد
+            extensions: الصيغ المطلوبة - اختياري
+            recursive: هل يتم البحث في المجلدات الفرعية
+            full: إعادة سرد جميع المجلدات وفحص جميع الملفات
+
+        Returns:
+            الملفات بالترتيب الطبيعي
+        """
+        self.stats = {'dirs_reused': 0, 'dirs_listed': 0, 'files_stat': 0}
+        extensions = tuple(ext.lower() for ext in extensions) if extensions else None
+        root = os.path.abspath(folder_path)
+
+        files: List[Path] = []
+        with self._db:
+            self._scan_dir(root, None, extensions, recursive, full, files)
+
+        logger.info(f"فحص المجلد: {self.stats}")
+        return files
+
+    def _scan_dir(self, path: str, parent: Optional[str], extensions, recursive: bool,
+                  full: bool, out: List[Path]):
+        """فحص مجلد واحد (ثم المجلدات الفرعية بالترتيب الطبيعي)"""
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            self._forget_dir(path)
+            return
+
+        row = self._db.execute('SELECT mtime_ns, parent FROM dirs WHERE path = ?',
+                               (path,)).fetchone()
+
+        if row is not None and row[0] == mtime_ns and not full:
+            # المجلد لم يتغير: استخدام المحتوى المخزن
+            self.stats['dirs_reused'] += 1
+            if parent is not None and row[1] != parent:
+                # مجلد فُحص سابقاً كجذر ثم ظهر داخل مجلد أب
+                self._db.execute('UPDATE dirs SET parent = ? WHERE path = ?', (parent, path))
+            names = [name for (name,) in
+                     self._db.execute('SELECT name FROM files WHERE dir = ?', (path,))]
+            subdirs = [sub for (sub,) in
+                       self._db.execute('SELECT path FROM dirs WHERE parent = ?', (path,))]
+        else:
+            self.stats['dirs_listed'] += 1
+            names, subdirs = self._refresh_dir(path)
+            if parent is None and row is not None:
+                # مجلد فرعي فُحص كجذر: يبقى مرتبطاً بأبيه
+                parent = row[1]
+            self._db.execute('INSERT OR REPLACE INTO dirs (path, parent, mtime_ns) VALUES (?, ?, ?)',
+                             (path, parent, mtime_ns))
+
+        # دمج الملفات والمجلدات الفرعية بالترتيب الطبيعي للاسم
+        entries = [(name, False) for name in names]
+        if recursive:
+            entries += [(os.path.basename(sub), True) for sub in subdirs]
+        entries.sort(key=lambda entry: natural_sort_key(entry[0]))
+
+        for name, is_dir in entries:
+            full_path = os.path.join(path, name)
+            if is_dir:
+                self._scan_dir(full_path, path, extensions, recursive, full, out)
+            elif extensions is None or os.path.splitext(name)[1].lower() in extensions:
+                out.append(Path(full_path))
+
+    def _refresh_dir(self, path: str) -> Tuple[List[str], List[str]]:
+        """إعادة سرد مجلد متغير وتحديث سجلات ملفاته"""
+        stored: Dict[str, Tuple[int, int]] = {
+            name: (size, mtime) for name, size, mtime in
+            self._db.execute('SELECT name, size, mtime_ns FROM files WHERE dir = ?', (path,))}
+
+        names, subdirs = [], []
+        try:
+            with os.scandir(path) as iterator:
+                for entry in iterator:
+                    # نوع المدخل من dirent دون stat إضافي
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                        continue
+                    if not entry.is_file():
+                        continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    self.stats['files_stat'] += 1
+                    names.append(entry.name)
+
+                    # الملف الجديد أو المتغير تُلغى بصمته المخزنة
+                    if stored.get(entry.name) != (st.st_size, st.st_mtime_ns):
+                        self._db.execute(
+                            'INSERT OR REPLACE INTO files (path, dir, name, size, mtime_ns, hash) '
+                            'VALUES (?, ?, ?, ?, ?, NULL)',
+                            (entry.path, path, entry.name, st.st_size, st.st_mtime_ns))
+        except OSError as e:
+            logger.warning(f"تعذرت قراءة المجلد {path}: {str(e)}")
+
+        current = set(names)
+
+        # حذف الملفات والمجلدات التي لم تعد موجودة
+        for name in set(stored) - current:
+            self._db.execute('DELETE FROM files WHERE path = ?', (os.path.join(path, name),))
+
+        known = {sub for (sub,) in
+                 self._db.execute('SELECT path FROM dirs WHERE parent = ?', (path,))}
+        for sub in known - set(subdirs):
+            self._forget_dir(sub)
+
+        # المجلدات الفرعية تُسجل حتى في الفحص غير المتكرر (دون تاريخ حتى تُسرد
+        # عند أول زيارة)، فيجدها الفحص المتكرر اللاحق الذي يستخدم محتوى الأب المخزن
+        for sub in set(subdirs) - known:
+            self._db.execute('INSERT INTO dirs (path, parent, mtime_ns) VALUES (?, ?, NULL) '
+                             'ON CONFLICT(path) DO UPDATE SET parent = excluded.parent',
+                             (sub, path))
+
+        return names, subdirs
+
+    def _forget_dir(self, path: str):
+        """حذف مجلد وكل ما تحته من الفهرس"""
+        prefix = path.rstrip(os.sep) + os.sep
+        self._db.execute('DELETE FROM dirs WHERE path = ? OR substr(path, 1, ?) = ?',
+                         (path, len(prefix), prefix))
+        self._db.execute('DELETE FROM files WHERE dir = ? OR substr(dir, 1, ?) = ?',
+                         (path, len(prefix), prefix))
+
+    def file_info(self, file_path: Union[str, Path]) -> Optional[Dict]:
+        """
+        بيانات ملف من الفهرس
+        Indexed size, mtime and hash of a file
+
+        Returns:
+            {'size', 'mtime_ns', 'hash'} أو None
+        """
+        row = self._db.execute('SELECT size, mtime_ns, hash FROM files WHERE path = ?',
+                               (os.path.abspath(file_path),)).fetchone()
+        if row is None:
+            return None
+        return {'size': row[0], 'mtime_ns': row[1], 'hash': row[2]}
+
+    def content_hash(self, file_path: Union[str, Path]) -> Optional[str]:
+        """
+        بصمة محتوى الملف (تُحسب مرة واحدة طالما لم يتغير الحجم والتاريخ)
+        Content hash of a file, computed once while size and mtime are unchanged
+
+        Args:
+            file_path: مسار الملف
+
+        Returns:
+            BLAKE2b بصيغة hex أو None إذا لم يوجد الملف
+        """
+        path = os.path.abspath(file_path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+
+        row = self._db.execute('SELECT size, mtime_ns, hash FROM files WHERE path = ?',
+                               (path,)).fetchone()
+        if row is not None and row[2] and (row[0], row[1]) == (st.st_size, st.st_mtime_ns):
+            return row[2]
+
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        content_hash = digest.hexdigest()
+
+        with self._db:
+            self._db.execute(
+                'INSERT OR REPLACE INTO files (path, dir, name, size, mtime_ns, hash) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (path, os.path.dirname(path), os.path.basename(path),
+                 st.st_size, st.st_mtime_ns, content_hash))
+        return content_hash
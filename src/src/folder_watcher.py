@@ -0,0 +1,395 @@
+"""
+مراقبة مجلد الإدخال ومعالجة الفصول الجديدة تلقائياً
+Watch-folder ingestion of new chapters and archives
+"""
+
+import logging
+import os
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from src.append_log import AppendOnlyLog
+from src.file_handler import natural_sort_key
+
+logger = logging.getLogger(__name__)
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify = None
+    logger.warning("لم يتم تثبيت inotify_simple - سيتم استخدام الفحص الدوري للمجلد")
+
+# (عدد الصفحات، الحجم الكلي، أحدث تاريخ تعديل)
+Signature = Tuple[int, int, int]
+
+
+class ProcessedLedger:
+    """
+    فئة سجل المدخلات المعالجة
+    Persistent ledger of processed inputs keyed by path and content signature
+
+    المدخل يُعتبر معالجاً إذا وُجد له سجل بنفس التوقيع، فإذا استُبدل الملف أو
+    أُضيفت صفحات إلى الفصل يتغير التوقيع ويُعالج من جديد. سجلات الفشل تحمل عدد
+    المحاولات حتى يُعاد المدخل بعد مهلة متزايدة
+    An input counts as processed when a record with the same signature exists;
+    replacing the file or adding pages to a chapter changes the signature. Failed
+    records carry an attempt count so the input is retried with backoff.
+    """
+
+    def __init__(self, ledger_path: Union[str, Path]):
+        """
+        Args:
+            ledger_path: مسار ملف السجل (JSON Lines)
+        """
+        self.log = AppendOnlyLog(ledger_path)
+        self.entries: Dict[str, Dict] = {}
+
+        # آخر سجل لكل مدخل هو المعتمد
+        for record in self.log.records():
+            self.entries[record['input']] = record
+
+        logger.info(f"تم تحميل {len(self.entries)} مدخل من سجل المعالجة")
+
+    def lookup(self, key: str, signature: Signature) -> Optional[Dict]:
+        """سجل المدخل إذا عولج بنفس التوقيع"""
+        record = self.entries.get(key)
+        if record is not None and tuple(record['signature']) == tuple(signature):
+            return record
+        return None
+
+    def record(self, key: str, signature: Signature, status: str, pages: int = 0,
+               attempts: int = 1):
+        """
+        تسجيل نتيجة معالجة مدخل
+        Append the outcome of processing one input
+
+        Args:
+            key: مسار المدخل
+            signature: توقيع المحتوى عند المعالجة
+            status: done أو failed
+            pages: عدد الصفحات المعالجة
+            attempts: عدد المحاولات المتتالية بنفس التوقيع
+        """
+        entry = {'input': key, 'signature': list(signature), 'status': status,
+                 'pages': pages, 'attempts': attempts, 'time': time.time()}
+        self.entries[key] = entry
+        self.log.append(entry)
+
+    def close(self):
+        self.log.close()
+
+
+class FolderWatcher:
+    """
+    فئة مراقبة مجلد الإدخال
+    Long-running watcher that feeds settled inputs to the pipeline
+
+    المدخلات هي العناصر في المستوى الأول من المجلد: ملفات (أرشيف، PDF، صورة)
+    ومجلدات فصول. المدخل يُرسل للمعالجة فقط بعد ثبات توقيعه لمدة settle_seconds
+    (أو إذا كان أحدث تعديل فيه أقدم من ذلك)، والمدخل المسجل في السجل بنفس
+    التوقيع لا يُعالج مرة أخرى، والمدخل الفاشل يُعاد بعد مهلة تتضاعف مع كل
+    محاولة حتى MAX_ATTEMPTS. مع inotify ينتظر المراقب الأحداث دون استهلاك
+    للمعالج، وبدونه يُفحص المستوى الأول فقط كل poll_interval ثانية والمدخلات
+    المعالجة غير المتغيرة لا تُفحص محتوياتها
+    Inputs are the top-level entries: files (archive, PDF, image) and chapter
+    folders. An input is handed to the pipeline only once its signature has been
+    stable for settle_seconds (or its newest mtime is already that old), and inputs
+    recorded in the ledger with the same signature are skipped; failed inputs are
+    retried after a delay that doubles per attempt, up to MAX_ATTEMPTS. With inotify the
+    watcher sleeps until something changes; otherwise it polls only the top level
+    and never re-walks handled inputs whose stat is unchanged.
+
+    مثال / Example:
+        watcher = FolderWatcher(DATA_DIR, translator.process_input, ledger_path,
+                                input_suffixes=('.cbz', '.pdf'), page_suffixes=('.jpg',))
+        watcher.run()
+    """
+
+    # ملفات قيد التنزيل أو النسخ
+    PARTIAL_SUFFIXES = ('.part', '.partial', '.tmp', '.crdownload', '.download', '.!qb')
+
+    # فحص احتياطي دوري حتى مع inotify (بالثواني)
+    IDLE_RESCAN = 60.0
+
+    # إعادة المدخلات الفاشلة: المهلة الأولى والقصوى (بالثواني) وأقصى عدد محاولات
+    RETRY_DELAY = 60.0
+    RETRY_MAX_DELAY = 3600.0
+    MAX_ATTEMPTS = 5
+
+    def __init__(self, root: Union[str, Path], handler: Callable[[Path], int],
+                 ledger_path: Union[str, Path], input_suffixes: Sequence[str],
+                 page_suffixes: Sequence[str], settle_seconds: float = 5.0,
+                 poll_interval: float = 2.0, use_inotify: bool = True):
+        """
+        Args:
+            root: المجلد المراقب
+            handler: دالة المعالجة، تُرجع عدد الصفحات المعالجة
+            ledger_path: مسار سجل المدخلات المعالجة
+            input_suffixes: صيغ الملفات المقبولة في المستوى الأول
+            page_suffixes: صيغ صفحات مجلدات الفصول
+            settle_seconds: مدة الثبات المطلوبة قبل المعالجة
+            poll_interval: الفاصل الزمني للفحص الدوري
+            use_inotify: استخدام inotify إذا توفر
+        """
+        self.root = Path(root).resolve()
+        self.handler = handler
+        self.ledger = ProcessedLedger(ledger_path)
+        self.input_suffixes = tuple(ext.lower() for ext in input_suffixes)
+        self.page_suffixes = tuple(ext.lower() for ext in page_suffixes)
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+
+        # المدخلات قيد الانتظار: المسار -> (التوقيع، وقت أول ظهور له)
+        self._pending: Dict[str, Tuple[Signature, float]] = {}
+        # نتيجة stat للمدخلات التي تم التعامل معها
+        self._handled: Dict[str, Tuple[int, int]] = {}
+        self._queue = deque()
+        self._queued = set()
+        self._stopped = False
+
+        self._inotify = None
+        self._watches: Dict[str, int] = {}
+        if use_inotify and INotify is not None:
+            try:
+                self._inotify = INotify()
+                self._watch(self.root)
+            except OSError as e:
+                logger.warning(f"تعذر تشغيل inotify، سيتم استخدام الفحص الدوري: {str(e)}")
+                self._inotify = None
+
+        # إحصائيات المراقبة
+        self.stats = {'scans': 0, 'processed': 0, 'failed': 0, 'skipped': 0}
+
+    def _watch(self, path: Path):
+        """إضافة مراقبة inotify لمجلد"""
+        if self._inotify is None or str(path) in self._watches:
+            return
+        mask = (inotify_flags.CREATE | inotify_flags.MOVED_TO | inotify_flags.MOVED_FROM |
+                inotify_flags.CLOSE_WRITE | inotify_flags.MODIFY | inotify_flags.DELETE)
+        self._watches[str(path)] = self._inotify.add_watch(str(path), mask)
+
+    def _is_partial(self, name: str) -> bool:
+        return name.startswith('.') or name.lower().endswith(self.PARTIAL_SUFFIXES)
+
+    def _candidates(self) -> List[Tuple[Path, bool, Tuple[int, int]]]:
+        """عناصر المستوى الأول المقبولة: (المسار، هل هو مجلد، (التاريخ، الحجم))"""
+        candidates = []
+        try:
+            with os.scandir(self.root) as iterator:
+                entries = sorted(iterator, key=lambda entry: natural_sort_key(entry.name))
+        except OSError as e:
+            logger.error(f"خطأ في قراءة مجلد المراقبة: {str(e)}")
+            return candidates
+
+        for entry in entries:
+            if self._is_partial(entry.name):
+                continue
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if not is_dir and os.path.splitext(entry.name)[1].lower() not in self.input_suffixes:
+                    continue
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            candidates.append((Path(entry.path), is_dir, (st.st_mtime_ns, st.st_size)))
+
+        return candidates
+
+    def signature(self, path: Path, is_dir: bool) -> Optional[Signature]:
+        """
+        توقيع محتوى المدخل
+        Content signature of an input: (pages, total size, newest mtime)
+
+        صفحات مجلد الفصل تُعد في مستواه الأول فقط، كما تعالجها process_folder
+        Chapter pages are counted at the folder's top level only, matching the
+        non-recursive scan in process_folder.
+
+        Returns:
+            التوقيع، أو None إذا لم يكن جاهزاً (فصل فارغ أو ملف قيد التنزيل)
+        """
+        try:
+            if not is_dir:
+                st = path.stat()
+                return 1, st.st_size, st.st_mtime_ns
+
+            # تواريخ كل الملفات تدخل في التوقيع حتى تؤجل الكتابة الجارية المعالجة
+            pages, size, newest = 0, 0, path.stat().st_mtime_ns
+            with os.scandir(path) as iterator:
+                for entry in iterator:
+                    if entry.name.lower().endswith(self.PARTIAL_SUFFIXES):
+                        return None
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                    newest = max(newest, st.st_mtime_ns)
+                    size += st.st_size
+                    if os.path.splitext(entry.name)[1].lower() in self.page_suffixes:
+                        pages += 1
+
+            return (pages, size, newest) if pages else None
+
+        except OSError:
+            return None
+
+    def scan(self) -> List[Tuple[Path, Signature]]:
+        """
+        فحص المجلد وإرجاع المدخلات الجاهزة للمعالجة
+        Check the top level once and return newly settled inputs in natural order
+        """
+        self.stats['scans'] += 1
+        now, wall = time.monotonic(), time.time_ns()
+        settle_ns = int(self.settle_seconds * 1e9)
+        ready, seen = [], set()
+
+        for path, is_dir, quick in self._candidates():
+            key = str(path)
+            seen.add(key)
+            if is_dir:
+                self._watch(path)
+
+            # مدخل تم التعامل معه ولم يتغير: لا حاجة لفحص محتوياته
+            if self._handled.get(key) == quick or key in self._queued:
+                continue
+
+            signature = self.signature(path, is_dir)
+            if signature is None:
+                self._pending.pop(key, None)
+                continue
+
+            record = self.ledger.lookup(key, signature)
+            if record is not None and not self._retry_due(record):
+                self._pending.pop(key, None)
+                if record['status'] != 'failed':
+                    self.stats['skipped'] += 1
+                    self._handled[key] = quick
+                elif record.get('attempts', 1) >= self.MAX_ATTEMPTS:
+                    # استنفد المحاولات: لا يُفحص مجدداً حتى يتغير
+                    self._handled[key] = quick
+                # المدخل الفاشل يُفحص مجدداً حتى يحين موعد إعادته
+                continue
+
+            previous = self._pending.get(key)
+            settled = (wall - signature[2] >= settle_ns or
+                       (previous is not None and previous[0] == signature and
+                        now - previous[1] >= self.settle_seconds))
+
+            if not settled:
+                if previous is None or previous[0] != signature:
+                    self._pending[key] = (signature, now)
+                continue
+
+            self._pending.pop(key, None)
+            self._handled[key] = quick
+            ready.append((path, signature))
+
+        # نسيان المدخلات المحذوفة
+        for key in [key for key in self._handled if key not in seen]:
+            del self._handled[key]
+        for key in [key for key in self._pending if key not in seen]:
+            del self._pending[key]
+
+        return ready
+
+    def _retry_due(self, record: Dict) -> bool:
+        """هل حان موعد إعادة مدخل فاشل؟"""
+        if record['status'] != 'failed':
+            return False
+        attempts = record.get('attempts', 1)
+        if attempts >= self.MAX_ATTEMPTS:
+            return False
+        delay = min(self.RETRY_DELAY * 2 ** (attempts - 1), self.RETRY_MAX_DELAY)
+        return time.time() - record['time'] >= delay
+
+    def process_next(self) -> bool:
+        """
+        معالجة أول مدخل في الطابور وتسجيله
+        Process the oldest queued input and record it in the ledger
+
+        Returns:
+            False إذا كان الطابور فارغاً
+        """
+        if not self._queue:
+            return False
+
+        path, signature = self._queue.popleft()
+        self._queued.discard(str(path))
+        logger.info(f"معالجة مدخل جديد: {path}")
+
+        try:
+            pages = self.handler(path)
+        except Exception as e:
+            logger.error(f"خطأ في معالجة المدخل {path}: {str(e)}")
+            pages = 0
+
+        # المدخل الفاشل يُعاد بعد مهلة، أو فوراً إذا تغير محتواه
+        status = 'done' if pages > 0 else 'failed'
+        previous = self.ledger.lookup(str(path), signature)
+        attempts = 1
+        if status == 'failed' and previous is not None and previous['status'] == 'failed':
+            attempts = previous.get('attempts', 1) + 1
+        self.ledger.record(str(path), signature, status, pages, attempts)
+        if status == 'failed' and attempts >= self.MAX_ATTEMPTS:
+            logger.error(f"فشلت معالجة المدخل {attempts} مرات، لن يُعاد حتى يتغير: {path}")
+        self.stats['processed' if pages > 0 else 'failed'] += 1
+        return True
+
+    def _wait(self):
+        """انتظار تغيير في المجلد أو انتهاء مهلة الثبات"""
+        timeout = self.settle_seconds if self._pending else self.IDLE_RESCAN
+
+        if self._inotify is None:
+            time.sleep(min(timeout, self.poll_interval))
+            return
+
+        events = self._inotify.read(timeout=int(timeout * 1000))
+        # حذف مراقبات المجلدات المحذوفة
+        if any(event.mask & inotify_flags.IGNORED for event in events):
+            removed = {event.wd for event in events if event.mask & inotify_flags.IGNORED}
+            self._watches = {path: wd for path, wd in self._watches.items() if wd not in removed}
+
+    def run(self, once: bool = False):
+        """
+        تشغيل المراقبة حتى الإيقاف
+        Watch and process until stop() or Ctrl+C
+
+        Args:
+            once: فحص ومعالجة واحدة فقط (للتشغيل من مجدول المهام)
+        """
+        logger.info(f"مراقبة المجلد: {self.root} "
+                     f"({'inotify' if self._inotify is not None else 'فحص دوري'})")
+        try:
+            while not self._stopped:
+                for path, signature in self.scan():
+                    self._queue.append((path, signature))
+                    self._queued.add(str(path))
+
+                while self.process_next():
+                    if self._stopped:
+                        break
+
+                if once:
+                    break
+                self._wait()
+
+        except KeyboardInterrupt:
+            logger.info("تم إيقاف المراقبة")
+        finally:
+            self.close()
+
+        logger.info(f"إحصائيات المراقبة: {self.stats}")
+
+    def stop(self):
+        """
+        إيقاف المراقبة بعد المدخل الحالي
+        Stop after the current input; an idle inotify wait ends at its next wake-up
+        """
+        self._stopped = True
+
+    def close(self):
+        """إغلاق inotify والسجل"""
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+        self.ledger.close()
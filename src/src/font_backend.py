@@ -0,0 +1,385 @@
+"""
+رسم النصوص العربية بخطوط TrueType عبر Pillow/FreeType
+FreeType text backend with right-to-left shaping and a shaped-run cache
+"""
+
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from src.text_layout import wrap_words
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image, ImageDraw, ImageFont, features
+    _HAS_RAQM = features.check('raqm')
+except ImportError:
+    ImageFont = None
+    _HAS_RAQM = False
+    logger.warning("لم يتم تثبيت Pillow - الخطوط العربية لن تعمل")
+
+# بديل التشكيل عند عدم توفر libraqm
+try:
+    import arabic_reshaper
+    from bidi.algorithm import get_display
+except ImportError:
+    arabic_reshaper = None
+    get_display = None
+
+
+class GlyphRun:
+    """
+    كلمة مُشكّلة ومُرسّمة جاهزة للنسخ
+    A shaped, rasterized word ready to be blitted
+
+    الصورة قناع ألفا (uint8) وإزاحتها نسبة إلى القلم على خط الأساس
+    The bitmap is an alpha mask positioned relative to the pen on the baseline.
+    """
+
+    __slots__ = ('alpha', 'left', 'top', 'advance')
+
+    def __init__(self, alpha: np.ndarray, left: int, top: int, advance: int):
+        self.alpha = alpha
+        self.left = left
+        self.top = top
+        self.advance = advance
+
+
+class FreeTypeTextBackend:
+    """
+    واجهة رسم بخط TrueType مع تشكيل من اليمين إلى اليسار
+    TrueType renderer with RTL shaping, usable as layout metrics
+
+    كل كلمة تُشكّل وتُرسّم مرة واحدة لكل حجم وتُحفظ في ذاكرة LRU، فالكلمات
+    المتكررة تُنسخ فقط. التشكيل العربي لا يعبر المسافات لذا الكلمة هي وحدة التخزين.
+    القياس للتخطيط يستخدم getlength دون ترسيم، وعلى نفس الأجزاء المُشكّلة التي
+    تُرسم، فعرض السطر المقاس يساوي عرضه المرسوم
+    Each word is shaped and rasterized once per size and kept in an LRU cache, so
+    repeated words are only blitted. Arabic joining never crosses a space, which
+    makes the word the natural cache unit. Layout measures with getlength without
+    rasterizing, over the same shaped pieces that are drawn, so a measured line
+    is exactly as wide as the drawn one.
+
+    ترتيب الكلمات في السطر يتبع خوارزمية الاتجاه ثنائي الاتجاه: مع libraqm
+    يُرسم السطر كاملاً، وبدونه يُطبق get_display على السطر بعد التشكيل، لذا
+    الأرقام والنصوص اللاتينية داخل السطر العربي تبقى بترتيبها الصحيح
+    Word order follows the Unicode bidi algorithm: with libraqm the whole line is
+    shaped at once, otherwise get_display runs on the reshaped line, so numbers
+    and Latin text inside an Arabic line keep their order.
+    """
+
+    def __init__(self, font_path, rtl: bool = True, max_runs: int = 20000):
+        """
+        Args:
+            font_path: مسار ملف الخط (.ttf أو .otf)
+            rtl: هل اتجاه الكتابة من اليمين إلى اليسار
+            max_runs: أقصى عدد من الكلمات المرسّمة المخزنة
+        """
+        self.font_path = str(font_path) if font_path else None
+        self.rtl = rtl
+        self.max_runs = max_runs
+
+        self._fonts: Dict[int, "ImageFont.FreeTypeFont"] = {}
+        self._runs: "OrderedDict[Hashable, GlyphRun]" = OrderedDict()
+        self._advances: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._space: Dict[int, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+        self.available = False
+        if ImageFont is None or not self.font_path:
+            return
+        if not Path(self.font_path).exists():
+            logger.warning(f"ملف الخط غير موجود: {self.font_path}")
+            return
+
+        try:
+            self._font(14)
+            self.available = True
+            logger.info(f"تم تحميل الخط: {self.font_path} (raqm: {_HAS_RAQM})")
+        except Exception as e:
+            logger.error(f"خطأ في تحميل الخط: {str(e)}")
+            return
+
+        if rtl and not _HAS_RAQM and arabic_reshaper is None:
+            logger.warning("لا يتوفر libraqm ولا arabic-reshaper/python-bidi - "
+                           "الحروف العربية لن تتصل بشكل صحيح")
+
+    def is_available(self) -> bool:
+        """هل تم تحميل الخط بنجاح؟"""
+        return self.available
+
+    def _font(self, size: int) -> "ImageFont.FreeTypeFont":
+        """الخط بحجم معين (بالبكسل)"""
+        font = self._fonts.get(size)
+        if font is None:
+            engine = ImageFont.Layout.RAQM if _HAS_RAQM else ImageFont.Layout.BASIC
+            font = ImageFont.truetype(self.font_path, size, layout_engine=engine)
+            self._fonts[size] = font
+        return font
+
+    def _shape(self, word: str, visual: bool = False) -> Tuple[str, Optional[str]]:
+        """
+        تجهيز الكلمة للرسم
+        Prepare a word for drawing
+
+        Args:
+            word: الكلمة
+            visual: هل الكلمة مُشكّلة ومرتبة مرئياً مسبقاً
+
+        Returns:
+            (النص، الاتجاه الممرر إلى Pillow)
+        """
+        if not self.rtl or visual:
+            return word, None
+        if _HAS_RAQM:
+            # libraqm يقوم بالتشكيل وترتيب الاتجاه بنفسه
+            return word, 'rtl'
+        if arabic_reshaper is not None:
+            return get_display(arabic_reshaper.reshape(word)), None
+        return word, None
+
+    def advance(self, word: str, size: int, visual: bool = False) -> int:
+        """
+        عرض الكلمة المُشكّلة دون ترسيمها (مع التخزين)
+        Advance width of a shaped word, measured without rasterizing
+
+        Args:
+            word: الكلمة
+            size: حجم الخط بالبكسل
+            visual: هل الكلمة مُشكّلة ومرتبة مرئياً مسبقاً
+
+        Returns:
+            العرض بالبكسل
+        """
+        key = (size, word, visual)
+        width = self._advances.get(key)
+        if width is not None:
+            self._advances.move_to_end(key)
+            return width
+
+        text, direction = self._shape(word, visual)
+        width = int(round(self._font(size).getlength(text, direction=direction)))
+        self._advances[key] = width
+        if len(self._advances) > self.max_runs:
+            self._advances.popitem(last=False)
+        return width
+
+    def run(self, word: str, size: int, visual: bool = False) -> GlyphRun:
+        """
+        الكلمة المُشكّلة والمُرسّمة (مع التخزين)
+        Shaped and rasterized word, cached
+
+        Args:
+            word: الكلمة
+            size: حجم الخط بالبكسل
+            visual: هل الكلمة مُشكّلة ومرتبة مرئياً مسبقاً
+
+        Returns:
+            الكلمة المرسّمة
+        """
+        key = (size, word, visual)
+        glyph_run = self._runs.get(key)
+
+        if glyph_run is not None:
+            self.hits += 1
+            self._runs.move_to_end(key)
+            return glyph_run
+
+        self.misses += 1
+        font = self._font(size)
+        text, direction = self._shape(word, visual)
+
+        left, top, right, bottom = font.getbbox(text, anchor='ls', direction=direction)
+        advance = self.advance(word, size, visual)
+
+        bitmap = Image.new('L', (max(1, right - left), max(1, bottom - top)), 0)
+        ImageDraw.Draw(bitmap).text((-left, -top), text, fill=255, font=font,
+                                    anchor='ls', direction=direction)
+
+        glyph_run = GlyphRun(np.asarray(bitmap), left, top, advance)
+        self._runs[key] = glyph_run
+        if len(self._runs) > self.max_runs:
+            self._runs.popitem(last=False)
+        return glyph_run
+
+    def visual_order(self, line: str) -> Tuple[List[str], bool]:
+        """
+        أجزاء السطر بترتيب رسمها من اليسار إلى اليمين
+        Pieces of a line in left-to-right drawing order
+
+        Args:
+            line: السطر بالترتيب المنطقي
+
+        Returns:
+            (الأجزاء، هل هي مُشكّلة ومرتبة مرئياً مسبقاً)
+        """
+        words = line.split()
+        if not self.rtl or not words:
+            return words, False
+        if _HAS_RAQM:
+            # libraqm يطبق خوارزمية الاتجاه على السطر كاملاً
+            return [' '.join(words)], False
+        if get_display is not None:
+            return get_display(arabic_reshaper.reshape(' '.join(words))).split(), True
+
+        # بدون أي من المكتبتين: عكس ترتيب الكلمات فقط
+        words.reverse()
+        return words, False
+
+    def _line_runs(self, line: str, size: int) -> List[GlyphRun]:
+        """الأجزاء المرسّمة للسطر بترتيبها المرئي"""
+        pieces, visual = self.visual_order(line)
+        return [self.run(piece, size, visual) for piece in pieces]
+
+    # ---------- مقاييس التخطيط (نفس واجهة HersheyMetrics) ----------
+
+    def space_width(self, size: int) -> int:
+        """عرض المسافة"""
+        if size not in self._space:
+            self._space[size] = int(round(self._font(size).getlength(' ')))
+        return self._space[size]
+
+    def wrap(self, text: str, max_width: int, size: int) -> List[str]:
+        """
+        تقسيم النص إلى سطور بعروض الأجزاء المرسومة
+        Wrap text using the widths of the pieces that will be drawn
+
+        مع libraqm يُشكّل السطر كاملاً كجزء واحد، فيُقاس كل سطر مرشح كما هو
+        بدلاً من جمع عروض كلماته
+        With libraqm the whole line is a single shaped piece, so each candidate
+        line is measured as such instead of summing word widths.
+        """
+        words = text.split()
+        if not (self.rtl and _HAS_RAQM):
+            return wrap_words(words, max_width, lambda word: self.line_width(word, size),
+                              self.space_width(size))
+
+        lines: List[str] = []
+        current: List[str] = []
+        for word in words:
+            if current and self.line_width(' '.join(current + [word]), size) > max_width:
+                lines.append(' '.join(current))
+                current = []
+            current.append(word)
+        if current:
+            lines.append(' '.join(current))
+        return lines
+
+    def line_width(self, line: str, size: int) -> int:
+        """عرض السطر كما يُرسم (بنفس أجزاء draw_line)"""
+        pieces, visual = self.visual_order(line)
+        if not pieces:
+            return 0
+        return (sum(self.advance(piece, size, visual) for piece in pieces) +
+                (len(pieces) - 1) * self.space_width(size))
+
+    def line_height(self, size: int) -> int:
+        """ارتفاع السطر (الصعود مع النزول)"""
+        ascent, descent = self._font(size).getmetrics()
+        return ascent + descent
+
+    def ascent(self, size: int) -> int:
+        """المسافة من أعلى السطر إلى خط الأساس"""
+        return self._font(size).getmetrics()[0]
+
+    # ---------- الرسم ----------
+
+    def draw_line(self, image: np.ndarray, line: str, x: int, baseline: int,
+                  size: int, color: Tuple) -> np.ndarray:
+        """
+        رسم سطر بنسخ الكلمات المخزنة
+        Draw a line by blitting cached word runs
+
+        في الاتجاه من اليمين إلى اليسار تبدأ الكلمة الأولى من الطرف الأيمن
+        (مع الحفاظ على ترتيب الأرقام والنصوص اللاتينية)
+        For RTL text the first word starts at the right edge of the line, with
+        numbers and Latin runs kept in order by the bidi algorithm.
+
+        Args:
+            image: الصورة الهدف (رمادية أو BGR)
+            line: السطر بالترتيب المنطقي
+            x: الطرف الأيسر للسطر
+            baseline: موضع خط الأساس
+            size: حجم الخط بالبكسل
+            color: اللون بعدد قنوات الصورة
+
+        Returns:
+            الصورة بعد الرسم
+        """
+        runs = self._line_runs(line, size)
+        space = self.space_width(size)
+
+        pen = x
+        for glyph_run in runs:
+            self._blit(image, glyph_run, pen, baseline, color)
+            pen += glyph_run.advance + space
+
+        return image
+
+    def rasterize_line(self, layer: np.ndarray, line: str, x: int, baseline: int,
+                       size: int) -> np.ndarray:
+        """
+        رسم تغطية السطر في طبقة ألفا (uint8) دون لمس الصورة
+        Accumulate the line coverage into a uint8 alpha layer
+
+        Args:
+            layer: طبقة الألفا
+            line: السطر بالترتيب المنطقي
+            x: الطرف الأيسر للسطر
+            baseline: موضع خط الأساس
+            size: حجم الخط بالبكسل
+
+        Returns:
+            الطبقة بعد الرسم
+        """
+        runs = self._line_runs(line, size)
+        space = self.space_width(size)
+
+        pen = x
+        for glyph_run in runs:
+            clip = self._clip(layer.shape, glyph_run, pen, baseline)
+            if clip is not None:
+                target, source = clip
+                np.maximum(layer[target], glyph_run.alpha[source], out=layer[target])
+            pen += glyph_run.advance + space
+
+        return layer
+
+    @staticmethod
+    def _clip(shape, glyph_run: GlyphRun, pen_x: int, baseline: int):
+        """شرائح الهدف والمصدر بعد القص عند حدود الصورة (أو None)"""
+        h, w = glyph_run.alpha.shape
+        x0, y0 = pen_x + glyph_run.left, baseline + glyph_run.top
+
+        cx0, cy0 = max(0, x0), max(0, y0)
+        cx1, cy1 = min(shape[1], x0 + w), min(shape[0], y0 + h)
+        if cx1 <= cx0 or cy1 <= cy0:
+            return None
+
+        return ((slice(cy0, cy1), slice(cx0, cx1)),
+                (slice(cy0 - y0, cy1 - y0), slice(cx0 - x0, cx1 - x0)))
+
+    @classmethod
+    def _blit(cls, image: np.ndarray, glyph_run: GlyphRun, pen_x: int, baseline: int,
+              color: Tuple):
+        """مزج قناع الكلمة في الصورة مع القص عند الحواف"""
+        clip = cls._clip(image.shape, glyph_run, pen_x, baseline)
+        if clip is None:
+            return
+
+        target, source = clip
+        alpha = glyph_run.alpha[source].astype(np.float32) / 255.0
+        roi = image[target]
+        ink = np.asarray(color, dtype=np.float32)
+
+        if roi.ndim == 3:
+            alpha = alpha[:, :, None]
+        else:
+            ink = ink[0]
+
+        roi[...] = (roi * (1.0 - alpha) + ink * alpha + 0.5).astype(image.dtype)
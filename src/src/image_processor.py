@@ -3,12 +3,18 @@
 Image and bubble processor module
 """
 
+import os
 import cv2
 import numpy as np
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 import logging
 
+from src.artifact_cache import file_identity
+from src.bubble_detectors import create_detector
+from src.data_model import Bubble, PageTransform
+from src.rle_mask import RLEMask
+
 logger = logging.getLogger(__name__)
 
 
@@ -18,16 +24,66 @@ class ImageProcessor:
     Class for processing images and speech bubbles
     """
     
-    def __init__(self):
-        """تهيئة معالج الصور"""
+    # يُرفع عند تغيير منطق الكشف لإبطال النتائج المخزنة
+    CACHE_VERSION = 1
+    
+    def __init__(self, detector_backend: str = 'contour',
+                 detector_options: Optional[Dict] = None):
+        """
+        تهيئة معالج الصور
+        Initialize image processor
+        
+        Args:
+            detector_backend: اسم واجهة كشف الفقاعات (contour, onnx)
+            detector_options: معاملات الواجهة - اختياري
+        """
         logger.info("تهيئة معالج الصور...")
         self.min_bubble_area = 100  # الحد الأدنى لمساحة الفقاعة
         
+        # واجهة كشف الفقاعات
+        self.detector = None
+        self.set_detector(detector_backend, **(detector_options or {}))
+        
+        # إعدادات مسار الصور الرمادية
+        self.auto_grayscale = True  # تحويل الصفحات الرمادية إلى قناة واحدة
+        self.grayscale_tolerance = 8  # أقصى فرق مسموح بين القنوات
+        self.grayscale_color_ratio = 0.001  # أقصى نسبة من البكسلات الملونة
+        
+        # البصمة الإدراكية لآخر صورة محملة
+        self.compute_hash_on_load = True
+        self.last_image_hash: Optional[int] = None
+        
+        # أقصى بُعد لصورة العمل المستخدمة في الكشف و OCR
+        self.working_max_side = 2048
+        
+        # إعدادات تصحيح التشوهات التكيفي
+        self.noise_threshold = 2.0  # مستوى الضوضاء الذي يستدعي التصحيح
+        self.quality_sample_size = 512  # أقصى بُعد للعينة المستخدمة في التقدير
+        self.distortion_filter_diameter = 5  # قطر المرشح (أسرع من 9)
+        
+        # إعدادات تصحيح الميل
+        self.deskew_tolerance = 0.5  # أقل زاوية (بالدرجات) تستدعي التدوير
+        self.deskew_max_angle = 10.0  # أقصى زاوية يتم البحث عنها
+        self.deskew_sample_size = 800  # أقصى بُعد للصورة المصغرة
+        self.deskew_max_points = 40000  # أقصى عدد من بكسلات النص في التقدير
+        self.last_skew_angle = 0.0
+        
+        # إحصائيات المعالجة
+        self.processing_stats = {
+            'distortion_applied': 0,
+            'distortion_skipped': 0,
+            'deskew_applied': 0,
+            'deskew_skipped': 0,
+        }
+        
     def load_image(self, image_path: str) -> Optional[np.ndarray]:
         """
         تحميل الصورة
         Load image from file
         
+        الصفحات الرمادية تُعاد كمصفوفة uint8 بقناة واحدة، والملونة بصيغة BGR
+        Grayscale pages are returned single-channel, colored pages as BGR
+        
         Args:
             image_path: مسار الصورة
             
@@ -35,54 +91,229 @@ class ImageProcessor:
             الصورة أو None إذا فشل التحميل
         """
         try:
-            image = cv2.imread(image_path)
+            image = cv2.imread(image_path, cv2.IMREAD_ANYCOLOR)
             if image is None:
                 logger.error(f"فشل تحميل الصورة: {image_path}")
                 return None
+            image = self.prepare_image(image)
             logger.info(f"تم تحميل الصورة بنجاح: {image_path}")
             return image
         except Exception as e:
             logger.error(f"خطأ في تحميل الصورة: {str(e)}")
             return None
     
-    def detect_bubbles(self, image: np.ndarray) -> List[Tuple[int, int, int, int]]:
+    def decode_image(self, data: bytes, name: str = '') -> Optional[np.ndarray]:
         """
-        كشف الفقاعات في الصورة
-        Detect speech bubbles in the image
+        فك ترميز صورة من الذاكرة
+        Decode an image from in-memory bytes (e.g. an archive member)
         
         Args:
-            image: الصورة المدخلة
+            data: بايتات الملف المضغوط (PNG/JPEG/WebP)
+            name: اسم الصفحة للسجل - اختياري
             
         Returns:
-            قائمة بإحداثيات الفقاعات (x, y, w, h)
+            الصورة أو None إذا فشل فك الترميز
         """
         try:
-            logger.info("جاري كشف الفقاعات...")
+            image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_ANYCOLOR)
+            if image is None:
+                logger.error(f"فشل فك ترميز الصورة: {name}")
+                return None
+            return self.prepare_image(image)
+        except Exception as e:
+            logger.error(f"خطأ في فك ترميز الصورة: {str(e)}")
+            return None
+    
+    def prepare_image(self, image: np.ndarray) -> np.ndarray:
+        """
+        تجهيز صورة محملة من أي مصدر (ملف، أرشيف، PDF)
+        Normalize channels and compute the page hash for an already decoded image
+        
+        Args:
+            image: الصورة (BGR أو BGRA أو رمادية)
+            
+        Returns:
+            الصورة بعد توحيد القنوات
+        """
+        image = self._normalize_channels(image)
+        if self.compute_hash_on_load:
+            self.last_image_hash = self.compute_perceptual_hash(image)
+        return image
+    
+    def _normalize_channels(self, image: np.ndarray) -> np.ndarray:
+        """
+        تحويل الصور الرمادية المخزنة بثلاث قنوات إلى قناة واحدة
+        Collapse grayscale content stored as BGR to a single channel
+        
+        Args:
+            image: الصورة المحملة
+            
+        Returns:
+            الصورة بقناة واحدة أو ثلاث قنوات
+        """
+        if image.ndim == 3 and image.shape[2] == 4:
+            image = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+        
+        if self.auto_grayscale and image.ndim == 3 and self.is_grayscale_content(image):
+            return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        
+        return image
+    
+    def is_grayscale_content(self, image: np.ndarray) -> bool:
+        """
+        هل محتوى الصورة رمادي رغم تخزينها بثلاث قنوات؟
+        Check whether a BGR image is actually grayscale
+        
+        Args:
+            image: الصورة المدخلة
+            
+        Returns:
+            True إذا كانت القنوات متطابقة تقريباً
+        """
+        if image.ndim == 2:
+            return True
+        
+        step = max(1, max(image.shape[:2]) // self.quality_sample_size)
+        sample = image[::step, ::step].astype(np.int16)
+        
+        # الفرق الأقصى بين القنوات لكل بكسل
+        spread = sample.max(axis=2) - sample.min(axis=2)
+        colored = np.count_nonzero(spread > self.grayscale_tolerance)
+        
+        return colored <= self.grayscale_color_ratio * spread.size
+    
+    def compute_perceptual_hash(self, image: np.ndarray) -> int:
+        """
+        حساب البصمة الإدراكية (pHash) للصورة
+        Compute a 64-bit DCT perceptual hash
+        
+        Args:
+            image: الصورة المدخلة
             
-            # تحويل إلى رمادي
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        Returns:
+            البصمة كعدد صحيح من 64 بت
+        """
+        small = cv2.resize(self.to_gray(image), (32, 32), interpolation=cv2.INTER_AREA)
+        dct = cv2.dct(small.astype(np.float32))[:8, :8]
+        
+        # مقارنة المعاملات بالوسيط مع استبعاد المركبة الثابتة
+        bits = (dct > np.median(dct.flatten()[1:])).flatten()
+        return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+    
+    @staticmethod
+    def to_gray(image: np.ndarray) -> np.ndarray:
+        """
+        الحصول على نسخة رمادية دون نسخ الصور الرمادية أصلاً
+        Get a grayscale view, without copying single-channel images
+        
+        Args:
+            image: الصورة المدخلة
             
-            # تطبيق عتبة ثنائية
-            _, binary = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY)
+        Returns:
+            صورة بقناة واحدة
+        """
+        if image.ndim == 2:
+            return image
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    
+    def set_detector(self, backend: str, **options):
+        """
+        اختيار واجهة كشف الفقاعات
+        Select the bubble detector backend
+        
+        Args:
+            backend: اسم الواجهة (contour, onnx)
+            **options: معاملات الواجهة
+        """
+        if backend == 'contour':
+            options.setdefault('min_bubble_area', self.min_bubble_area)
+        
+        try:
+            detector = create_detector(backend, **options)
+        except Exception as e:
+            # خيارات ناقصة أو خاطئة (مثل onnx بدون model_path)
+            logger.error(f"خطأ في إنشاء واجهة الكشف {backend}: {str(e)}")
+            detector = None
+        
+        if detector is None or not detector.is_available():
+            logger.warning(f"واجهة الكشف {backend} غير متاحة - استخدام contour")
+            options = {'min_bubble_area': self.min_bubble_area}
+            detector = create_detector('contour', **options)
+        
+        self.detector = detector
+        self.detector_options = options
+        logger.info(f"واجهة كشف الفقاعات: {detector.name}")
+    
+    def cache_fingerprint(self) -> Dict:
+        """
+        إعدادات الكشف التي تؤثر على نتائجه (لمفاتيح ذاكرة المراحل)
+        Settings that determine detection output, used for artifact cache keys
+        """
+        options = dict(self.detector_options)
+        if options.get('model_path'):
+            options['model_file'] = file_identity(options['model_path'])
+        return {
+            'version': self.CACHE_VERSION,
+            'detector': self.detector.name,
+            'options': options,
+            'working_max_side': self.working_max_side,
+        }
+    
+    def preprocess_fingerprint(self) -> Dict:
+        """إعدادات تصحيح التشوهات المطبقة قبل OCR"""
+        return {
+            'noise_threshold': self.noise_threshold,
+            'quality_sample_size': self.quality_sample_size,
+            'distortion_filter_diameter': self.distortion_filter_diameter,
+        }
+    
+    def detect_bubbles(self, image: np.ndarray) -> List[Bubble]:
+        """
+        كشف الفقاعات في الصورة
+        Detect speech bubbles in the image
+        
+        Args:
+            image: الصورة المدخلة
             
-            # إيجاد الحدود
-            contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        Returns:
+            قائمة الفقاعات (تُفكك كـ x, y, w, h)
+        """
+        return self.detect_bubbles_batch([image])[0]
+    
+    def detect_bubbles_batch(self, images: List[np.ndarray]) -> List[List[Bubble]]:
+        """
+        كشف الفقاعات في مجموعة صور دفعة واحدة
+        Detect speech bubbles in a batch of images
+        
+        Args:
+            images: قائمة الصور
             
-            bubbles = []
-            for contour in contours:
-                area = cv2.contourArea(contour)
-                
-                # تصفية الفقاعات الصغيرة جداً
-                if area > self.min_bubble_area:
-                    x, y, w, h = cv2.boundingRect(contour)
-                    bubbles.append((x, y, w, h))
+        Returns:
+            قائمة الفقاعات لكل صورة
+        """
+        try:
+            logger.info(f"جاري كشف الفقاعات في {len(images)} صورة...")
             
-            logger.info(f"تم كشف {len(bubbles)} فقاعة")
-            return bubbles
+            results = []
+            for image, detections in zip(images, self.detector.detect_batch(images)):
+                bubbles = []
+                for detection in detections:
+                    x, y, w, h = detection['bbox']
+                    
+                    # تخزين القناع مرمزاً بدلاً من مصفوفة كثيفة لكل فقاعة
+                    mask = detection['mask']
+                    if mask is not None:
+                        mask = RLEMask.encode(mask, (x, y), image.shape[:2])
+                    
+                    bubbles.append(Bubble(x, y, w, h, detection['confidence'], mask))
+                results.append(bubbles)
+            
+            logger.info(f"تم كشف {sum(len(r) for r in results)} فقاعة")
+            return results
             
         except Exception as e:
             logger.error(f"خطأ في كشف الفقاعات: {str(e)}")
-            return []
+            return [[] for _ in images]
     
     def extract_bubble_region(self, image: np.ndarray, 
                              bubble: Tuple[int, int, int, int]) -> Optional[np.ndarray]:
@@ -105,22 +336,86 @@ class ImageProcessor:
             logger.error(f"خطأ في استخراج منطقة الفقاعة: {str(e)}")
             return None
     
-    def correct_distortion(self, image: np.ndarray) -> np.ndarray:
+    def estimate_noise_level(self, image: np.ndarray) -> float:
+        """
+        تقدير سريع لمستوى الضوضاء في الصورة
+        Fast noise level estimate on a strided sample of the page
+        
+        Args:
+            image: الصورة المدخلة
+            
+        Returns:
+            الانحراف المعياري التقريبي للضوضاء
+        """
+        try:
+            gray = self.to_gray(image)
+            
+            # أخذ عينة بخطوة ثابتة للحفاظ على ضوضاء البكسل دون تنعيمها
+            step = max(1, max(gray.shape[:2]) // self.quality_sample_size)
+            sample = np.ascontiguousarray(gray[::step, ::step], dtype=np.float32)
+            
+            # مرشح Immerkaer يلغي البنية المحلية ويُبقي الضوضاء
+            kernel = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+            response = np.abs(cv2.filter2D(sample, -1, kernel)[1:-1, 1:-1])
+            
+            # الوسيط أقل تأثراً بالحواف والتنقيط الشبكي من المتوسط
+            return float(1.4826 * np.median(response) / 6.0)
+            
+        except Exception as e:
+            logger.error(f"خطأ في تقدير الضوضاء: {str(e)}")
+            return float('inf')
+    
+    def needs_distortion_correction(self, image: np.ndarray) -> bool:
+        """
+        هل تحتاج الصورة إلى تصحيح التشوهات؟
+        Decide whether distortion correction is worth running
+        
+        Args:
+            image: الصورة المدخلة
+            
+        Returns:
+            True إذا تجاوزت الضوضاء الحد المسموح
+        """
+        return self.estimate_noise_level(image) >= self.noise_threshold
+    
+    def correct_distortion(self, image: np.ndarray,
+                           bubbles: Optional[List[Tuple[int, int, int, int]]] = None) -> np.ndarray:
         """
         تصحيح التشوهات البصرية
         Correct visual distortions
         
+        يتم تخطي الصفحات النظيفة، وعند تمرير الفقاعات يُطبق المرشح عليها فقط
+        Clean pages are skipped; when bubbles are given only their ROIs are filtered
+        
         Args:
             image: الصورة المدخلة
+            bubbles: إحداثيات الفقاعات (x, y, w, h) - اختياري
             
         Returns:
             الصورة المصححة
         """
         try:
-            logger.info("جاري تصحيح التشوهات...")
+            noise = self.estimate_noise_level(image)
+            
+            if noise < self.noise_threshold:
+                self.processing_stats['distortion_skipped'] += 1
+                logger.info(f"تخطي تصحيح التشوهات - الصورة نظيفة (الضوضاء: {noise:.2f})")
+                return image
+            
+            logger.info(f"جاري تصحيح التشوهات (الضوضاء: {noise:.2f})...")
+            self.processing_stats['distortion_applied'] += 1
+            
+            d = self.distortion_filter_diameter
+            
+            if bubbles is None:
+                return cv2.bilateralFilter(image, d, 50, 50)
             
-            # تطبيق مرشح bilateralFilter لتنعيم الصورة
-            corrected = cv2.bilateralFilter(image, 9, 75, 75)
+            # تطبيق المرشح على مناطق الفقاعات فقط
+            corrected = image.copy()
+            for x, y, w, h in bubbles:
+                roi = corrected[y:y+h, x:x+w]
+                if roi.size:
+                    corrected[y:y+h, x:x+w] = cv2.bilateralFilter(roi, d, 50, 50)
             
             return corrected
             
@@ -128,6 +423,21 @@ class ImageProcessor:
             logger.error(f"خطأ في تصحيح التشوهات: {str(e)}")
             return image
     
+    def get_processing_stats(self) -> Dict[str, int]:
+        """
+        الحصول على إحصائيات المعالجة
+        Get counts of applied/skipped processing steps
+        
+        Returns:
+            قاموس بالعدادات
+        """
+        return dict(self.processing_stats)
+    
+    def reset_processing_stats(self):
+        """إعادة تعيين إحصائيات المعالجة"""
+        for key in self.processing_stats:
+            self.processing_stats[key] = 0
+    
     def remove_background(self, image: np.ndarray) -> np.ndarray:
         """
         إزالة الخلفية حول النص
@@ -143,7 +453,7 @@ class ImageProcessor:
             logger.info("جاري إزالة الخلفية...")
             
             # تطبيق adaptive threshold
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            gray = self.to_gray(image)
             result = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
                                           cv2.THRESH_BINARY, 11, 2)
             
@@ -153,48 +463,164 @@ class ImageProcessor:
             logger.error(f"خطأ في إزالة الخلفية: {str(e)}")
             return image
     
-    def straighten_image(self, image: np.ndarray) -> np.ndarray:
+    def estimate_skew_angle(self, image: np.ndarray) -> float:
+        """
+        تقدير زاوية الميل من الإسقاط الأفقي لصورة ثنائية مصغرة
+        Estimate skew angle from the projection profile of a downsampled binary image
+        
+        Args:
+            image: الصورة المدخلة
+            
+        Returns:
+            الزاوية بالدرجات (بصيغة cv2.getRotationMatrix2D)
+        """
+        try:
+            gray = self.to_gray(image)
+            
+            # تصغير الصورة قبل التحويل الثنائي
+            scale = min(1.0, self.deskew_sample_size / max(gray.shape[:2]))
+            if scale < 1.0:
+                gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            
+            _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+            ys, xs = np.nonzero(binary)
+            
+            if len(ys) < 50:
+                return 0.0
+            
+            # أخذ عينة من البكسلات لتثبيت التكلفة
+            if len(ys) > self.deskew_max_points:
+                step = len(ys) // self.deskew_max_points + 1
+                ys, xs = ys[::step], xs[::step]
+            
+            xs = xs.astype(np.float32)
+            ys = ys.astype(np.float32)
+            
+            # بحث خشن ثم دقيق حول أفضل زاوية
+            coarse_step = 0.5
+            angles = np.arange(-self.deskew_max_angle, self.deskew_max_angle + coarse_step,
+                               coarse_step)
+            best = self._best_projection_angle(xs, ys, angles)
+            
+            fine = np.arange(best - coarse_step, best + coarse_step, coarse_step / 10)
+            return self._best_projection_angle(xs, ys, fine)
+            
+        except Exception as e:
+            logger.error(f"خطأ في تقدير زاوية الميل: {str(e)}")
+            return 0.0
+    
+    @staticmethod
+    def _best_projection_angle(xs: np.ndarray, ys: np.ndarray, angles: np.ndarray) -> float:
+        """
+        اختيار الزاوية التي تعطي أحدّ إسقاط أفقي
+        Pick the angle whose row projection is sharpest
+        
+        Args:
+            xs: إحداثيات x للبكسلات
+            ys: إحداثيات y للبكسلات
+            angles: الزوايا المرشحة بالدرجات
+            
+        Returns:
+            أفضل زاوية
+        """
+        theta = np.deg2rad(angles).astype(np.float32)[:, None]
+        
+        # صفوف جميع البكسلات بعد التدوير لكل زاوية دفعة واحدة
+        rows = np.rint(ys[None, :] * np.cos(theta) - xs[None, :] * np.sin(theta)).astype(np.int64)
+        rows -= rows.min(axis=1, keepdims=True)
+        
+        scores = [np.square(np.bincount(r).astype(np.float64)).sum() for r in rows]
+        return float(angles[int(np.argmax(scores))])
+    
+    def straighten_image(self, image: np.ndarray,
+                         bubbles: Optional[List[Tuple[int, int, int, int]]] = None) -> np.ndarray:
         """
         تصحيح ميل الصورة
         Straighten tilted image
         
+        لا يتم التدوير إذا كانت الزاوية أقل من deskew_tolerance، وعند تمرير
+        الفقاعات يتم تدوير مناطقها فقط
+        No rotation below deskew_tolerance; when bubbles are given only their ROIs are rotated
+        
         Args:
             image: الصورة المائلة
+            bubbles: إحداثيات الفقاعات (x, y, w, h) - اختياري
             
         Returns:
             الصورة المصححة
         """
         try:
-            logger.info("جاري تصحيح ميل الصورة...")
-            
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            edges = cv2.Canny(gray, 50, 150)
-            
-            # كشف الخطوط
-            lines = cv2.HoughLines(edges, 1, np.pi/180, 100)
-            
-            if lines is not None and len(lines) > 0:
-                angle = 0
-                for rho, theta in lines[0]:
-                    angle = (theta * 180 / np.pi) - 90
-                    if angle < 0:
-                        angle += 180
-                    break
-                
-                # تدوير الصورة
+            angle = self.estimate_skew_angle(image)
+            self.last_skew_angle = angle
+            
+            if abs(angle) < self.deskew_tolerance:
+                self.processing_stats['deskew_skipped'] += 1
+                logger.info(f"تخطي تصحيح الميل (الزاوية: {angle:.2f})")
+                return image
+            
+            logger.info(f"جاري تصحيح ميل الصورة (الزاوية: {angle:.2f})...")
+            self.processing_stats['deskew_applied'] += 1
+            
+            if bubbles is None:
                 h, w = image.shape[:2]
-                center = (w // 2, h // 2)
-                M = cv2.getRotationMatrix2D(center, angle, 1.0)
-                rotated = cv2.warpAffine(image, M, (w, h))
-                
-                return rotated
+                M = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+                return cv2.warpAffine(image, M, (w, h), borderMode=cv2.BORDER_REPLICATE)
             
-            return image
+            # تدوير مناطق الفقاعات فقط حول مراكزها
+            rotated = image.copy()
+            for bubble in bubbles:
+                self._straighten_roi(image, rotated, bubble, angle)
+            
+            return rotated
             
         except Exception as e:
             logger.error(f"خطأ في تصحيح الميل: {str(e)}")
             return image
     
+    @staticmethod
+    def _straighten_roi(image: np.ndarray, target: np.ndarray, bubble, angle: float):
+        """
+        تدوير منطقة فقاعة واحدة ولصقها في الصورة الهدف
+        Rotate one bubble region and paste it into the target image
+
+        تُدوَّر المنطقة مع هامش من الصفحة حولها حتى تأتي الزوايا من بكسلات
+        حقيقية، وما يقع خارج الصفحة يُملأ بلون الخلفية المحلية بدلاً من تكرار
+        الحواف (الذي يمد حدود الفقاعة إلى الزوايا). يُلصق صندوق الفقاعة فقط،
+        أو بكسلات قناعها إن وُجد
+        The region is rotated with a margin of surrounding page so its corners
+        come from real pixels; anything beyond the page is filled with the local
+        background instead of replicated edges, which would smear the outline into
+        the corners. Only the bubble box, or its mask when present, is pasted back.
+        """
+        x, y, w, h = (int(v) for v in bubble[:4])
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(image.shape[1], x + w), min(image.shape[0], y + h)
+        if x1 <= x0 or y1 <= y0:
+            return
+        
+        # هامش يغطي الزوايا بعد التدوير
+        margin = int(np.ceil(max(w, h) * abs(np.sin(np.deg2rad(angle))))) + 2
+        mx0, my0 = max(0, x0 - margin), max(0, y0 - margin)
+        mx1, my1 = min(image.shape[1], x1 + margin), min(image.shape[0], y1 + margin)
+        region = image[my0:my1, mx0:mx1]
+        
+        edge = np.concatenate([region[0], region[-1], region[:, 0], region[:, -1]])
+        background = np.median(edge, axis=0)
+        background = tuple(float(v) for v in np.atleast_1d(background))
+        
+        center = (x + w / 2 - mx0, y + h / 2 - my0)
+        M = cv2.getRotationMatrix2D(center, angle, 1.0)
+        warped = cv2.warpAffine(region, M, (region.shape[1], region.shape[0]),
+                                borderMode=cv2.BORDER_CONSTANT, borderValue=background)
+        warped = warped[y0 - my0:y1 - my0, x0 - mx0:x1 - mx0]
+        
+        mask = bubble.roi_mask() if hasattr(bubble, 'roi_mask') else None
+        if mask is not None and mask.shape[:2] == (h, w):
+            inside = mask[y0 - y:y1 - y, x0 - x:x1 - x] > 0
+            target[y0:y1, x0:x1][inside] = warped[inside]
+        else:
+            target[y0:y1, x0:x1] = warped
+    
     def save_image(self, image: np.ndarray, output_path: str) -> bool:
         """
         حفظ الصورة
@@ -209,6 +635,11 @@ class ImageProcessor:
         """
         try:
             Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+            
+            # مخرج مربوط ربطاً صلباً بالمصدر يُفك أولاً حتى لا تُكتب الصورة فوق المصدر
+            if os.path.exists(output_path) and os.stat(output_path).st_nlink > 1:
+                os.unlink(output_path)
+            
             cv2.imwrite(output_path, image)
             logger.info(f"تم حفظ الصورة: {output_path}")
             return True
@@ -216,11 +647,43 @@ class ImageProcessor:
             logger.error(f"خطأ في حفظ الصورة: {str(e)}")
             return False
     
-    def resize_image(self, image: np.ndarray, width: int, height: int) -> np.ndarray:
+    def encode_image(self, image: np.ndarray, extension: str = '.png',
+                     jpeg_quality: int = 95) -> Optional[bytes]:
+        """
+        ترميز الصورة في الذاكرة
+        Encode an image to bytes (e.g. for an archive member)
+        
+        Args:
+            image: الصورة
+            extension: صيغة الترميز (.png, .jpg, .webp)
+            jpeg_quality: جودة JPEG/WebP
+            
+        Returns:
+            البايتات أو None إذا فشل الترميز
+        """
+        try:
+            extension = extension.lower()
+            params = []
+            if extension in ('.jpg', '.jpeg'):
+                params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+            elif extension == '.webp':
+                params = [cv2.IMWRITE_WEBP_QUALITY, jpeg_quality]
+            
+            ok, buffer = cv2.imencode(extension, image, params)
+            return buffer.tobytes() if ok else None
+        except Exception as e:
+            logger.error(f"خطأ في ترميز الصورة: {str(e)}")
+            return None
+    
+    def resize_image(self, image: np.ndarray, width: Optional[int] = None,
+                     height: Optional[int] = None) -> np.ndarray:
         """
         تغيير حجم الصورة
         Resize image
         
+        إذا تم تحديد بُعد واحد فقط يُحسب الآخر للحفاظ على نسبة الأبعاد
+        If only one dimension is given the other keeps the aspect ratio
+        
         Args:
             image: الصورة المدخلة
             width: العرض الجديد
@@ -230,8 +693,43 @@ class ImageProcessor:
             الصورة المعاد تحديد حجمها
         """
         try:
-            resized = cv2.resize(image, (width, height))
+            h, w = image.shape[:2]
+            if width is None and height is None:
+                return image
+            if width is None:
+                width = max(1, round(w * height / h))
+            if height is None:
+                height = max(1, round(h * width / w))
+            
+            # INTER_AREA أفضل للتصغير
+            interpolation = cv2.INTER_AREA if width < w else cv2.INTER_LINEAR
+            resized = cv2.resize(image, (width, height), interpolation=interpolation)
             return resized
         except Exception as e:
             logger.error(f"خطأ في تغيير حجم الصورة: {str(e)}")
             return image
+    
+    def normalize_resolution(self, image: np.ndarray) -> Tuple[np.ndarray, PageTransform]:
+        """
+        تصغير الصفحات الكبيرة إلى دقة العمل
+        Downscale oversized pages to the working resolution
+        
+        Args:
+            image: الصورة بدقتها الأصلية
+            
+        Returns:
+            (صورة العمل، التحويل إلى الإحداثيات الأصلية)
+        """
+        h, w = image.shape[:2]
+        
+        if max(h, w) <= self.working_max_side:
+            return image, PageTransform(w, h, w, h)
+        
+        if w >= h:
+            working = self.resize_image(image, width=self.working_max_side)
+        else:
+            working = self.resize_image(image, height=self.working_max_side)
+        
+        work_h, work_w = working.shape[:2]
+        logger.info(f"تصغير الصفحة من {w}x{h} إلى {work_w}x{work_h} للمعالجة")
+        return working, PageTransform(w, h, work_w, work_h)
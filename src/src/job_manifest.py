@@ -0,0 +1,239 @@
+"""
+سجل تقدم المهام لاستئنافها بعد التوقف
+Resumable per-job manifest with crash-safe page checkpoints
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+from src.append_log import AppendOnlyLog
+
+logger = logging.getLogger(__name__)
+
+
+def file_digest(file_path: Union[str, Path]) -> str:
+    """
+    بصمة BLAKE2b لمحتوى ملف
+    BLAKE2b digest of a file, read in chunks
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sync_file(file_path: Union[str, Path]):
+    """
+    مزامنة ملف مكتوب مسبقاً مع القرص
+    Flush an already written file to disk
+
+    Windows لا يسمح بـ fsync على مقبض للقراءة فقط، لذا يُفتح الملف للكتابة؛
+    والملف المرتبط بمصدر للقراءة فقط يُزامن بمقبض قراءة خارج Windows فقط
+    Windows rejects fsync on a read-only handle, so the file is opened for update;
+    a read-only file (e.g. hardlinked to its source) falls back to a read handle
+    outside Windows and is left to the OS on Windows.
+    """
+    try:
+        with open(file_path, 'r+b') as f:
+            os.fsync(f.fileno())
+    except PermissionError:
+        if os.name == 'nt':
+            return
+        with open(file_path, 'rb') as f:
+            os.fsync(f.fileno())
+
+
+def source_signature(file_path: Union[str, Path]) -> Optional[Tuple[int, int]]:
+    """(الحجم، تاريخ التعديل) لملف المصدر أو None"""
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+class JobManifest:
+    """
+    فئة سجل المهمة
+    Append-only manifest recording each page's status and output hash
+
+    كل صفحة مكتملة تُسجل في سطر واحد بعد مزامنة ملف مخرجها مع القرص، فإذا
+    توقفت العملية عند الصفحة 280 من 300 فإن إعادة تشغيل نفس المهمة تتخطى
+    الصفحات المسجلة (ما دام مخرجها موجوداً بنفس الحجم والبصمة ومصدرها لم يتغير).
+    السجل الموجود لمهمة بوصف مختلف (مثل لغة أو نموذج آخر) يُنقل جانباً إلى
+    ‎.old.jsonl ويُبدأ سجل جديد
+    Each finished page is recorded with one fsync'd line after its output has been
+    synced to disk. Rerunning the same job skips recorded pages whose output still
+    exists with the recorded size and hash and whose source is unchanged, so a crash
+    at page 280 of 300 only costs the page in flight. An existing manifest written
+    for a different job description (another language or model) is moved aside to
+    ``*.old.jsonl`` and a new one is started.
+
+    مثال / Example:
+        manifest = JobManifest.for_job(JOBS_DIR, folder, output_dir)
+        if not manifest.is_done(name, source_signature(path)):
+            ...
+            manifest.mark_done(name, output_path, source_signature(path))
+    """
+
+    FILE_NAME = '.job_manifest.jsonl'
+
+    def __init__(self, manifest_path: Union[str, Path], job: Optional[Dict] = None):
+        """
+        Args:
+            manifest_path: مسار ملف السجل
+            job: وصف المهمة (يُكتب في أول سطر من سجل جديد) - اختياري
+        """
+        self.log = AppendOnlyLog(manifest_path)
+        self.path = self.log.path
+        self.pages: Dict[str, Dict] = {}
+        self.job = job
+
+        # آخر سجل لكل صفحة هو المعتمد
+        stored_job = None
+        for record in self.log.records():
+            if 'page' in record:
+                self.pages[record['page']] = record
+            elif record.get('type') == 'job':
+                stored_job = record
+
+        if job is not None and stored_job is not None and not self._same_job(stored_job, job):
+            # نقل السجل القديم جانباً بدلاً من حذفه: يبقى التاريخ، والنقل الذري
+            # لا يترك لحظة بلا سجل إذا توقفت العملية
+            old_path = self.path.with_suffix('.old.jsonl')
+            logger.warning(f"وصف المهمة تغير، نُقل السجل السابق إلى {old_path}")
+            os.replace(self.path, old_path)
+            self.pages = {}
+            stored_job = None
+
+        if job is not None and stored_job is None:
+            self.log.append(dict(job, type='job', created=time.time()))
+        elif stored_job is not None:
+            self.job = stored_job
+
+        done = sum(1 for record in self.pages.values() if record['status'] == 'done')
+        if done:
+            logger.info(f"استئناف المهمة: {done} صفحة مكتملة مسبقاً ({self.path})")
+
+    @staticmethod
+    def _same_job(stored: Dict, job: Dict) -> bool:
+        """هل السجل المخزن لنفس المهمة؟ (المقارنة بعد التحويل إلى JSON)"""
+        expected = json.loads(json.dumps(job, sort_keys=True, default=str))
+        return all(stored.get(key) == value for key, value in expected.items())
+
+    @classmethod
+    def for_job(cls, jobs_dir: Union[str, Path], input_path: Union[str, Path],
+                output_path: Union[str, Path], **params) -> "JobManifest":
+        """
+        سجل المهمة المحددة بالمدخل والمخرج والإعدادات
+        Manifest for the job identified by input, output and parameters
+
+        Args:
+            jobs_dir: مجلد سجلات المهام
+            input_path: مسار المدخل
+            output_path: مسار المخرج
+            **params: إعدادات تؤثر على النتائج (مثل اللغة)
+
+        Returns:
+            سجل المهمة (جديد أو موجود للاستئناف)
+        """
+        job = {'input': str(Path(input_path).resolve()),
+               'output': str(Path(output_path).resolve()),
+               'params': params}
+        job_id = hashlib.blake2b(json.dumps(job, sort_keys=True, default=str).encode('utf-8'),
+                                 digest_size=8).hexdigest()
+        return cls(Path(jobs_dir) / f"{Path(input_path).name}-{job_id}.jsonl", job)
+
+    def is_done(self, page: str, source: Optional[Tuple[int, int]] = None) -> bool:
+        """
+        هل اكتملت الصفحة في تشغيل سابق؟
+        Whether the page completed earlier and its output is still intact
+
+        Args:
+            page: اسم الصفحة
+            source: توقيع المصدر الحالي (الحجم، التاريخ) - اختياري
+
+        Returns:
+            True إذا أمكن تخطي الصفحة
+        """
+        record = self.pages.get(page)
+        if record is None or record['status'] != 'done':
+            return False
+
+        if source is not None and record.get('source') is not None \
+                and tuple(record['source']) != tuple(source):
+            return False
+
+        output = record.get('output')
+        if output is not None:
+            try:
+                if os.path.getsize(output) != record['size']:
+                    return False
+                # نفس الحجم لا يكفي: مخرج استُبدل أو تلف يُعاد
+                return record.get('hash') is None or file_digest(output) == record['hash']
+            except OSError:
+                return False
+
+        return True
+
+    def result(self, page: str) -> Optional[Dict]:
+        """النتيجة المخزنة للصفحة (إن وجدت)"""
+        record = self.pages.get(page)
+        return record.get('result') if record is not None else None
+
+    def mark_done(self, page: str, output_path: Optional[Union[str, Path]] = None,
+                  source: Optional[Tuple[int, int]] = None, result: Optional[Dict] = None):
+        """
+        تسجيل اكتمال صفحة
+        Record a finished page after syncing its output to disk
+
+        Args:
+            page: اسم الصفحة
+            output_path: مسار مخرج الصفحة - اختياري
+            source: توقيع المصدر (الحجم، التاريخ) - اختياري
+            result: نتيجة الصفحة لإعادتها عند الاستئناف - اختياري
+        """
+        record = {'page': page, 'status': 'done', 'time': time.time()}
+
+        if output_path is not None:
+            # المخرج يُزامن أولاً حتى لا يشير السجل إلى ملف غير مكتمل
+            sync_file(output_path)
+            record.update({'output': str(output_path),
+                           'size': os.path.getsize(output_path),
+                           'hash': file_digest(output_path)})
+        elif result is not None:
+            encoded = json.dumps(result, sort_keys=True, ensure_ascii=False, default=str)
+            record['hash'] = hashlib.blake2b(encoded.encode('utf-8'), digest_size=16).hexdigest()
+
+        if source is not None:
+            record['source'] = list(source)
+        if result is not None:
+            record['result'] = result
+
+        self.pages[page] = record
+        self.log.append(record)
+
+    def mark_failed(self, page: str, error: str = ''):
+        """
+        تسجيل فشل صفحة (تُعاد في التشغيل التالي)
+        Record a failed page; it is retried on the next run
+        """
+        record = {'page': page, 'status': 'failed', 'error': error, 'time': time.time()}
+        self.pages[page] = record
+        self.log.append(record)
+
+    def summary(self) -> Dict[str, int]:
+        """عدد الصفحات حسب الحالة"""
+        counts: Dict[str, int] = {}
+        for record in self.pages.values():
+            counts[record['status']] = counts.get(record['status'], 0) + 1
+        return counts
+
+    def close(self):
+        self.log.close()
@@ -0,0 +1,222 @@
+"""
+تخزين مخرجات الصفحات كطبقات لإعادة الرسم الجزئي
+Layered page output with incremental re-render of edited bubbles
+"""
+
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from src.data_model import Page
+from src.rle_mask import RLEMask
+
+logger = logging.getLogger(__name__)
+
+
+class LayerStore:
+    """
+    فئة حفظ طبقات الصفحة
+    Persists a cleaned base layer, per-bubble alpha layers and layout metadata
+
+    بنية مجلد الصفحة:
+        base.png          الصفحة بعد مسح النص الأصلي
+        layers/<i>.png    طبقة ألفا لنص الفقاعة i بأبعاد صندوقها
+        masks/<i>.png     قناع الفقاعة i (إن وجد)
+        layout.json       نتائج الصفحة وتخطيط كل فقاعة ومسار المخرج
+    Editing a translation re-rasterizes only that bubble; the page is recomposited
+    from the lossless base and layers, and detection, OCR and translation never run
+    again. Pages written into an archive or PDF cannot be updated in place.
+    """
+
+    LAYOUT_FILE = 'layout.json'
+
+    def __init__(self, root, renderer, image_processor):
+        """
+        Args:
+            root: المجلد الرئيسي للطبقات
+            renderer: معالج الرسم (TextRenderer)
+            image_processor: معالج الصور (لحفظ المخرج)
+        """
+        self.root = Path(root)
+        self.renderer = renderer
+        self.image_processor = image_processor
+
+    def page_dir(self, name: str) -> Path:
+        """مجلد طبقات الصفحة (الاسم مسبوق بمجلده أو أرشيفه، مثل chapter1/001.jpg)"""
+        return self.root / Path(name).with_suffix('')
+
+    @staticmethod
+    def _write(path: Path, image: np.ndarray):
+        """حفظ صورة PNG بدون فقد"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if not cv2.imwrite(str(path), image):
+            raise IOError(f"تعذر حفظ {path}")
+
+    def _write_layout(self, page_dir: Path, meta: Dict):
+        """كتابة layout.json عبر ملف مؤقت ثم استبداله دفعة واحدة"""
+        fd, temp_name = tempfile.mkstemp(prefix=f'.{self.LAYOUT_FILE}.', suffix='.part',
+                                         dir=page_dir)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+            os.replace(temp_name, page_dir / self.LAYOUT_FILE)
+        except BaseException:
+            os.unlink(temp_name)
+            raise
+
+    @staticmethod
+    def _read(path: Path) -> Optional[np.ndarray]:
+        return cv2.imread(str(path), cv2.IMREAD_UNCHANGED)
+
+    def save_page(self, page: Page, base: np.ndarray, output_path: Optional[str],
+                  container: Optional[str] = None) -> np.ndarray:
+        """
+        حفظ طبقات الصفحة وإرجاع الصورة المركبة
+        Persist the layers of a page and return the composited image
+
+        Args:
+            page: الصفحة بعد الترجمة
+            base: الصفحة بعد مسح النص (لا تُعدل)
+            output_path: مسار المخرج النهائي (None لصفحات الأرشيف أو PDF)
+            container: الأرشيف أو ملف PDF الذي كُتبت فيه الصفحة - اختياري
+
+        Returns:
+            الصورة المركبة
+        """
+        page_dir = self.page_dir(page.name)
+        bubbles = [b for b in page.bubbles if b.translation]
+        rendered = self.renderer.rasterize_jobs([(b, b.translation, None) for b in bubbles])
+
+        self._write(page_dir / 'base.png', base)
+
+        layout = []
+        composed = base.copy()
+        for i, (bubble, (size, lines, layer)) in enumerate(zip(bubbles, rendered)):
+            self._write(page_dir / 'layers' / f'{i}.png', layer)
+
+            mask_file = None
+            if bubble.mask is not None:
+                mask_file = f'masks/{i}.png'
+                self._write(page_dir / mask_file, bubble.roi_mask())
+
+            layout.append({'font_size': size, 'lines': lines, 'mask': mask_file})
+            self.renderer.blend_layer(composed, bubble, layer)
+
+        page_data = page.to_dict()
+        page_data.update({
+            'bubbles': [list(b.bbox) for b in bubbles],
+            'texts': [b.text for b in bubbles],
+            'translations': [b.translation for b in bubbles],
+        })
+
+        meta = {'page': page_data, 'layout': layout,
+                'output': str(output_path) if output_path is not None else None,
+                'container': str(container) if container is not None else None}
+        self._write_layout(page_dir, meta)
+
+        logger.info(f"تم حفظ طبقات الصفحة: {page_dir}")
+        return composed
+
+    def load_page(self, name: str) -> Tuple[Optional[Page], Optional[Dict]]:
+        """
+        تحميل الصفحة وبيانات التخطيط
+        Load the page (with bubble masks) and its layout metadata
+
+        Returns:
+            (الصفحة، البيانات) أو (None, None)
+        """
+        layout_path = self.page_dir(name) / self.LAYOUT_FILE
+        if not layout_path.exists():
+            logger.error(f"لا توجد طبقات للصفحة: {name}")
+            return None, None
+
+        with open(layout_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        page = Page.from_dict(meta['page'])
+        for bubble, entry in zip(page.bubbles, meta['layout']):
+            if entry.get('mask'):
+                roi_mask = self._read(self.page_dir(name) / entry['mask'])
+                bubble.mask = RLEMask.encode(roi_mask, (bubble.x, bubble.y),
+                                             (page.height, page.width))
+
+        return page, meta
+
+    def update_translations(self, name: str, edits: Dict[int, str]) -> bool:
+        """
+        تعديل ترجمات فقاعات وإعادة رسمها فقط
+        Apply translation edits, re-rasterizing only the edited bubbles
+
+        الصفحة تُركب من جديد من الطبقة الأساسية وطبقات جميع الفقاعات (PNG بدون
+        فقد) ولا يُقرأ المخرج، لذا لا تنخفض الجودة مع تكرار التعديل
+        The page is recomposited from the lossless base and bubble layers, never
+        from the (possibly JPEG) output, so repeated edits do not lose quality.
+
+        Args:
+            name: اسم الصفحة
+            edits: الترجمات الجديدة حسب ترتيب الفقاعة
+
+        Returns:
+            True إذا نجحت إعادة الرسم
+        """
+        try:
+            page, meta = self.load_page(name)
+            if page is None:
+                return False
+
+            if meta.get('container') or not meta.get('output'):
+                logger.error(f"الصفحة {name} مكتوبة داخل {meta.get('container')} - "
+                             f"لا يمكن تحديثها في مكانها، أعد معالجة الملف")
+                return False
+
+            page_dir = self.page_dir(name)
+            edits = {i: text for i, text in edits.items() if 0 <= i < len(page.bubbles)}
+            if not edits:
+                return True
+
+            # إعادة رسم طبقات الفقاعات المعدلة فقط
+            changed = sorted(edits)
+            for i in changed:
+                page.bubbles[i].translation = edits[i]
+            rendered = self.renderer.rasterize_jobs(
+                [(page.bubbles[i], edits[i], None) for i in changed])
+
+            layers = {}
+            for i, (size, lines, layer) in zip(changed, rendered):
+                layers[i] = layer
+                self._write(page_dir / 'layers' / f'{i}.png', layer)
+                meta['layout'][i].update({'font_size': size, 'lines': lines})
+            meta['page']['translations'] = [b.translation for b in page.bubbles]
+
+            base = self._read(page_dir / 'base.png')
+            if base is None:
+                logger.error(f"الطبقة الأساسية مفقودة للصفحة: {name}")
+                return False
+
+            composed = base.copy()
+            for i, bubble in enumerate(page.bubbles):
+                layer = layers[i] if i in layers else self._read(page_dir / 'layers' / f'{i}.png')
+                if layer is not None:
+                    self.renderer.blend_layer(composed, bubble, layer)
+
+            self._write_layout(page_dir, meta)
+
+            logger.info(f"إعادة رسم {len(changed)} فقاعة في الصفحة: {name}")
+            return self.image_processor.save_image(composed, meta['output'])
+
+        except Exception as e:
+            logger.error(f"خطأ في إعادة رسم الصفحة: {str(e)}")
+            return False
+
+    def list_pages(self) -> List[str]:
+        """أسماء الصفحات المحفوظة كطبقات"""
+        if not self.root.exists():
+            return []
+        return sorted(p.parent.relative_to(self.root).as_posix()
+                      for p in self.root.rglob(self.LAYOUT_FILE))
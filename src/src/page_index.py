@@ -0,0 +1,254 @@
+"""
+فهرس الصفحات المعالجة حسب البصمة الإدراكية
+Perceptual-hash index of processed pages
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def crop_signature(image: np.ndarray, box: Sequence[int], size: int = 32) -> str:
+    """
+    بصمة بكسلات منطقة من الصفحة: صورة رمادية مصغرة بأبعاد ثابتة (hex)
+    Pixel signature of a page region: fixed-size grayscale thumbnail as hex
+
+    Args:
+        image: الصفحة
+        box: المنطقة (x, y, w, h)
+        size: أبعاد الصورة المصغرة
+
+    Returns:
+        البصمة أو نص فارغ إذا كانت المنطقة خارج الصفحة
+    """
+    x, y, w, h = (int(v) for v in box)
+    crop = image[max(y, 0):y + h, max(x, 0):x + w]
+    if crop.size == 0:
+        return ''
+    if crop.ndim == 3:
+        crop = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    thumb = cv2.resize(crop, (size, size), interpolation=cv2.INTER_AREA)
+    return thumb.astype(np.uint8).tobytes().hex()
+
+
+def signature_distance(a: str, b: str) -> int:
+    """أكبر فرق بين بكسلات بصمتين (255 إذا اختلف حجمهما)"""
+    if not a or not b or len(a) != len(b):
+        return 255
+    diff = np.abs(np.frombuffer(bytes.fromhex(a), np.uint8).astype(np.int16) -
+                  np.frombuffer(bytes.fromhex(b), np.uint8).astype(np.int16))
+    return int(diff.max())
+
+
+class PageIndex:
+    """
+    فئة فهرسة الصفحات المعالجة لإعادة استخدام نتائجها
+    Index of processed pages used to reuse results for near-duplicates
+
+    البصمة (64 بت) تُقسم إلى max_distance + 1 أجزاء، وأي صفحتين بمسافة
+    Hamming لا تتجاوز max_distance تتطابقان في جزء واحد على الأقل
+    The 64-bit hash is split into max_distance + 1 chunks; any two hashes within
+    max_distance share at least one chunk exactly, so lookups only scan those buckets.
+
+    البصمة الإدراكية لا تميز صفحتين بنفس توزيع اللوحات وحوار مختلف، لذا عند
+    تمرير الصورة يُتحقق من المرشح بمقارنة صور مصغرة للصفحة ولكل فقاعة قبل
+    إعادة استخدام نتائجه
+    The pHash cannot tell apart pages with the same panel layout but different
+    dialogue, so when the image is passed a candidate is only reused after
+    thumbnails of the page and of every bubble crop match.
+    """
+
+    # أبعاد الصورة المصغرة للصفحة كاملة (للصفحات بدون فقاعات)
+    PAGE_SIGNATURE_SIZE = 64
+
+    def __init__(self, index_path: Optional[str] = None, max_distance: int = 4,
+                 crop_tolerance: int = 32):
+        """
+        تهيئة الفهرس
+        Initialize the index
+
+        Args:
+            index_path: مسار ملف الفهرس (JSON Lines) - اختياري
+            max_distance: أقصى مسافة Hamming لاعتبار الصفحتين متطابقتين
+            crop_tolerance: أقصى فرق بين بكسلات الصور المصغرة عند التحقق
+        """
+        self.index_path = Path(index_path) if index_path else None
+        self.max_distance = max_distance
+        self.crop_tolerance = crop_tolerance
+
+        # تقسيم الـ 64 بت إلى أجزاء متقاربة الحجم
+        n_chunks = max_distance + 1
+        bounds = [round(i * 64 / n_chunks) for i in range(n_chunks + 1)]
+        self._chunks = [(lo, (1 << (hi - lo)) - 1) for lo, hi in zip(bounds, bounds[1:])]
+
+        self.entries: Dict[int, Dict] = {}
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in self._chunks]
+
+        if self.index_path and self.index_path.exists():
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _keys(self, page_hash: int) -> List[int]:
+        """مفاتيح الأجزاء للبصمة"""
+        return [(page_hash >> shift) & mask for shift, mask in self._chunks]
+
+    def _insert(self, page_hash: int, result: Dict):
+        """إضافة مدخل إلى الذاكرة فقط"""
+        if page_hash not in self.entries:
+            for bucket, key in zip(self._buckets, self._keys(page_hash)):
+                bucket.setdefault(key, []).append(page_hash)
+        self.entries[page_hash] = result
+
+    def find(self, page_hash: int, image_size: Optional[Tuple[int, int]] = None,
+             image: Optional[np.ndarray] = None) -> Optional[Dict]:
+        """
+        البحث عن صفحة مطابقة أو شبه مطابقة
+        Find a processed page within max_distance of the hash
+
+        Args:
+            page_hash: البصمة الإدراكية
+            image_size: أبعاد الصفحة (العرض، الارتفاع) لتحجيم الإحداثيات - اختياري
+            image: الصفحة للتحقق من محتوى المرشح قبل إعادة استخدامه - اختياري
+
+        Returns:
+            النتائج المخزنة أو None
+        """
+        candidates = {}
+        for bucket, key in zip(self._buckets, self._keys(page_hash)):
+            for candidate in bucket.get(key, ()):
+                distance = bin(candidate ^ page_hash).count('1')
+                if distance <= self.max_distance:
+                    candidates[candidate] = distance
+
+        if image is not None and image_size is None:
+            image_size = (image.shape[1], image.shape[0])
+
+        # الأقرب أولاً، والمرشح الذي يختلف محتواه يُتخطى
+        for candidate in sorted(candidates, key=candidates.get):
+            result = self.entries[candidate]
+            if image_size is not None and tuple(result.get('size', image_size)) != tuple(image_size):
+                result = self._rescale(result, image_size)
+
+            if image is not None and not self.verify(image, result):
+                logger.info(f"تخطي صفحة متشابهة بمحتوى مختلف (المسافة: {candidates[candidate]})")
+                continue
+
+            logger.info(f"وجدت صفحة مطابقة في الفهرس (المسافة: {candidates[candidate]})")
+            return result
+
+        return None
+
+    def signatures(self, image: np.ndarray, bubbles: Sequence[Sequence[int]]) -> Dict:
+        """
+        بصمات بكسلات الصفحة وقصاصات فقاعاتها
+        Pixel signatures of the page and of each bubble crop
+
+        Args:
+            image: الصفحة
+            bubbles: صناديق الفقاعات (x, y, w, h)
+
+        Returns:
+            {'page_signature', 'crop_signatures'}
+        """
+        height, width = image.shape[:2]
+        return {
+            'page_signature': crop_signature(image, (0, 0, width, height),
+                                             self.PAGE_SIGNATURE_SIZE),
+            'crop_signatures': [crop_signature(image, box) for box in bubbles],
+        }
+
+    def verify(self, image: np.ndarray, result: Dict) -> bool:
+        """
+        هل يطابق محتوى الصفحة النتائج المخزنة؟
+        Whether the page pixels match the stored page and bubble crops
+
+        المدخلات القديمة بدون بصمات لا يمكن التحقق منها فلا تُستخدم
+        Entries stored without signatures cannot be verified and are rejected.
+        """
+        stored = result.get('crop_signatures')
+        if stored is None or len(stored) != len(result['bubbles']):
+            return False
+
+        current = self.signatures(image, result['bubbles'])
+        if signature_distance(current['page_signature'],
+                              result.get('page_signature', '')) > self.crop_tolerance:
+            return False
+
+        return all(signature_distance(a, b) <= self.crop_tolerance
+                   for a, b in zip(current['crop_signatures'], stored))
+
+    @staticmethod
+    def _rescale(result: Dict, image_size: Tuple[int, int]) -> Dict:
+        """تحجيم إحداثيات الفقاعات لصفحة بأبعاد مختلفة"""
+        src_w, src_h = result['size']
+        fx, fy = image_size[0] / src_w, image_size[1] / src_h
+
+        scaled = dict(result)
+        scaled['size'] = list(image_size)
+        scaled['bubbles'] = [
+            [round(x * fx), round(y * fy), round(w * fx), round(h * fy)]
+            for x, y, w, h in result['bubbles']
+        ]
+        return scaled
+
+    def add(self, page_hash: int, result: Dict, image: Optional[np.ndarray] = None):
+        """
+        إضافة صفحة معالجة إلى الفهرس
+        Add a processed page to the index
+
+        Args:
+            page_hash: البصمة الإدراكية
+            result: نتائج الصفحة (size, bubbles, texts, translations)
+            image: الصفحة لتخزين بصمات التحقق - اختياري
+        """
+        if image is not None:
+            result = dict(result, **self.signatures(image, result['bubbles']))
+        self._insert(page_hash, result)
+
+        if self.index_path is None:
+            return
+
+        try:
+            # الإضافة إلى نهاية الملف بدلاً من إعادة كتابته
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            record = {'hash': f"{page_hash:016x}", 'result': result}
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        except Exception as e:
+            logger.error(f"خطأ في حفظ مدخل الفهرس: {str(e)}")
+
+    def load(self) -> int:
+        """
+        تحميل الفهرس من الملف
+        Load index entries from disk
+
+        Returns:
+            عدد المدخلات المحملة
+        """
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # سطر غير مكتمل من عملية سابقة متوقفة
+                        continue
+                    self._insert(int(record['hash'], 16), record['result'])
+
+            logger.info(f"تم تحميل {len(self.entries)} صفحة من الفهرس")
+            return len(self.entries)
+
+        except Exception as e:
+            logger.error(f"خطأ في تحميل الفهرس: {str(e)}")
+            return 0
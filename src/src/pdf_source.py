@@ -0,0 +1,299 @@
+"""
+قراءة صفحات PDF كصور عند الحاجة
+Lazy, parallel PDF page source
+"""
+
+import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Union
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PyPDF2 import PdfReader
+    from PyPDF2.generic import ContentStream
+except ImportError:
+    PdfReader = None
+    logger.warning("لم يتم تثبيت PyPDF2 - لن يتم استخراج الصور المضمنة مباشرة")
+
+
+def parse_page_range(spec: Union[str, Iterable[int], None], page_count: int) -> List[int]:
+    """
+    تحويل نطاق صفحات مثل "1-5,8,10-" إلى قائمة أرقام (تبدأ من 1)
+    Parse a page range such as "1-5,8,10-" into 1-based page numbers
+
+    Args:
+        spec: النطاق (نص أو قائمة أرقام أو None لجميع الصفحات)
+        page_count: عدد صفحات الملف
+
+    Returns:
+        أرقام الصفحات بالترتيب ودون تكرار
+    """
+    if spec is None or spec == '':
+        return list(range(1, page_count + 1))
+
+    if not isinstance(spec, str):
+        numbers = spec
+    else:
+        numbers = []
+        for part in spec.replace(' ', '').split(','):
+            if not part:
+                continue
+            if '-' in part:
+                start, end = part.split('-', 1)
+                first = int(start) if start else 1
+                last = int(end) if end else page_count
+                numbers.extend(range(first, last + 1))
+            else:
+                numbers.append(int(part))
+
+    seen = set()
+    pages = []
+    for number in numbers:
+        if 1 <= number <= page_count and number not in seen:
+            seen.add(number)
+            pages.append(number)
+    return pages
+
+
+def _rasterize_page(pdf_path: str, number: int, dpi: int) -> np.ndarray:
+    """
+    رسم صفحة واحدة (تُنفذ في عملية منفصلة)
+    Rasterize one page with pdf2image; runs in a worker process
+    """
+    from pdf2image import convert_from_path
+
+    pil_page = convert_from_path(pdf_path, dpi=dpi, first_page=number, last_page=number)[0]
+    array = np.asarray(pil_page.convert('RGB'))
+    return cv2.cvtColor(array, cv2.COLOR_RGB2BGR)
+
+
+class PdfPage:
+    """
+    صفحة PDF جاهزة للمعالجة
+    One PDF page: either the embedded image bytes or a rasterized array
+    """
+
+    __slots__ = ('number', 'name', 'data', 'image')
+
+    def __init__(self, number: int, name: str, data: Optional[bytes] = None,
+                 image: Optional[np.ndarray] = None):
+        self.number = number
+        self.name = name
+        self.data = data
+        self.image = image
+
+    def __repr__(self) -> str:
+        source = 'embedded' if self.data is not None else 'rasterized'
+        return f"PdfPage({self.number}, {self.name!r}, {source})"
+
+    @property
+    def is_embedded(self) -> bool:
+        """هل الصفحة صورة مضمنة مستخرجة كما هي؟"""
+        return self.data is not None
+
+
+class PdfPageSource:
+    """
+    فئة قراءة صفحات PDF
+    Yields PDF pages in order while rasterizing ahead across processes
+
+    الصفحات التي تتكون من صورة واحدة مضمنة (الحالة الشائعة في ملفات الناشرين)
+    تُستخرج بايتاتها مباشرة دون رسم، والباقي يُرسم بـ pdf2image في عمليات
+    متوازية مع نافذة محدودة من الصفحات المسبقة، فتبدأ المعالجة بعد أول صفحة
+    Pages made of a single embedded image (typical publisher scans) are extracted
+    as-is; the others are rasterized by pdf2image in a process pool with a bounded
+    prefetch window, so the pipeline starts after the first page.
+
+    مثال / Example:
+        for page in PdfPageSource('volume.pdf', dpi=300, pages='1-20'):
+            image = page.image if page.image is not None else decode(page.data)
+    """
+
+    EMBEDDED_SUFFIXES = ('.jpg', '.jpeg', '.png')
+    PASSTHROUGH_FILTERS = ('/DCTDecode', '/FlateDecode')
+    PASSTHROUGH_OPERATORS = (b'q', b'Q', b'cm', b'Do')
+
+    def __init__(self, pdf_path: str, dpi: int = 300,
+                 pages: Union[str, Iterable[int], None] = None,
+                 workers: Optional[int] = None, prefetch: Optional[int] = None,
+                 passthrough: bool = True, aspect_tolerance: float = 0.02):
+        """
+        Args:
+            pdf_path: مسار ملف PDF
+            dpi: دقة الرسم
+            pages: نطاق الصفحات (مثل "1-5,8") - افتراضياً الكل
+            workers: عدد العمليات المتوازية
+            prefetch: أقصى عدد من الصفحات قيد الرسم مسبقاً
+            passthrough: استخراج الصورة المضمنة الوحيدة مباشرة
+            aspect_tolerance: الفرق المسموح بين نسبة أبعاد الصورة والصفحة
+        """
+        self.pdf_path = str(pdf_path)
+        self.dpi = dpi
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.prefetch = prefetch or 2 * self.workers
+        self.passthrough = passthrough and PdfReader is not None
+        self.aspect_tolerance = aspect_tolerance
+
+        self._reader = PdfReader(self.pdf_path) if PdfReader is not None else None
+        self.pages = parse_page_range(pages, self.page_count())
+
+        # إحصائيات المصدر
+        self.stats = {'embedded': 0, 'rasterized': 0}
+
+    def page_count(self) -> int:
+        """عدد صفحات الملف"""
+        if self._reader is not None:
+            return len(self._reader.pages)
+
+        from pdf2image import pdfinfo_from_path
+        return int(pdfinfo_from_path(self.pdf_path)['Pages'])
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    def _page_name(self, number: int, suffix: str) -> str:
+        return f"{Path(self.pdf_path).stem}_{number:04d}{suffix}"
+
+    def embedded_image(self, number: int) -> Optional[PdfPage]:
+        """
+        استخراج الصفحة إذا كانت صورة مضمنة واحدة تغطيها
+        Return the page's only embedded image if it is exactly what the page shows
+
+        الاستخراج المباشر آمن فقط إذا كان محتوى الصفحة رسم صورة واحدة تغطيها دون
+        نص أو رسومات أو تعليقات فوقها، والصورة بألوان DeviceRGB أو DeviceGray
+        دون قناع شفافية أو /Decode، وبنفس نسبة أبعاد الصفحة ودون تدوير. أي صفحة
+        أخرى تُرسم حتى يطابق المخرج ما يعرضه قارئ PDF
+        Passthrough is only exact when the content stream paints one image XObject
+        over the whole page with nothing else drawn or annotated on top, the image
+        is DeviceRGB or DeviceGray with no SMask, Mask or /Decode, and it has the
+        page's aspect ratio with no rotation. Every other page is rasterized so the
+        output matches what a PDF viewer shows.
+        """
+        try:
+            page = self._reader.pages[number - 1]
+            if (page.get('/Rotate') or 0) % 360:
+                return None
+            if any(annot.get_object().get('/Subtype') != '/Link'
+                   for annot in (page.get('/Annots') or [])):
+                return None
+
+            contents = page.get('/Contents')
+            if contents is None:
+                return None
+            operations = ContentStream(contents.get_object(), page.pdf).operations
+
+            # المسموح فقط: حفظ/استعادة الحالة، مصفوفة التحويل، ورسم كائن واحد
+            if any(operator not in self.PASSTHROUGH_OPERATORS for _, operator in operations):
+                return None
+            drawn = [operands[0] for operands, operator in operations if operator == b'Do']
+            matrices = [operands for operands, operator in operations if operator == b'cm']
+            if len(drawn) != 1 or len(matrices) != 1:
+                return None
+
+            xobjects = page['/Resources'].get_object().get('/XObject')
+            if xobjects is None or drawn[0] not in xobjects.get_object():
+                return None
+            xobject = xobjects.get_object()[drawn[0]].get_object()
+            if not self._is_plain_image(xobject):
+                return None
+
+            # الصورة يجب أن تغطي الصفحة كاملة دون قص أو تمديد
+            box = page.mediabox
+            page_w, page_h = float(box.width), float(box.height)
+            a, b, c, d, e, f = (float(value) for value in matrices[0])
+            tolerance = self.aspect_tolerance
+            if abs(b) > 1e-6 or abs(c) > 1e-6 or a <= 0 or d <= 0 \
+                    or abs(a - page_w) > tolerance * page_w or abs(d - page_h) > tolerance * page_h \
+                    or abs(e - float(box.left)) > tolerance * page_w \
+                    or abs(f - float(box.bottom)) > tolerance * page_h:
+                return None
+
+            image_ratio = float(xobject['/Width']) / float(xobject['/Height'])
+            if abs(image_ratio - page_w / page_h) > tolerance * (page_w / page_h):
+                return None
+
+            images = page.images
+            if len(images) != 1:
+                return None
+            embedded = images[0]
+            suffix = Path(embedded.name).suffix.lower()
+            if suffix not in self.EMBEDDED_SUFFIXES:
+                return None
+
+            return PdfPage(number, self._page_name(number, suffix), data=embedded.data)
+
+        except Exception as e:
+            logger.warning(f"تعذر فحص الصور المضمنة في الصفحة {number}: {str(e)}")
+            return None
+
+    @classmethod
+    def _is_plain_image(cls, xobject) -> bool:
+        """هل الكائن صورة تُعرض ببايتاتها كما هي؟"""
+        if xobject.get('/Subtype') != '/Image' or xobject.get('/ImageMask'):
+            return False
+        if any(key in xobject for key in ('/SMask', '/Mask', '/Decode')):
+            return False
+        if xobject.get('/BitsPerComponent') != 8:
+            return False
+
+        colorspace = xobject.get('/ColorSpace')
+        colorspace = colorspace.get_object() if colorspace is not None else None
+        if colorspace not in ('/DeviceRGB', '/DeviceGray'):
+            return False
+
+        filters = xobject.get('/Filter')
+        filters = filters.get_object() if filters is not None else None
+        if isinstance(filters, list):
+            filters = filters[0] if len(filters) == 1 else None
+        return filters in cls.PASSTHROUGH_FILTERS
+
+    def __iter__(self) -> Iterator[PdfPage]:
+        """
+        المرور على الصفحات بالترتيب مع رسم الصفحات التالية مسبقاً
+        Yield pages in order while later pages rasterize in the background
+        """
+        pending = deque()
+        numbers = iter(self.pages)
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+
+            def schedule():
+                # ملء النافذة بالصفحات التالية
+                while len(pending) < self.prefetch:
+                    number = next(numbers, None)
+                    if number is None:
+                        return
+                    page = self.embedded_image(number) if self.passthrough else None
+                    if page is not None:
+                        pending.append((number, page))
+                    else:
+                        pending.append((number, pool.submit(_rasterize_page, self.pdf_path,
+                                                            number, self.dpi)))
+
+            schedule()
+            while pending:
+                number, item = pending.popleft()
+
+                if isinstance(item, PdfPage):
+                    self.stats['embedded'] += 1
+                    schedule()
+                    yield item
+                    continue
+
+                try:
+                    image = item.result()
+                except Exception as e:
+                    logger.error(f"خطأ في رسم صفحة PDF {number}: {str(e)}")
+                    schedule()
+                    continue
+
+                self.stats['rasterized'] += 1
+                schedule()
+                yield PdfPage(number, self._page_name(number, '.png'), image=image)
@@ -0,0 +1,287 @@
+"""
+كتابة ملفات PDF صفحة بصفحة
+Streaming PDF writer that embeds page images without re-encoding
+"""
+
+import logging
+import os
+import struct
+import tempfile
+import zlib
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# علامات SOF التي تحمل أبعاد الصورة (باستثناء DHT و JPG و DAC)
+_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# علامات بدون حقل طول
+_STANDALONE_MARKERS = set(range(0xD0, 0xD8)) | {0x01, 0xD8}
+
+
+def parse_jpeg_header(data: bytes) -> Tuple[int, int, int, bool]:
+    """
+    قراءة أبعاد JPEG وعدد قنواته من ترويسة SOF دون فك الترميز
+    Read width, height and components from the SOF header without decoding
+
+    Args:
+        data: بايتات ملف JPEG
+
+    Returns:
+        (العرض، الارتفاع، عدد القنوات، هل توجد علامة Adobe)
+    """
+    if data[:2] != b'\xff\xd8':
+        raise ValueError("ليس ملف JPEG")
+
+    adobe = False
+    pos = 2
+    while pos < len(data) - 1:
+        if data[pos] != 0xFF:
+            pos += 1
+            continue
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+            continue
+        if marker in _STANDALONE_MARKERS:
+            pos += 2
+            continue
+
+        length = struct.unpack('>H', data[pos + 2:pos + 4])[0]
+        if marker == 0xEE and data[pos + 4:pos + 9] == b'Adobe':
+            adobe = True
+        if marker in _SOF_MARKERS:
+            height, width = struct.unpack('>HH', data[pos + 5:pos + 9])
+            components = data[pos + 9]
+            return width, height, components, adobe
+        pos += 2 + length
+
+    raise ValueError("لم يتم العثور على ترويسة SOF")
+
+
+class StreamingPdfWriter:
+    """
+    فئة كتابة PDF أثناء اكتمال الصفحات
+    Writes one image page at a time straight to disk
+
+    كل صفحة تُكتب كائناتها فوراً ويُحتفظ فقط بمواضعها لجدول xref، لذا تبقى
+    الذاكرة ثابتة مهما زاد عدد الصفحات. بايتات JPEG تُضمن كما هي (DCTDecode)
+    دون فك أو إعادة ترميز، والملف يُنقل إلى مكانه دفعة واحدة عند الإغلاق
+    Each page's objects are written immediately and only their byte offsets are
+    kept for the xref table, so memory stays flat regardless of page count. JPEG
+    bytes are embedded untouched (DCTDecode) and the file is moved into place
+    atomically on close.
+
+    مثال / Example:
+        with StreamingPdfWriter('volume.pdf') as pdf:
+            pdf.add_jpeg(jpeg_bytes)
+    """
+
+    # الكائنان 1 و 2 محجوزان للفهرس وشجرة الصفحات (يُكتبان عند الإغلاق)
+    CATALOG_ID = 1
+    PAGES_ID = 2
+
+    def __init__(self, pdf_path: str, dpi: int = 150):
+        """
+        Args:
+            pdf_path: مسار الملف الناتج
+            dpi: الدقة المستخدمة لتحويل البكسلات إلى نقاط الصفحة
+        """
+        self.pdf_path = Path(pdf_path)
+        self.dpi = dpi
+        self.page_ids: List[int] = []
+        self._offsets: List[int] = []
+        self._file = None
+        self._temp_path: Optional[Path] = None
+
+    def __enter__(self) -> "StreamingPdfWriter":
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def __len__(self) -> int:
+        return len(self.page_ids)
+
+    def open(self):
+        """إنشاء الملف المؤقت وكتابة الترويسة"""
+        if self._file is not None:
+            return
+
+        self.pdf_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_name = tempfile.mkstemp(prefix=f'.{self.pdf_path.name}.', suffix='.part',
+                                         dir=self.pdf_path.parent)
+        self._file = os.fdopen(fd, 'wb')
+        self._temp_path = Path(temp_name)
+
+        # الإزاحة 0 للكائن 0 (الحر) والكائنان 1 و 2 يُحددان لاحقاً
+        self._offsets = [0, 0, 0]
+        self._file.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def _begin_object(self) -> int:
+        """بدء كائن جديد وتسجيل موضعه"""
+        obj_id = len(self._offsets)
+        self._offsets.append(self._file.tell())
+        self._file.write(f'{obj_id} 0 obj\n'.encode('ascii'))
+        return obj_id
+
+    def _write_object(self, obj_id: int, body: bytes):
+        """كتابة كائن محجوز مسبقاً (الفهرس وشجرة الصفحات)"""
+        self._offsets[obj_id] = self._file.tell()
+        self._file.write(f'{obj_id} 0 obj\n'.encode('ascii') + body + b'\nendobj\n')
+
+    def _write_stream(self, dictionary: str, data: bytes) -> int:
+        """كتابة كائن stream"""
+        obj_id = self._begin_object()
+        self._file.write(f'<< {dictionary} /Length {len(data)} >>\nstream\n'.encode('ascii'))
+        self._file.write(data)
+        self._file.write(b'\nendstream\nendobj\n')
+        return obj_id
+
+    def _add_page(self, image_dict: str, data: bytes, width: int, height: int,
+                  dpi: Optional[int]):
+        """كتابة الصورة ومحتوى الصفحة وكائن الصفحة"""
+        self.open()
+        scale = 72.0 / (dpi or self.dpi)
+        page_w, page_h = width * scale, height * scale
+
+        image_id = self._write_stream(
+            f'/Type /XObject /Subtype /Image /Width {width} /Height {height} '
+            f'/BitsPerComponent 8 {image_dict}', data)
+
+        content = f'q {page_w:.2f} 0 0 {page_h:.2f} 0 0 cm /Im0 Do Q'.encode('ascii')
+        content_id = self._write_stream('', content)
+
+        page_id = self._begin_object()
+        self._file.write(
+            f'<< /Type /Page /Parent {self.PAGES_ID} 0 R '
+            f'/MediaBox [0 0 {page_w:.2f} {page_h:.2f}] '
+            f'/Resources << /XObject << /Im0 {image_id} 0 R >> >> '
+            f'/Contents {content_id} 0 R >>\nendobj\n'.encode('ascii'))
+        self.page_ids.append(page_id)
+
+    def add_jpeg(self, data: bytes, dpi: Optional[int] = None):
+        """
+        إضافة صفحة من بايتات JPEG كما هي
+        Append a page embedding JPEG bytes directly (DCT passthrough)
+
+        Args:
+            data: بايتات JPEG
+            dpi: دقة الصفحة - افتراضياً دقة الكاتب
+        """
+        width, height, components, adobe = parse_jpeg_header(data)
+        color_space = {1: '/DeviceGray', 3: '/DeviceRGB', 4: '/DeviceCMYK'}[components]
+
+        image_dict = f'/ColorSpace {color_space} /Filter /DCTDecode'
+        if components == 4 and adobe:
+            # ملفات Adobe CMYK تُخزن مقلوبة
+            image_dict += ' /Decode [1 0 1 0 1 0 1 0]'
+
+        self._add_page(image_dict, data, width, height, dpi)
+
+    def add_image(self, image: np.ndarray, jpeg_quality: Optional[int] = 95,
+                  dpi: Optional[int] = None):
+        """
+        إضافة صفحة من صورة في الذاكرة
+        Append a page from a decoded image
+
+        الصور الرمادية تُكتب بقناة واحدة (DeviceGray)، والصور ذات قناة الشفافية
+        تُدمج فوق خلفية بيضاء، وصور 16 بت تُحول إلى 8 بت
+        Gray images are written with one channel (DeviceGray), images with alpha
+        are composited over white, and 16-bit images are reduced to 8 bits.
+
+        Args:
+            image: الصورة (رمادية أو BGR أو BGRA)
+            jpeg_quality: جودة JPEG، أو None للتخزين دون فقد (Flate)
+            dpi: دقة الصفحة - افتراضياً دقة الكاتب
+        """
+        if image.dtype == np.uint16:
+            image = (image >> 8).astype(np.uint8)
+        if image.ndim == 3 and image.shape[2] == 1:
+            image = image[:, :, 0]
+        elif image.ndim == 3 and image.shape[2] == 4:
+            alpha = image[:, :, 3:].astype(np.float32) / 255.0
+            image = (image[:, :, :3] * alpha + 255.0 * (1.0 - alpha) + 0.5).astype(np.uint8)
+
+        if jpeg_quality is not None:
+            ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+            if not ok:
+                raise ValueError("فشل ترميز الصفحة")
+            self.add_jpeg(buffer.tobytes(), dpi)
+            return
+
+        if image.ndim == 3:
+            pixels, color_space = cv2.cvtColor(image, cv2.COLOR_BGR2RGB), '/DeviceRGB'
+        else:
+            pixels, color_space = image, '/DeviceGray'
+
+        data = zlib.compress(np.ascontiguousarray(pixels).tobytes(), 6)
+        self._add_page(f'/ColorSpace {color_space} /Filter /FlateDecode', data,
+                       image.shape[1], image.shape[0], dpi)
+
+    def add_file(self, file_path: str, dpi: Optional[int] = None):
+        """
+        إضافة صفحة من ملف صورة
+        Append a page from an image file; JPEG files are embedded without decoding
+
+        Args:
+            file_path: مسار الصورة
+            dpi: دقة الصفحة - اختياري
+        """
+        file_path = Path(file_path)
+        if file_path.suffix.lower() in ('.jpg', '.jpeg'):
+            self.add_jpeg(file_path.read_bytes(), dpi)
+            return
+
+        # القراءة دون تحويل حتى تبقى الصفحات الرمادية بقناة واحدة
+        image = cv2.imread(str(file_path), cv2.IMREAD_UNCHANGED)
+        if image is None:
+            raise ValueError(f"فشل تحميل الصورة: {file_path}")
+        self.add_image(image, None, dpi)
+
+    def close(self):
+        """
+        كتابة شجرة الصفحات وجدول xref ونقل الملف إلى مكانه
+        Write the page tree and xref table, then move the file into place
+        """
+        if self._file is None:
+            return
+
+        kids = ' '.join(f'{page_id} 0 R' for page_id in self.page_ids)
+        self._write_object(self.PAGES_ID,
+                           f'<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>'
+                           .encode('ascii'))
+        self._write_object(self.CATALOG_ID,
+                           f'<< /Type /Catalog /Pages {self.PAGES_ID} 0 R >>'.encode('ascii'))
+
+        xref_offset = self._file.tell()
+        lines = [f'xref\n0 {len(self._offsets)}\n', '0000000000 65535 f \n']
+        lines += [f'{offset:010d} 00000 n \n' for offset in self._offsets[1:]]
+        lines.append(f'trailer\n<< /Size {len(self._offsets)} /Root {self.CATALOG_ID} 0 R >>\n'
+                     f'startxref\n{xref_offset}\n%%EOF\n')
+        self._file.write(''.join(lines).encode('ascii'))
+
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
+
+        os.replace(self._temp_path, self.pdf_path)
+        self._temp_path = None
+        logger.info(f"تم إنشاء ملف PDF: {self.pdf_path} ({len(self.page_ids)} صفحة)")
+
+    def abort(self):
+        """إلغاء الكتابة وحذف الملف المؤقت"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._temp_path is not None and self._temp_path.exists():
+            self._temp_path.unlink()
+        self._temp_path = None
@@ -0,0 +1,187 @@
+"""
+أقنعة الفقاعات المرمزة بطول التشغيل
+Run-length encoded bubble masks
+"""
+
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class RLEMask:
+    """
+    قناع ثنائي مرمز بطول التشغيل بإحداثيات الصفحة
+    Binary mask stored as row-major runs in page coordinates
+
+    كل تشغيل (start, length) يقع داخل صف واحد، وstart هو الفهرس المسطح
+    y * width + x في الصفحة، لذا تُحسب المساحة والصندوق والتقاطع من التشغيلات مباشرة
+    Each run lies within a single row and starts at the flat page index
+    y * width + x, so area, bbox and intersections are computed on the runs directly.
+    """
+
+    __slots__ = ('height', 'width', 'starts', 'lengths')
+
+    def __init__(self, height: int, width: int,
+                 starts: Optional[np.ndarray] = None, lengths: Optional[np.ndarray] = None):
+        self.height = int(height)
+        self.width = int(width)
+        self.starts = np.asarray(starts if starts is not None else [], dtype=np.int32)
+        self.lengths = np.asarray(lengths if lengths is not None else [], dtype=np.int32)
+
+    def __reduce__(self):
+        return RLEMask, (self.height, self.width, self.starts, self.lengths)
+
+    def __repr__(self) -> str:
+        return f"RLEMask({self.width}x{self.height}, runs={len(self.starts)}, area={self.area})"
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @classmethod
+    def encode(cls, mask: np.ndarray, offset: Tuple[int, int] = (0, 0),
+               page_shape: Optional[Tuple[int, int]] = None) -> "RLEMask":
+        """
+        ترميز قناع كثيف (محلي أو بحجم الصفحة)
+        Encode a dense mask, optionally placed at an offset inside a page
+
+        Args:
+            mask: القناع الكثيف (أي قيمة غير صفرية تعتبر داخل القناع)
+            offset: موضع الزاوية العليا اليسرى للقناع في الصفحة (x, y)
+            page_shape: أبعاد الصفحة (الارتفاع، العرض) - افتراضياً أبعاد القناع
+
+        Returns:
+            القناع المرمز
+        """
+        h, w = mask.shape[:2]
+        page_h, page_w = page_shape if page_shape is not None else (h, w)
+        ox, oy = offset
+
+        # حواف التشغيلات من الفرق على كل صف بعد إضافة عمود صفري من الجانبين
+        padded = np.zeros((h, w + 2), dtype=np.int8)
+        padded[:, 1:-1] = mask > 0
+        edges = np.diff(padded, axis=1)
+
+        rows, run_starts = np.nonzero(edges == 1)
+        _, run_ends = np.nonzero(edges == -1)
+
+        starts = (rows + oy) * page_w + (run_starts + ox)
+        return cls(page_h, page_w, starts, run_ends - run_starts)
+
+    @property
+    def area(self) -> int:
+        """عدد البكسلات داخل القناع"""
+        return int(self.lengths.sum())
+
+    @property
+    def ends(self) -> np.ndarray:
+        return self.starts + self.lengths
+
+    def bbox(self) -> Tuple[int, int, int, int]:
+        """
+        الصندوق المحيط (x, y, w, h) محسوباً من التشغيلات
+        Bounding box computed from the runs
+        """
+        if not len(self.starts):
+            return 0, 0, 0, 0
+
+        rows, cols = np.divmod(self.starts, self.width)
+        x0, x1 = int(cols.min()), int((cols + self.lengths).max())
+        y0, y1 = int(rows.min()), int(rows.max()) + 1
+        return x0, y0, x1 - x0, y1 - y0
+
+    def _pairs(self, other: "RLEMask") -> Tuple[np.ndarray, np.ndarray]:
+        """حدود تداخل كل زوج متقاطع من التشغيلات"""
+        a_s, a_e = self.starts, self.ends
+        b_s, b_e = other.starts, other.ends
+
+        # لكل تشغيل في a: مدى تشغيلات b المتداخلة معه
+        lo = np.searchsorted(b_e, a_s, side='right')
+        hi = np.searchsorted(b_s, a_e, side='left')
+        counts = np.maximum(hi - lo, 0)
+
+        ai = np.repeat(np.arange(len(a_s)), counts)
+        bi = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        bi += np.repeat(lo, counts)
+
+        s = np.maximum(a_s[ai], b_s[bi])
+        e = np.minimum(a_e[ai], b_e[bi])
+        keep = e > s
+        return s[keep], e[keep]
+
+    def intersection_area(self, other: "RLEMask") -> int:
+        """
+        مساحة التقاطع مع قناع آخر
+        Intersection area with another mask of the same page
+        """
+        s, e = self._pairs(other)
+        return int((e - s).sum())
+
+    def intersect(self, other: "RLEMask") -> "RLEMask":
+        """
+        التقاطع مع قناع آخر كقناع مرمز
+        Intersection with another mask as an RLE mask
+        """
+        s, e = self._pairs(other)
+        return RLEMask(self.height, self.width, s, e - s)
+
+    def iou(self, other: "RLEMask") -> float:
+        """نسبة التقاطع إلى الاتحاد"""
+        inter = self.intersection_area(other)
+        union = self.area + other.area - inter
+        return inter / union if union else 0.0
+
+    def to_roi(self, bbox: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+        """
+        تحويل إلى قناع كثيف محلي بأبعاد الصندوق فقط
+        Decode into a dense uint8 mask covering only the given box
+
+        Args:
+            bbox: الصندوق (x, y, w, h) - افتراضياً صندوق القناع نفسه
+
+        Returns:
+            قناع uint8 (0 أو 255) بأبعاد (h, w)
+        """
+        x, y, w, h = bbox if bbox is not None else self.bbox()
+        rows, cols = np.divmod(self.starts, self.width)
+
+        # قص التشغيلات إلى حدود الصندوق
+        c0 = np.clip(cols - x, 0, w)
+        c1 = np.clip(cols + self.lengths - x, 0, w)
+        keep = (rows >= y) & (rows < y + h) & (c1 > c0)
+        r, c0, c1 = rows[keep] - y, c0[keep], c1[keep]
+
+        # فرق تراكمي: +1 عند بداية كل تشغيل و-1 عند نهايته
+        delta = np.zeros((h, w + 1), dtype=np.int16)
+        np.add.at(delta, (r, c0), 1)
+        np.add.at(delta, (r, c1), -1)
+
+        return (np.cumsum(delta[:, :w], axis=1) > 0).astype(np.uint8) * 255
+
+    def resize(self, bbox: Tuple[int, int, int, int], page_shape: Tuple[int, int],
+               source_bbox: Optional[Tuple[int, int, int, int]] = None) -> "RLEMask":
+        """
+        إعادة تحجيم القناع إلى صندوق جديد في صفحة بأبعاد أخرى
+        Rescale the mask into a new box of a differently sized page
+
+        Args:
+            bbox: الصندوق الهدف (x, y, w, h) في الصفحة الجديدة
+            page_shape: أبعاد الصفحة الجديدة (الارتفاع، العرض)
+            source_bbox: الصندوق المصدر - افتراضياً صندوق القناع نفسه
+
+        Returns:
+            القناع المعاد تحجيمه
+        """
+        x, y, w, h = bbox
+        if not w or not h:
+            return RLEMask(*page_shape)
+
+        roi = cv2.resize(self.to_roi(source_bbox), (w, h), interpolation=cv2.INTER_NEAREST)
+        return RLEMask.encode(roi, (x, y), page_shape)
+
+    def decode(self) -> np.ndarray:
+        """
+        تحويل إلى قناع بحجم الصفحة (للتصحيح فقط - مكلف في الذاكرة)
+        Decode to a full-page mask (debugging only)
+        """
+        return self.to_roi((0, 0, self.width, self.height))
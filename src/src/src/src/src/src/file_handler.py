@@ -3,14 +3,77 @@
 File and archive handler module
 """
 
+import errno
 import os
+import re
 import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
 import logging
 
 logger = logging.getLogger(__name__)
 
+_DIGITS = re.compile(r'(\d+)')
+
+# ioctl استنساخ الملف (reflink) في Linux: يشارك الكتل مع النسخ عند الكتابة
+FICLONE = 0x40049409
+
+
+def natural_sort_key(name: Union[str, Path]) -> Tuple:
+    """
+    مفتاح ترتيب طبيعي للأسماء (page2 قبل page10)
+    Natural sort key so that page2 sorts before page10
+    
+    Args:
+        name: الاسم أو المسار
+        
+    Returns:
+        مفتاح الترتيب
+    """
+    parts = _DIGITS.split(str(name).replace('\\', '/').lower())
+    return tuple((0, int(part), '') if part.isdigit() else (1, 0, part) for part in parts)
+
+
+def scan_files(folder_path: Union[str, Path], extensions: Optional[Sequence[str]] = None,
+               recursive: bool = True) -> Iterator[Path]:
+    """
+    المرور على ملفات مجلد بالترتيب الطبيعي باستخدام os.scandir
+    Walk a folder with os.scandir in natural order
+    
+    نوع كل مدخل يُقرأ من بيانات المجلد (d_type) دون استدعاء stat لكل ملف،
+    وترتيب مدخلات كل مجلد طبيعياً يعطي ترتيباً طبيعياً للمسارات الكاملة
+    Entry types come from the directory listing (d_type), so no per-file stat is
+    needed; sorting each directory's entries naturally yields natural path order.
+    
+    Args:
+        folder_path: مسار المجلد
+        extensions: الصيغ المطلوبة (بدون حساسية لحالة الأحرف) - اختياري
+        recursive: هل يتم البحث في المجلدات الفرعية
+        
+    Returns:
+        مولد المسارات
+    """
+    extensions = tuple(ext.lower() for ext in extensions) if extensions else None
+    
+    try:
+        with os.scandir(folder_path) as iterator:
+            entries = sorted(iterator, key=lambda entry: natural_sort_key(entry.name))
+    except OSError as e:
+        logger.warning(f"تعذرت قراءة المجلد {folder_path}: {str(e)}")
+        return
+    
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            if recursive:
+                yield from scan_files(entry.path, extensions, recursive)
+        elif entry.is_file():
+            if extensions is None or os.path.splitext(entry.name)[1].lower() in extensions:
+                yield Path(entry.path)
+
 
 class FileHandler:
     """
@@ -25,6 +88,14 @@ class FileHandler:
         self.supported_archives = ['.7z', '.zip', '.rar']
         self.supported_images = ['.png', '.jpg', '.jpeg']
         self.supported_documents = ['.pdf']
+        
+        # عدد خيوط الاستخراج المتوازي (فك الضغط في zlib يحرر الـ GIL)
+        self.extract_workers = min(8, os.cpu_count() or 1)
+        # الأرشيفات الأصغر من هذا الحجم تُستخرج بخيط واحد
+        self.parallel_min_bytes = 8 * 1024 * 1024
+        
+        # أجهزة التخزين التي لا تدعم reflink (لتجنب إعادة المحاولة لكل ملف)
+        self._no_reflink_devices = set()
     
     def extract_archive(self, archive_path: str, extract_to: str) -> bool:
         """
@@ -73,6 +144,12 @@ class FileHandler:
         استخراج ملف ZIP
         Extract ZIP archive
         
+        الأعضاء مستقلة، لذا تُوزع على عدة خيوط لكل منها ZipFile خاص به،
+        مع حماية من المسارات الخارجة عن مجلد الاستخراج والحفاظ على التواريخ
+        Members are independent, so they are spread over a thread pool where every
+        thread has its own ZipFile handle; paths escaping the target are rejected and
+        modification times are preserved.
+        
         Args:
             archive_path: مسار الملف
             extract_to: مجلد الاستخراج
@@ -83,10 +160,46 @@ class FileHandler:
         try:
             import zipfile
             
+            root = extract_to.resolve()
+            
             with zipfile.ZipFile(archive_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_to)
+                members = zip_ref.infolist()
+            
+            # التحقق من جميع المسارات قبل كتابة أي ملف
+            targets = []
+            for info in members:
+                target = self._safe_target(root, info.filename)
+                if target is None:
+                    logger.error(f"مسار غير آمن داخل الأرشيف: {info.filename}")
+                    return False
+                if info.is_dir():
+                    target.mkdir(parents=True, exist_ok=True)
+                else:
+                    targets.append((info, target))
+            
+            for parent in {target.parent for _, target in targets}:
+                parent.mkdir(parents=True, exist_ok=True)
+            
+            total = sum(info.file_size for info, _ in targets)
+            workers = self.extract_workers if total >= self.parallel_min_bytes else 1
+            
+            # توزيع الأعضاء على الخيوط بالتوازن حسب الحجم المضغوط
+            chunks = [[] for _ in range(max(1, min(workers, len(targets))))]
+            loads = [0] * len(chunks)
+            for item in sorted(targets, key=lambda t: t[0].compress_size, reverse=True):
+                i = loads.index(min(loads))
+                chunks[i].append(item)
+                loads[i] += item[0].compress_size
+            
+            if len(chunks) == 1:
+                self._extract_zip_members(archive_path, chunks[0])
+            else:
+                with ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+                    for future in [pool.submit(self._extract_zip_members, archive_path, chunk)
+                                   for chunk in chunks]:
+                        future.result()
             
-            logger.info(f"تم استخراج الملف ZIP بنجاح")
+            logger.info(f"تم استخراج الملف ZIP بنجاح ({len(targets)} ملف، {len(chunks)} خيط)")
             return True
             
         except ImportError:
@@ -96,6 +209,35 @@ class FileHandler:
             logger.error(f"خطأ في استخراج ZIP: {str(e)}")
             return False
     
+    @staticmethod
+    def _safe_target(root: Path, member_name: str) -> Optional[Path]:
+        """
+        المسار الهدف لعضو الأرشيف أو None إذا كان يخرج عن مجلد الاستخراج
+        Target path of a member, or None if it would escape the extraction root
+        """
+        name = member_name.replace('\\', '/')
+        if name.startswith('/') or re.match(r'^[A-Za-z]:', name):
+            return None
+        
+        target = (root / name).resolve()
+        if target != root and root not in target.parents:
+            return None
+        return target
+    
+    @staticmethod
+    def _extract_zip_members(archive_path: Path, items: List[Tuple]):
+        """استخراج مجموعة أعضاء بمقبض ZipFile خاص بالخيط الحالي"""
+        import zipfile
+        
+        with zipfile.ZipFile(archive_path, 'r') as zip_ref:
+            for info, target in items:
+                with zip_ref.open(info) as source, open(target, 'wb') as destination:
+                    shutil.copyfileobj(source, destination, 1024 * 1024)
+                
+                # الحفاظ على تاريخ التعديل المخزن في الأرشيف
+                mtime = time.mktime(datetime(*info.date_time).timetuple())
+                os.utime(target, (mtime, mtime))
+    
     def _extract_7z(self, archive_path: Path, extract_to: Path) -> bool:
         """
         استخراج ملف 7z
@@ -204,9 +346,12 @@ class FileHandler:
         """
         try:
             import py7zr
+            from src.archive_stream import ArchiveWriter
             
-            with py7zr.SevenZipFile(archive_path, 'w') as archive:
-                archive.writeall(folder_path, arcname='.')
+            files = self._walk_files(folder_path)
+            with ArchiveWriter(archive_path, '7z') as writer:
+                for file_path in files:
+                    writer.add_file(file_path, file_path.relative_to(folder_path).as_posix())
             
             logger.info(f"تم إنشاء ملف 7z بنجاح")
             return True
@@ -232,13 +377,13 @@ class FileHandler:
         """
         try:
             import zipfile
+            from src.archive_stream import ArchiveWriter
             
-            with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for root, dirs, files in os.walk(folder_path):
-                    for file in files:
-                        file_path = Path(root) / file
-                        arcname = file_path.relative_to(folder_path.parent)
-                        zipf.write(file_path, arcname)
+            # الصور تُخزن دون إعادة ضغط، وباقي الملفات تُضغط بـ DEFLATE
+            files = self._walk_files(folder_path)
+            with ArchiveWriter(archive_path, 'zip') as writer:
+                for file_path in files:
+                    writer.add_file(file_path, file_path.relative_to(folder_path.parent).as_posix())
             
             logger.info(f"تم إنشاء ملف ZIP بنجاح")
             return True
@@ -250,8 +395,15 @@ class FileHandler:
             logger.error(f"خطأ في إنشاء ملف ZIP: {str(e)}")
             return False
     
+    @staticmethod
+    def _walk_files(folder_path: Path) -> List[Path]:
+        """جميع ملفات المجلد بالترتيب الطبيعي"""
+        files = [Path(root) / name for root, _, names in os.walk(folder_path) for name in names]
+        return sorted(files, key=lambda path: natural_sort_key(path.relative_to(folder_path)))
+    
     def get_files_from_folder(self, folder_path: str,
-                             file_extensions: Optional[List[str]] = None) -> List[Path]:
+                             file_extensions: Optional[List[str]] = None,
+                             recursive: bool = True, index=None) -> List[Path]:
         """
         الحصول على جميع الملفات من مجلد
         Get all files from folder
@@ -259,9 +411,11 @@ class FileHandler:
         Args:
             folder_path: مسار المجلد
             file_extensions: قائمة الصيغ المطلوبة (مثل ['.png', '.jpg'])
+            recursive: هل يتم البحث في المجلدات الفرعية
+            index: فهرس مجلدات دائم (DirectoryIndex) لتجنب إعادة قراءة المجلدات غير المتغيرة - اختياري
             
         Returns:
-            قائمة الملفات
+            قائمة الملفات بالترتيب الطبيعي
         """
         try:
             folder_path = Path(folder_path)
@@ -270,12 +424,10 @@ class FileHandler:
                 logger.error(f"المجلد غير موجود: {folder_path}")
                 return []
             
-            files = []
-            
-            for file_path in folder_path.rglob('*'):
-                if file_path.is_file():
-                    if file_extensions is None or file_path.suffix.lower() in file_extensions:
-                        files.append(file_path)
+            if index is not None:
+                files = index.scan(folder_path, file_extensions, recursive)
+            else:
+                files = list(scan_files(folder_path, file_extensions, recursive))
             
             logger.info(f"وجدت {len(files)} ملف في المجلد")
             return files
@@ -289,6 +441,11 @@ class FileHandler:
         نسخ ملف
         Copy file
         
+        النسخة مستقلة دائماً: تُستنسخ (reflink) إذا دعم نظام الملفات ذلك،
+        وإلا تُنسخ البايتات
+        The copy is always independent: a reflink when the filesystem supports it,
+        otherwise a byte copy.
+        
         Args:
             source: مسار الملف المصدر
             destination: مسار الملف الهدف
@@ -296,22 +453,102 @@ class FileHandler:
         Returns:
             True إذا نجح
         """
+        return self.link_file(source, destination, mode='copy') is not None
+    
+    def link_file(self, source: str, destination: str, mode: str = 'auto') -> Optional[str]:
+        """
+        إخراج ملف دون قراءة محتواه أو كتابته إن أمكن
+        Emit a file at destination without copying its bytes when possible
+        
+        الأوضاع:
+            auto     reflink ثم ربط صلب ثم نسخ البايتات
+            hardlink ربط صلب ثم نسخ البايتات
+            copy     reflink ثم نسخ البايتات (لا يُشارك الملف أبداً)
+        الاستنساخ يُفضل على الربط الصلب لأنه يوفر نفس المساحة مع بقاء الملفين
+        مستقلين عند التعديل. الهدف يُستبدل دفعة واحدة
+        Modes: auto (reflink, hardlink, byte copy), hardlink (hardlink, byte copy),
+        copy (reflink, byte copy; never shares the inode). A reflink is tried first
+        because it saves the same space while keeping the files independent. The
+        destination is replaced atomically.
+        
+        Args:
+            source: مسار الملف المصدر
+            destination: مسار الملف الهدف
+            mode: الوضع (auto أو hardlink أو copy)
+            
+        Returns:
+            الطريقة المستخدمة (reflink أو hardlink أو copy) أو None إذا فشل
+        """
         try:
             source = Path(source)
             destination = Path(destination)
             
             if not source.exists():
                 logger.error(f"الملف المصدر غير موجود: {source}")
-                return False
+                return None
             
             destination.parent.mkdir(parents=True, exist_ok=True)
-            shutil.copy2(source, destination)
+            if mode != 'copy' and destination.exists() and os.path.samefile(source, destination):
+                return 'hardlink'
+            
+            fd, temp_name = tempfile.mkstemp(prefix=f'.{destination.name}.', suffix='.part',
+                                             dir=destination.parent)
+            os.close(fd)
+            temp_path = Path(temp_name)
+            
+            try:
+                method = None
+                if mode in ('auto', 'copy') and self._reflink(source, temp_path):
+                    method = 'reflink'
+                
+                if method is None and mode in ('auto', 'hardlink'):
+                    try:
+                        temp_path.unlink()
+                        os.link(source, temp_path)
+                        method = 'hardlink'
+                    except OSError:
+                        # أجهزة مختلفة أو نظام ملفات لا يدعم الربط
+                        pass
+                
+                if method is None:
+                    shutil.copy2(source, temp_path)
+                    method = 'copy'
+                
+                os.replace(temp_path, destination)
+            finally:
+                if temp_path.exists():
+                    temp_path.unlink()
             
-            logger.info(f"تم نسخ الملف: {source} -> {destination}")
-            return True
+            logger.info(f"تم إخراج الملف ({method}): {source} -> {destination}")
+            return method
             
         except Exception as e:
             logger.error(f"خطأ في نسخ الملف: {str(e)}")
+            return None
+    
+    def _reflink(self, source: Path, destination: Path) -> bool:
+        """
+        استنساخ الملف بـ FICLONE (btrfs و XFS وغيرها)
+        Clone a file with the FICLONE ioctl; False when unsupported
+        """
+        try:
+            import fcntl
+        except ImportError:
+            return False
+        
+        device = source.stat().st_dev
+        if device in self._no_reflink_devices:
+            return False
+        
+        try:
+            with open(source, 'rb') as src, open(destination, 'wb') as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            shutil.copystat(source, destination)
+            return True
+        except OSError as e:
+            # EXDEV يعني أجهزة مختلفة فقط، أما غيره فيعني عدم الدعم
+            if e.errno != errno.EXDEV:
+                self._no_reflink_devices.add(device)
             return False
     
     def delete_file(self, file_path: str) -> bool:
@@ -389,3 +626,53 @@ class FileHandler:
         except Exception as e:
             logger.error(f"خطأ في الحصول على حجم الملف: {str(e)}")
             return 0
+
+
+def benchmark_zip_extraction(archive_path: str, workers: Optional[List[int]] = None,
+                             work_dir: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    """
+    مقارنة سرعة الاستخراج المتوازي مع extractall
+    Compare parallel extraction throughput against zipfile.extractall
+    
+    Args:
+        archive_path: مسار أرشيف ZIP
+        workers: أعداد الخيوط المراد قياسها - افتراضياً [2, 4, 8]
+        work_dir: مجلد مؤقت للاستخراج - اختياري
+        
+    Returns:
+        لكل طريقة: seconds و mb_per_second و speedup
+    """
+    import zipfile
+    
+    with zipfile.ZipFile(archive_path, 'r') as zip_ref:
+        total_mb = sum(info.file_size for info in zip_ref.infolist()) / (1024 * 1024)
+    
+    def timed(extract) -> float:
+        target = tempfile.mkdtemp(dir=work_dir)
+        try:
+            start = time.perf_counter()
+            extract(Path(target))
+            return time.perf_counter() - start
+        finally:
+            shutil.rmtree(target, ignore_errors=True)
+    
+    def extractall(target: Path):
+        with zipfile.ZipFile(archive_path, 'r') as zip_ref:
+            zip_ref.extractall(target)
+    
+    report = {}
+    baseline = timed(extractall)
+    report['extractall'] = {'seconds': baseline, 'mb_per_second': total_mb / baseline,
+                            'speedup': 1.0}
+    
+    handler = FileHandler()
+    handler.parallel_min_bytes = 0
+    for count in workers or [2, 4, 8]:
+        handler.extract_workers = count
+        elapsed = timed(lambda target: handler._extract_zip(Path(archive_path), target))
+        report[f'parallel_{count}'] = {'seconds': elapsed,
+                                       'mb_per_second': total_mb / elapsed,
+                                       'speedup': baseline / elapsed}
+        logger.info(f"{count} خيوط: {total_mb / elapsed:.1f} MB/s ({baseline / elapsed:.2f}x)")
+    
+    return report
@@ -6,9 +6,14 @@ Text rendering module
 import cv2
 import numpy as np
 from pathlib import Path
-from typing import Tuple, Optional, List
+from typing import Dict, Tuple, Optional, List
 import logging
 
+from src.artifact_cache import file_identity
+from src.data_model import Page, TextStyle
+from src.font_backend import FreeTypeTextBackend
+from src.text_layout import TextMeasureCache, HersheyMetrics, fit_font_size
+
 logger = logging.getLogger(__name__)
 
 
@@ -18,31 +23,96 @@ class TextRenderer:
     Class for rendering text on bubbles
     """
     
-    def __init__(self):
-        """تهيئة معالج الرسم"""
+    # يُرفع عند تغيير منطق التخطيط أو الرسم لإبطال الصفحات المخزنة
+    CACHE_VERSION = 1
+    
+    def __init__(self, font_path: Optional[str] = None, rtl: bool = True):
+        """
+        تهيئة معالج الرسم
+        Initialize the renderer
+        
+        Args:
+            font_path: مسار خط TrueType (عربي) - بدونه تُستخدم خطوط Hershey
+            rtl: هل اتجاه الكتابة من اليمين إلى اليسار
+        """
         logger.info("تهيئة معالج رسم النصوص...")
         
         self.font = cv2.FONT_HERSHEY_SIMPLEX
         self.font_scale = 0.8
         self.font_color = (0, 0, 0)  # أسود
         self.font_thickness = 2
+        self.font_size = 14  # حجم الخط بالبكسل عند تعطيل الملاءمة التلقائية
         self.text_padding = 10
         
+        # ذاكرة قياسات النصوص المشتركة بين الرسم وتقسيم السطور وملاءمة الخط
+        self.measure_cache = TextMeasureCache()
+        self.metrics = HersheyMetrics(self.measure_cache, self.font, self.font_thickness)
+        
+        # نطاق أحجام الخط (بالبكسل) المستخدم في الملاءمة التلقائية
+        self.min_font_size = 8
+        self.max_font_size = 48
+        self.line_spacing = 0.2  # المسافة بين السطور كنسبة من ارتفاع السطر
+        
         # تحميل خط عربي إذا أمكن
-        self._load_arabic_font()
+        self.font_backend = None
+        self._load_arabic_font(font_path, rtl)
     
-    def _load_arabic_font(self):
+    def _load_arabic_font(self, font_path: Optional[str], rtl: bool = True):
         """
         تحميل خط عربي
         Load Arabic font
+        
+        عند نجاح التحميل يصبح الخط هو مصدر القياسات والرسم لجميع الفقاعات
+        On success the TrueType backend provides metrics and drawing for every bubble.
         """
-        try:
-            import pygame
-            pygame.font.init()
-            # يمكن استخدام خط عربي من النظام
+        if not font_path:
+            logger.warning("لم يتم تحديد خط عربي - سيتم استخدام خطوط Hershey")
+            return
+        
+        backend = FreeTypeTextBackend(font_path, rtl=rtl)
+        if backend.is_available():
+            self.font_backend = backend
+            self.metrics = backend
             logger.info("تم تهيئة معالج الخطوط العربية")
-        except ImportError:
-            logger.warning("لم يتم تثبيت pygame - الخطوط العربية قد لا تعمل بشكل صحيح")
+        else:
+            logger.warning("تعذر تحميل الخط العربي - سيتم استخدام خطوط Hershey")
+    
+    def cache_fingerprint(self) -> Dict:
+        """
+        الخط وإعدادات التخطيط التي تحدد شكل الصفحة (لمفاتيح ذاكرة المراحل)
+        Font and layout settings that determine the rendered page, for cache keys
+        """
+        backend = self.font_backend
+        return {
+            'version': self.CACHE_VERSION,
+            'font': backend.font_path if backend is not None else f'hershey:{self.font}',
+            'font_file': file_identity(backend.font_path) if backend is not None else None,
+            'rtl': backend.rtl if backend is not None else None,
+            'thickness': self.font_thickness,
+            'color': self.font_color,
+            'font_size': self.font_size,
+            'size_range': (self.min_font_size, self.max_font_size),
+            'line_spacing': self.line_spacing,
+            'padding': self.text_padding,
+        }
+    
+    @staticmethod
+    def _color_for(image: np.ndarray, color: Tuple[int, int, int]) -> Tuple:
+        """
+        مطابقة اللون مع عدد قنوات الصورة
+        Match a BGR color to the image channel count
+        
+        Args:
+            image: الصورة الهدف
+            color: اللون (BGR)
+            
+        Returns:
+            اللون كما هو للصور الملونة أو درجة الإضاءة للصور الرمادية
+        """
+        if image.ndim == 2:
+            b, g, r = color
+            return (int(round(0.114 * b + 0.587 * g + 0.299 * r)),)
+        return color
     
     def render_text_on_image(self, image: np.ndarray, text: str,
                             position: Tuple[int, int],
@@ -66,20 +136,19 @@ class TextRenderer:
             logger.info(f"جاري رسم النص: {text[:30]}... في الموضع ({x}, {y})")
             
             # الحصول على حجم النص
-            text_size = cv2.getTextSize(text, self.font, self.font_scale, self.font_thickness)
-            text_width, text_height = text_size[0]
+            text_width = self.metrics.line_width(text, font_size)
+            text_height = self.metrics.ascent(font_size)
             
             # رسم خلفية بيضاء خلف النص
             cv2.rectangle(image,
                          (x - 5, y - text_height - 10),
                          (x + text_width + 5, y + 5),
-                         (255, 255, 255),
+                         self._color_for(image, (255, 255, 255)),
                          -1)
             
             # رسم النص
-            cv2.putText(image, text, (x, y),
-                       self.font, self.font_scale,
-                       self.font_color, self.font_thickness)
+            self.metrics.draw_line(image, text, x, y, font_size,
+                                   self._color_for(image, self.font_color))
             
             return image
             
@@ -95,50 +164,241 @@ class TextRenderer:
         
         Args:
             image: الصورة المدخلة
-            bubble: إحداثيات الفقاعة (x, y, w, h)
+            bubble: إحداثيات الفقاعة (x, y, w, h) أو كائن Bubble مع قناعه
             text: النص المراد رسمه
-            auto_fit: هل يتم تصغير الخط تلقائياً إذا لم يناسب الفقاعة
+            auto_fit: هل يتم اختيار أكبر خط يناسب الفقاعة تلقائياً
             
         Returns:
             الصورة برسم النص
         """
         try:
-            x, y, w, h = bubble
-            
             logger.info(f"جاري رسم النص في الفقاعة: {text[:30]}...")
             
-            # حساب موضع النص (في منتصف الفقاعة)
-            center_x = x + w // 2
-            center_y = y + h // 2
-            
-            # تقسيم النص إلى سطور إذا كان طويلاً
-            lines = self._split_text(text, w - self.text_padding * 2)
-            
-            # حساب موضع البداية للنصوص المتعددة
-            start_y = center_y - (len(lines) * 15) // 2
-            
-            # رسم كل سطر
-            for i, line in enumerate(lines):
-                line_y = start_y + i * 20
-                
-                # الحصول على حجم الخط
-                text_size = cv2.getTextSize(line, self.font, self.font_scale, self.font_thickness)
-                text_width = text_size[0][0]
-                
-                # حساب الموضع الأفقي (توسيط)
-                line_x = x + (w - text_width) // 2
-                
-                # رسم النص
-                cv2.putText(image, line, (line_x, line_y),
-                           self.font, self.font_scale,
-                           self.font_color, self.font_thickness)
+            style = TextStyle(font_size=None if auto_fit else self.font_size)
+            return self.compose_page(image, [(bubble, text, style)])
+            
+        except Exception as e:
+            logger.error(f"خطأ في رسم النص في الفقاعة: {str(e)}")
+            return image
+    
+    def compose_page(self, image: np.ndarray, jobs: List[Tuple]) -> np.ndarray:
+        """
+        رسم جميع نصوص الصفحة في تمرير واحد
+        Composite every text job of a page in a single pass
+        
+        لكل مهمة يُحسب التخطيط ثم تُرسم السطور في طبقة ألفا بحجم الفقاعة فقط،
+        وتُمزج الطبقة مع منطقة الفقاعة من الصورة مرة واحدة دون تحويل الصفحة كاملة
+        Each job is laid out, rasterized into a bubble-sized alpha layer and blended
+        into its ROI once; the full page is never converted or copied.
+        
+        المهام المكررة تُرسم مرة واحدة، وفي تداخل الفقاعات لا يُمزج البكسل المغطى
+        بنص مهمة سابقة مرة ثانية (إلا إذا أعادت المهمة تعبئة خلفيتها)
+        Duplicate jobs are drawn once, and where boxes overlap a pixel already
+        inked by an earlier job is not blended again unless the later job repaints
+        its background.
+        
+        Args:
+            image: صورة الصفحة (رمادية أو BGR) - تُعدل في مكانها
+            jobs: قائمة (الفقاعة، النص، النمط أو None)
+            
+        Returns:
+            الصورة بعد الرسم
+        """
+        try:
+            unique = {}
+            for bubble, text, style in jobs:
+                if text and text.strip():
+                    style = style or TextStyle()
+                    unique.setdefault((tuple(bubble[:4]), text, repr(style)),
+                                      (bubble, text, style))
+            jobs = list(unique.values())
+            
+            drawn = []
+            for (bubble, _, style), (_, _, layer) in zip(jobs, self.rasterize_jobs(jobs)):
+                if style.background is None:
+                    self._mask_drawn(layer, bubble, drawn)
+                self.blend_layer(image, bubble, layer, style)
+                drawn.append((bubble, layer))
             
             return image
             
         except Exception as e:
-            logger.error(f"خطأ في رسم النص في الفقاعة: {str(e)}")
+            logger.error(f"خطأ في تركيب نصوص الصفحة: {str(e)}")
             return image
     
+    @staticmethod
+    def _mask_drawn(layer: np.ndarray, bubble, drawn: List[Tuple]):
+        """تصفير ألفا الطبقة حيث رسمت طبقات سابقة متداخلة معها"""
+        x, y, w, h = bubble[:4]
+        for (ox, oy, ow, oh), other in ((b[:4], l) for b, l in drawn):
+            x0, y0 = max(x, ox), max(y, oy)
+            x1, y1 = min(x + w, ox + ow), min(y + h, oy + oh)
+            if x1 <= x0 or y1 <= y0:
+                continue
+            inked = other[y0 - oy:y1 - oy, x0 - ox:x1 - ox] > 0
+            layer[y0 - y:y1 - y, x0 - x:x1 - x][inked] = 0
+    
+    def rasterize_jobs(self, jobs: List[Tuple]) -> List[Tuple[int, List[str], np.ndarray]]:
+        """
+        تخطيط المهام ورسمها في طبقات ألفا دون لمس الصورة
+        Lay out and rasterize jobs into bubble-sized alpha layers without touching the page
+        
+        Args:
+            jobs: قائمة (الفقاعة، النص، النمط)
+            
+        Returns:
+            (حجم الخط، السطور، الطبقة) لكل مهمة
+        """
+        jobs = [(bubble, text, style or TextStyle()) for bubble, text, style in jobs]
+        return [(size, lines, self._rasterize(bubble[2], bubble[3], size, lines))
+                for (bubble, _, _), (size, lines) in zip(jobs, self._layouts(jobs))]
+    
+    def _layouts(self, jobs: List[Tuple]) -> List[Tuple[int, List[str]]]:
+        """
+        تخطيط جميع المهام مع إعادة استخدام تخطيط الفقاعات المتطابقة
+        Lay out all jobs; mask-less jobs with the same size, text and style share one layout
+        """
+        fitted = {}
+        results = []
+        
+        for bubble, text, style in jobs:
+            if getattr(bubble, 'mask', None) is not None:
+                results.append(self._layout(bubble, text, style))
+                continue
+            
+            key = (bubble[2], bubble[3], text, style.font_size, style.padding)
+            if key not in fitted:
+                fitted[key] = self._layout(bubble, text, style)
+            results.append(fitted[key])
+        
+        return results
+    
+    def _layout(self, bubble, text: str, style: TextStyle) -> Tuple[int, List[str]]:
+        """حجم الخط والسطور لمهمة واحدة"""
+        padding = self.text_padding if style.padding is None else style.padding
+        
+        if style.font_size is None:
+            return self.fit_text(text, bubble, padding)
+        
+        size = style.font_size
+        return size, self.metrics.wrap(text, max(1, bubble[2] - 2 * padding), size)
+    
+    def _rasterize(self, w: int, h: int, size: int, lines: List[str]) -> np.ndarray:
+        """
+        رسم السطور موسطة في طبقة ألفا بأبعاد الفقاعة
+        Rasterize centered lines into a bubble-sized uint8 alpha layer
+        """
+        layer = np.zeros((h, w), dtype=np.uint8)
+        
+        # توسيط كتلة السطور عمودياً
+        line_h = self.metrics.line_height(size)
+        gap = int(line_h * self.line_spacing)
+        block_h = len(lines) * line_h + (len(lines) - 1) * gap
+        start_y = (h - block_h) // 2 + self.metrics.ascent(size)
+        
+        for i, line in enumerate(lines):
+            # توسيط أفقي من عرض السطر المخزن
+            line_x = (w - self.metrics.line_width(line, size)) // 2
+            self.metrics.rasterize_line(layer, line, line_x, start_y + i * (line_h + gap), size)
+        
+        return layer
+    
+    def blend_layer(self, image: np.ndarray, bubble, layer: np.ndarray,
+                    style: Optional[TextStyle] = None,
+                    clip: Optional[Tuple[int, int, int, int]] = None):
+        """
+        مزج طبقة فقاعة مع منطقتها من الصورة
+        Blend a bubble's alpha layer into its ROI of the page
+        
+        Args:
+            image: صورة الصفحة - تُعدل في مكانها
+            bubble: الفقاعة أو صندوقها (x, y, w, h)
+            layer: طبقة الألفا بأبعاد الفقاعة
+            style: نمط الرسم - اختياري
+            clip: حصر المزج في منطقة (x, y, w, h) من الصفحة - اختياري
+        """
+        style = style or TextStyle()
+        x, y, w, h = bubble
+        
+        # القص عند حدود الصورة ومنطقة الحصر
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(image.shape[1], x + w), min(image.shape[0], y + h)
+        if clip is not None:
+            cx, cy, cw, ch = clip
+            x0, y0 = max(x0, cx), max(y0, cy)
+            x1, y1 = min(x1, cx + cw), min(y1, cy + ch)
+        if x1 <= x0 or y1 <= y0:
+            return
+        
+        roi = image[y0:y1, x0:x1]
+        local = (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x))
+        
+        # تعبئة الخلفية داخل قناع الفقاعة إن وجد وإلا الصندوق كاملاً
+        if style.background is not None:
+            fill = self._color_for(image, style.background)
+            roi_mask = bubble.roi_mask() if hasattr(bubble, 'roi_mask') else None
+            if roi_mask is not None:
+                roi[roi_mask[local] > 0] = fill
+            else:
+                roi[...] = fill
+        
+        alpha = layer[local]
+        covered = alpha > 0
+        if not np.any(covered):
+            return
+        
+        # المزج فقط على البكسلات المغطاة
+        ink = np.asarray(self._color_for(image, style.color or self.font_color), dtype=np.float32)
+        a = alpha[covered].astype(np.float32)[:, None] / 255.0
+        pixels = roi[covered].reshape(len(a), -1).astype(np.float32)
+        blended = pixels * (1.0 - a) + ink * a + 0.5
+        roi[covered] = blended.astype(image.dtype).reshape(roi[covered].shape)
+    
+    def fit_text(self, text: str, bubble,
+                 padding: Optional[int] = None) -> Tuple[int, List[str]]:
+        """
+        اختيار أكبر حجم خط يتسع في الفقاعة أو قناعها
+        Pick the largest font size whose layout fits the bubble box or mask
+        
+        Args:
+            text: النص
+            bubble: إحداثيات الفقاعة (x, y, w, h) أو كائن Bubble مع قناعه
+            padding: الحشوة داخل الفقاعة - افتراضياً text_padding
+            
+        Returns:
+            (حجم الخط بالبكسل، السطور)
+        """
+        _, _, w, h = bubble
+        pad = self.text_padding if padding is None else padding
+        box_w, box_h = max(1, w - 2 * pad), max(1, h - 2 * pad)
+        
+        # العرض المتاح لكل صف من القناع (بدون الحشوة)
+        row_widths = None
+        roi_mask = bubble.roi_mask() if hasattr(bubble, 'roi_mask') else None
+        if roi_mask is not None:
+            row_widths = np.count_nonzero(roi_mask[pad:h - pad], axis=1) - 2 * pad
+        
+        sizes = range(self.min_font_size, self.max_font_size + 1)
+        return fit_font_size(text, box_w, box_h, self.metrics, sizes,
+                             row_widths, self.line_spacing)
+    
+    def fit_bubbles(self, bubbles: List, texts: List[str]) -> List[Tuple[int, List[str]]]:
+        """
+        ملاءمة أحجام الخط لجميع فقاعات الصفحة دفعة واحدة
+        Fit font sizes for all bubbles of a page
+        
+        الفقاعات المتطابقة في الأبعاد والنص تُحسب مرة واحدة
+        Bubbles with identical size and text are fitted once.
+        
+        Args:
+            bubbles: الفقاعات
+            texts: النصوص بنفس الترتيب
+            
+        Returns:
+            (حجم الخط، السطور) لكل فقاعة
+        """
+        return self._layouts([(bubble, text, TextStyle()) for bubble, text in zip(bubbles, texts)])
+    
     def _split_text(self, text: str, max_width: int) -> List[str]:
         """
         تقسيم النص إلى سطور
@@ -152,33 +412,30 @@ class TextRenderer:
             قائمة السطور
         """
         try:
-            words = text.split()
-            lines = []
-            current_line = ""
-            
-            for word in words:
-                test_line = current_line + " " + word if current_line else word
-                
-                # حساب عرض الخط
-                text_size = cv2.getTextSize(test_line, self.font, self.font_scale, self.font_thickness)
-                text_width = text_size[0][0]
-                
-                if text_width <= max_width:
-                    current_line = test_line
-                else:
-                    if current_line:
-                        lines.append(current_line)
-                    current_line = word
-            
-            if current_line:
-                lines.append(current_line)
-            
-            return lines
+            return self.metrics.wrap(text, max_width, self.font_size)
             
         except Exception as e:
             logger.error(f"خطأ في تقسيم النص: {str(e)}")
             return [text]
     
+    def render_page(self, image: np.ndarray, page: Page,
+                    style: Optional[TextStyle] = None) -> np.ndarray:
+        """
+        رسم ترجمات جميع فقاعات الصفحة
+        Render the translation of every bubble of a page
+        
+        Args:
+            image: صورة الصفحة
+            page: الصفحة بعد الترجمة
+            style: نمط الرسم لجميع الفقاعات - اختياري
+            
+        Returns:
+            الصورة برسم الترجمات
+        """
+        jobs = [(bubble, bubble.translation, style) for bubble in page.bubbles
+                if bubble.translation]
+        return self.compose_page(image, jobs)
+    
     def render_multiple_texts(self, image: np.ndarray,
                              texts_with_positions: List[Tuple[str, Tuple[int, int]]]) -> np.ndarray:
         """
@@ -195,10 +452,19 @@ class TextRenderer:
         try:
             logger.info(f"جاري رسم {len(texts_with_positions)} نصوص...")
             
-            for text, position in texts_with_positions:
-                image = self.render_text_on_image(image, text, position)
+            # كل نص يصبح مهمة بصندوق حول موضعه وخلفية بيضاء
+            padding = 5
+            size = self.font_size
+            style = TextStyle(background=(255, 255, 255), font_size=size, padding=padding)
             
-            return image
+            jobs = []
+            for text, (x, y) in texts_with_positions:
+                box = (x - padding, y - self.metrics.ascent(size) - padding,
+                       self.metrics.line_width(text, size) + 2 * padding + 1,
+                       self.metrics.line_height(size) + 2 * padding)
+                jobs.append((box, text, style))
+            
+            return self.compose_page(image, jobs)
             
         except Exception as e:
             logger.error(f"خطأ في رسم النصوص المتعددة: {str(e)}")
@@ -225,7 +491,7 @@ class TextRenderer:
             x, y, w, h = bubble
             
             # رسم مستطيل الفقاعة
-            cv2.rectangle(image, (x, y), (x + w, y + h), color, thickness)
+            cv2.rectangle(image, (x, y), (x + w, y + h), self._color_for(image, color), thickness)
             
             logger.info(f"تم رسم حدود الفقاعة")
             return image
@@ -245,13 +511,10 @@ class TextRenderer:
             bubble_height: ارتفاع الفقاعة
             
         Returns:
-            حجم الخط المناسب
+            حجم الخط المناسب (بالبكسل)
         """
         try:
-            # حساب مبسط لحجم الخط
-            font_size = min(bubble_width, bubble_height) // (len(text) + 1)
-            font_size = max(8, min(font_size, 20))  # بين 8 و 20
-            
+            font_size, _ = self.fit_text(text, (0, 0, bubble_width, bubble_height))
             return font_size
             
         except Exception as e:
@@ -282,27 +545,26 @@ class TextRenderer:
             x, y = position
             
             # الحصول على حجم النص
-            text_size = cv2.getTextSize(text, self.font, self.font_scale, self.font_thickness)
-            text_width, text_height = text_size[0]
+            text_width = self.metrics.line_width(text, self.font_size)
+            text_height = self.metrics.ascent(self.font_size)
             
             # رسم الخلفية
             cv2.rectangle(image,
                          (x - padding, y - text_height - padding),
                          (x + text_width + padding, y + padding),
-                         bg_color,
+                         self._color_for(image, bg_color),
                          -1)
             
             # رسم حد حول الخلفية
             cv2.rectangle(image,
                          (x - padding, y - text_height - padding),
                          (x + text_width + padding, y + padding),
-                         (0, 0, 0),
+                         self._color_for(image, (0, 0, 0)),
                          1)
             
             # رسم النص
-            cv2.putText(image, text, (x, y),
-                       self.font, self.font_scale,
-                       text_color, self.font_thickness)
+            self.metrics.draw_line(image, text, x, y, self.font_size,
+                                   self._color_for(image, text_color))
             
             return image
             
@@ -7,6 +7,8 @@ import logging
 from typing import List, Optional, Dict
 import numpy as np
 
+from src.data_model import Page
+
 logger = logging.getLogger(__name__)
 
 
@@ -16,6 +18,9 @@ class AITranslator:
     Class for AI-powered translation
     """
     
+    # يُرفع عند تغيير طريقة الترجمة لإبطال النتائج المخزنة
+    CACHE_VERSION = 1
+    
     def __init__(self, source_lang: str = 'en', target_lang: str = 'ar'):
         """
         تهيئة المترجم
@@ -29,6 +34,7 @@ class AITranslator:
         
         self.source_lang = source_lang
         self.target_lang = target_lang
+        self.model_name = "facebook/m2m100_418M"
         self.model = None
         self.tokenizer = None
         
@@ -44,7 +50,7 @@ class AITranslator:
             from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
             
             # استخدام نموذج M2M100 للترجمة
-            model_name = "facebook/m2m100_418M"
+            model_name = self.model_name
             logger.info(f"جاري تحميل النموذج: {model_name}")
             
             self.tokenizer = AutoTokenizer.from_pretrained(model_name)
@@ -61,6 +67,18 @@ class AITranslator:
             self.model = None
             self.tokenizer = None
     
+    def cache_fingerprint(self) -> Dict:
+        """
+        النموذج واللغات التي تحدد الترجمة (لمفاتيح ذاكرة المراحل)
+        Model and language pair that determine translations, for artifact cache keys
+        """
+        return {
+            'version': self.CACHE_VERSION,
+            'model': self.model_name if self.model is not None else None,
+            'source': self.source_lang,
+            'target': self.target_lang,
+        }
+    
     def translate_text(self, text: str) -> Optional[str]:
         """
         ترجمة نص واحد
@@ -128,5 +146,33 @@ class AITranslator:
                 translated = self.translate_text(text)
                 translated_texts.append(translated if translated else text)
                 
-                # ط**
-
+                # طباعة التقدم
+                if (i + 1) % 10 == 0:
+                    logger.info(f"تم ترجمة {i + 1}/{len(texts)} نصوص")
+            
+            return translated_texts
+            
+        except Exception as e:
+            logger.error(f"خطأ في الترجمة الدفعية: {str(e)}")
+            return texts
+    
+    def translate_page(self, page: Page) -> Page:
+        """
+        ترجمة نصوص جميع فقاعات الصفحة
+        Translate the text of every bubble of a page in one batch
+        
+        Args:
+            page: الصفحة بعد استخراج النصوص
+            
+        Returns:
+            الصفحة نفسها بعد تعبئة الترجمات
+        """
+        bubbles = page.text_bubbles()
+        if not bubbles:
+            return page
+        
+        translations = self.translate_batch([b.text for b in bubbles])
+        for bubble, translation in zip(bubbles, translations):
+            bubble.translation = translation
+        
+        return page
@@ -8,6 +8,8 @@ from typing import List, Tuple, Optional, Dict
 import numpy as np
 from pathlib import Path
 
+from src.data_model import Page, TextItem
+
 logger = logging.getLogger(__name__)
 
 
@@ -17,21 +19,48 @@ class TextExtractor:
     Class for extracting text from images
     """
     
+    # يُرفع عند تغيير منطق الاستخراج أو التنظيف لإبطال النتائج المخزنة
+    CACHE_VERSION = 2
+    
     def __init__(self):
         """تهيئة معالج النصوص"""
         logger.info("تهيئة معالج استخراج النصوص...")
         self.language = 'en'  # اللغة الافتراضية
         self.min_confidence = 0.5  # الحد الأدنى للثقة
         
+        # أقصى بُعد يقبله كاشف OCR دون تصغير (بعرض مخزن القصاصات الافتراضي)
+        self.det_limit_side_len = 2048
+        
         try:
             from paddleocr import PaddleOCR
-            self.ocr = PaddleOCR(use_angle_cls=True, lang=['en'])
+            self.ocr = PaddleOCR(use_angle_cls=True, lang=['en'],
+                                 det_limit_side_len=self.det_limit_side_len,
+                                 det_limit_type='max')
             logger.info("تم تحميل نموذج PaddleOCR بنجاح")
         except ImportError:
             logger.warning("لم يتم تثبيت PaddleOCR - قد تحتاج إلى تثبيته")
             self.ocr = None
     
-    def extract_text(self, image: np.ndarray) -> List[Dict]:
+    def cache_fingerprint(self) -> Dict:
+        """
+        إعدادات OCR التي تؤثر على نتائجه (لمفاتيح ذاكرة المراحل)
+        Settings and engine version that determine OCR output, for artifact cache keys
+        """
+        engine_version = None
+        if self.ocr is not None:
+            import paddleocr
+            engine_version = getattr(paddleocr, '__version__', None)
+        
+        return {
+            'version': self.CACHE_VERSION,
+            'engine': 'paddleocr' if self.ocr is not None else None,
+            'engine_version': engine_version,
+            'language': self.language,
+            'min_confidence': self.min_confidence,
+            'det_limit_side_len': self.det_limit_side_len,
+        }
+    
+    def extract_text(self, image: np.ndarray) -> List[TextItem]:
         """
         استخراج النصوص من الصورة
         Extract text from image
@@ -40,7 +69,7 @@ class TextExtractor:
             image: صورة نمباي
             
         Returns:
-            قائمة بقواميس تحتوي على النصوص والإحداثيات
+            قائمة النصوص مع إحداثياتها
         """
         try:
             if self.ocr is None:
@@ -54,18 +83,8 @@ class TextExtractor:
             
             extracted_texts = []
             
-            if results and results[0]:
-                for line in results[0]:
-                    for word_info in line:
-                        bbox, (text, confidence) = word_info
-                        
-                        # تصفية النصوص ذات الثقة المنخفضة
-                        if confidence >= self.min_confidence:
-                            extracted_texts.append({
-                                'text': text,
-                                'confidence': confidence,
-                                'bbox': bbox,  # إحداثيات الصندوق
-                            })
+            for bbox, text, confidence in self._iter_ocr_lines(results):
+                extracted_texts.append(TextItem(text, confidence, bbox))
             
             logger.info(f"تم استخراج {len(extracted_texts)} نص")
             return extracted_texts
@@ -91,23 +110,126 @@ class TextExtractor:
             
             results = self.ocr.ocr(bubble_image, cls=True)
             
-            if results and results[0]:
-                full_text = ""
-                for line in results[0]:
-                    for word_info in line:
-                        _, (text, confidence) = word_info
-                        if confidence >= self.min_confidence:
-                            full_text += text + " "
-                
-                return full_text.strip()
-            
-            return None
+            lines = [text for _, text, _ in self._iter_ocr_lines(results)]
+            return " ".join(lines) if lines else None
             
         except Exception as e:
             logger.error(f"خطأ في استخراج النص من الفقاعة: {str(e)}")
             return None
     
-    def get_text_bounding_boxes(self, extracted_texts: List[Dict]) -> List[Tuple]:
+    def _iter_ocr_lines(self, results):
+        """
+        قراءة أسطر نتائج PaddleOCR مع تصفية الثقة المنخفضة
+        Iterate PaddleOCR lines as (bbox, text, confidence), dropping low confidence
+        
+        Args:
+            results: مخرجات self.ocr.ocr لصورة واحدة
+        """
+        if not results or not results[0]:
+            return
+        
+        for bbox, (text, confidence) in results[0]:
+            if confidence >= self.min_confidence:
+                yield bbox, text, confidence
+    
+    def extract_text_from_arena(self, arena) -> List[List[TextItem]]:
+        """
+        استخراج نصوص جميع القصاصات المجمعة بتمرير OCR واحد
+        Extract text of all packed crops with a single OCR pass
+        
+        المخزن الأطول من حد الكاشف يُقسم عند حدود الرفوف حتى لا يُصغر
+        An arena taller than the detector limit is split at shelf boundaries so
+        it is never downscaled.
+        
+        السطر الذي يتقاطع مع قصاصتين (دمجهما الكاشف عبر الحشوة) يُهمل، وتُقرأ
+        القصاصات المعنية كل منها منفردة
+        A line overlapping two crops (merged by the detector across the padding) is
+        dropped and each affected crop is recognized on its own instead.
+        
+        Args:
+            arena: مخزن القصاصات (CropArena)
+            
+        Returns:
+            لكل قصاصة قائمة نصوص بإحداثيات الصفحة الأصلية
+        """
+        per_crop = [[] for _ in range(len(arena))]
+        
+        try:
+            if self.ocr is None:
+                logger.error("نموذج OCR غير محمل")
+                return per_crop
+            
+            if not len(arena):
+                return per_crop
+            
+            logger.info(f"جاري استخراج النصوص من {len(arena)} فقاعة دفعة واحدة...")
+            
+            merged = set()
+            for top, tile in arena.packed_slices(self.det_limit_side_len):
+                results = self.ocr.ocr(tile, cls=True)
+                
+                for bbox, text, confidence in self._iter_ocr_lines(results):
+                    points = np.asarray(bbox, dtype=np.float32) + (0, top)
+                    
+                    # ربط السطر بالقصاصة الوحيدة التي يتقاطع معها
+                    hits = arena.overlapping(*points.min(axis=0), *points.max(axis=0))
+                    if len(hits) > 1:
+                        merged.update(int(i) for i in hits)
+                        continue
+                    if not len(hits):
+                        continue
+                    
+                    index = int(hits[0])
+                    per_crop[index].append(
+                        TextItem(text, confidence, arena.to_page_coords(index, points)))
+            
+            # إعادة قراءة القصاصات التي دُمجت أسطرها مع قصاصة أخرى
+            for index in sorted(merged):
+                entry = arena.get_offsets()[index]
+                results = self.ocr.ocr(arena.view(index), cls=True)
+                per_crop[index] = [
+                    TextItem(text, confidence, arena.to_page_coords(
+                        index, np.asarray(bbox, dtype=np.float32) +
+                        (entry['arena_x'], entry['arena_y'])))
+                    for bbox, text, confidence in self._iter_ocr_lines(results)]
+            if merged:
+                logger.info(f"إعادة قراءة {len(merged)} قصاصة دُمجت أسطرها")
+            
+            # ترتيب الأسطر من الأعلى إلى الأسفل داخل كل فقاعة
+            for items in per_crop:
+                items.sort(key=lambda item: (item.bbox[0][1], item.bbox[0][0]))
+            
+            return per_crop
+            
+        except Exception as e:
+            logger.error(f"خطأ في استخراج النصوص من المخزن: {str(e)}")
+            return per_crop
+    
+    def extract_page_text(self, page: Page, image: np.ndarray, arena) -> Page:
+        """
+        استخراج نصوص جميع فقاعات الصفحة وتعبئة حقولها
+        Fill items and text of every bubble of a page with one OCR pass
+        
+        Args:
+            page: الصفحة مع فقاعاتها
+            image: صورة الصفحة
+            arena: مخزن القصاصات المعاد استخدامه
+            
+        Returns:
+            الصفحة نفسها بعد التعبئة
+        """
+        arena.reset()
+        arena.add_page(image, page.bubbles)
+        items_per_crop = self.extract_text_from_arena(arena)
+        
+        for entry, items in zip(arena.get_offsets(), items_per_crop):
+            bubble = page.bubbles[entry['bubble']]
+            bubble.items = items
+            bubble.text = self.clean_text(' '.join(item.text for item in items))
+        
+        return page
+    
+    def get_text_bounding_boxes(self, extracted_texts: List[TextItem]) -> List[Tuple]:
         """
         الحصول على صناديق الإحاطة للنصوص
         Get bounding boxes for extracted texts
@@ -121,7 +243,7 @@ class TextExtractor:
         try:
             bboxes = []
             for item in extracted_texts:
-                bbox = item.get('bbox')
+                bbox = item.bbox
                 if bbox:
                     # تحويل الإحداثيات إلى صيغة قياسية (x, y, w, h)
                     points = np.array(bbox, dtype=np.int32)
@@ -135,7 +257,8 @@ class TextExtractor:
             logger.error(f"خطأ في الحصول على صناديق الإحاطة: {str(e)}")
             return []
     
-    def filter_text_by_language(self, texts: List[Dict], language: str = 'en') -> List[Dict]:
+    def filter_text_by_language(self, texts: List[TextItem],
+                                language: str = 'en') -> List[TextItem]:
         """
         تصفية النصوص حسب اللغة
         Filter texts by language
@@ -152,7 +275,7 @@ class TextExtractor:
             
             filtered_texts = []
             for text_item in texts:
-                text = text_item.get('text', '')
+                text = text_item.text
                 
                 # تصفية بسيطة بناءً على الأحرف
                 if language == 'en':
@@ -171,8 +294,8 @@ class TextExtractor:
             logger.error(f"خطأ في تصفية النصوص: {str(e)}")
             return texts
     
-    def merge_adjacent_texts(self, texts: List[Dict], 
-                            distance_threshold: int = 10) -> List[Dict]:
+    def merge_adjacent_texts(self, texts: List[TextItem], 
+                            distance_threshold: int = 10) -> List[TextItem]:
         """
         دمج النصوص المتجاورة
         Merge adjacent texts
@@ -195,8 +318,8 @@ class TextExtractor:
             
             for i in range(1, len(texts)):
                 # حساب المسافة بين النصوص
-                current_bbox = current_group[-1]['bbox']
-                next_bbox = texts[i]['bbox']
+                current_bbox = current_group[-1].bbox
+                next_bbox = texts[i].bbox
                 
                 # مسافة مبسطة
                 distance = abs(next_bbox[0][0] - current_bbox[-1][0])
@@ -205,22 +328,18 @@ class TextExtractor:
                     current_group.append(texts[i])
                 else:
                     # إنشاء نص مدمج
-                    merged_text = ' '.join([t['text'] for t in current_group])
-                    merged.append({
-                        'text': merged_text,
-                        'confidence': np.mean([t['confidence'] for t in current_group]),
-                        'bbox': current_group[0]['bbox'],
-                    })
+                    merged_text = ' '.join([t.text for t in current_group])
+                    merged.append(TextItem(merged_text,
+                                           np.mean([t.confidence for t in current_group]),
+                                           current_group[0].bbox))
                     current_group = [texts[i]]
             
             # إضافة المجموعة الأخيرة
             if current_group:
-                merged_text = ' '.join([t['text'] for t in current_group])
-                merged.append({
-                    'text': merged_text,
-                    'confidence': np.mean([t['confidence'] for t in current_group]),
-                    'bbox': current_group[0]['bbox'],
-                })
+                merged_text = ' '.join([t.text for t in current_group])
+                merged.append(TextItem(merged_text,
+                                       np.mean([t.confidence for t in current_group]),
+                                       current_group[0].bbox))
             
             logger.info(f"تم دمج {len(texts)} نص إلى {len(merged)} نص")
             return merged
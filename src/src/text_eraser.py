@@ -0,0 +1,206 @@
+"""
+مسح النص الأصلي من الفقاعات قبل رسم الترجمة
+Erase source text inside bubble ROIs before rendering
+"""
+
+import logging
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+from src.data_model import Bubble, Page
+
+logger = logging.getLogger(__name__)
+
+
+class TextEraser:
+    """
+    فئة مسح النصوص داخل الفقاعات
+    Erases OCR'd text with a flat fill or inpainting, one bubble ROI at a time
+
+    جميع العمليات تتم على منطقة الفقاعة فقط، لذا تكلفة الصفحة تتناسب مع مساحة
+    الفقاعات لا مع دقة الصفحة
+    Every operation is limited to the bubble ROI, so the cost of a page scales with
+    bubble area rather than page resolution.
+    """
+
+    def __init__(self, inpaint_radius: int = 3, dilation: int = 3,
+                 uniform_std: float = 12.0, method: str = 'telea'):
+        """
+        Args:
+            inpaint_radius: نصف قطر الترميم
+            dilation: توسيع قناع النص بالبكسل لتغطية حواف الحروف
+            uniform_std: أقصى انحراف معياري لخلفية الفقاعة لاعتبارها موحدة اللون
+            method: خوارزمية الترميم (telea أو ns)
+        """
+        self.inpaint_radius = inpaint_radius
+        self.dilation = dilation
+        self.uniform_std = uniform_std
+        self.inpaint_flag = cv2.INPAINT_NS if method == 'ns' else cv2.INPAINT_TELEA
+
+        # عداد الفقاعات حسب طريقة المسح
+        self.stats = {'flat_fill': 0, 'inpainted': 0, 'skipped': 0}
+
+    def cache_fingerprint(self) -> Dict:
+        """إعدادات المسح (لمفاتيح ذاكرة المراحل)"""
+        return {
+            'inpaint_radius': self.inpaint_radius,
+            'dilation': self.dilation,
+            'uniform_std': self.uniform_std,
+            'inpaint_flag': self.inpaint_flag,
+        }
+
+    def build_mask(self, image: np.ndarray, bubble: Bubble) -> Optional[np.ndarray]:
+        """
+        بناء قناع النص بأبعاد الفقاعة
+        Build an ROI-local text mask for a bubble
+
+        يُبنى القناع من مضلعات OCR، وعند غيابها (نتائج من الفهرس) من البكسلات
+        الداكنة داخل قناع الفقاعة. وإذا لم يوجد قناع أيضاً (نتائج الفهرس أو كاشف
+        ONNX) تُستخدم البكسلات الداكنة داخل الصندوق بعد تقليصه
+        The mask comes from the OCR polygons; when there are none (results reused from
+        the page index) the dark pixels inside the bubble mask are used instead. With
+        no bubble mask either (index results, ONNX detector) the dark strokes inside
+        the eroded bubble box are used.
+
+        Args:
+            image: صورة الصفحة
+            bubble: الفقاعة
+
+        Returns:
+            قناع uint8 بأبعاد (h, w) أو None
+        """
+        x, y, w, h = bubble
+        roi_mask = bubble.roi_mask()
+
+        if bubble.items:
+            mask = np.zeros((h, w), dtype=np.uint8)
+            polygons = [np.round(np.asarray(item.bbox) - (x, y)).astype(np.int32)
+                        for item in bubble.items]
+            cv2.fillPoly(mask, polygons, 255)
+        elif roi_mask is not None:
+            roi = image[y:y+h, x:x+w]
+            gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY) if roi.ndim == 3 else roi
+
+            # تقليص قناع الفقاعة حتى لا يُعتبر إطارها نصاً
+            kernel = np.ones((2 * self.dilation + 1, 2 * self.dilation + 1), np.uint8)
+            interior = cv2.erode(roi_mask, kernel) > 0
+            if not np.any(interior):
+                return None
+
+            threshold, _ = cv2.threshold(gray[interior], 0, 255,
+                                         cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            mask = ((gray < threshold) & interior).astype(np.uint8) * 255
+        else:
+            mask = self._box_stroke_mask(image[y:y+h, x:x+w])
+            if mask is None:
+                return None
+
+        if self.dilation > 0:
+            kernel = np.ones((2 * self.dilation + 1, 2 * self.dilation + 1), np.uint8)
+            mask = cv2.dilate(mask, kernel)
+
+        # عدم المسح خارج الفقاعة
+        if roi_mask is not None:
+            mask &= roi_mask
+
+        return mask if np.any(mask) else None
+
+    def _box_stroke_mask(self, roi: np.ndarray) -> Optional[np.ndarray]:
+        """
+        قناع الخطوط الداكنة داخل صندوق الفقاعة بعد تقليصه
+        Dark-stroke mask inside the eroded bubble box
+
+        العتبة بطريقة Otsu داخل الصندوق المقلص، ثم تُستبعد المكونات الداكنة
+        الملامسة لحافته لأنها إطار الفقاعة أو الرسم المحيط بها لا النص
+        Otsu inside the eroded box, then dark components touching its edge are
+        dropped: those are the bubble outline or surrounding art, not text.
+        """
+        h, w = roi.shape[:2]
+        margin = self.dilation + max(1, min(h, w) // 20)
+        if h <= 2 * margin or w <= 2 * margin:
+            return None
+
+        gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY) if roi.ndim == 3 else roi
+        inner = gray[margin:h - margin, margin:w - margin]
+        threshold, _ = cv2.threshold(inner, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+        dark = (inner < threshold).astype(np.uint8)
+        count, labels = cv2.connectedComponents(dark, connectivity=8)
+        if count <= 1:
+            return None
+
+        edge = np.concatenate([labels[0], labels[-1], labels[:, 0], labels[:, -1]])
+        strokes = np.isin(labels, np.setdiff1d(np.arange(1, count), edge))
+
+        mask = np.zeros((h, w), dtype=np.uint8)
+        mask[margin:h - margin, margin:w - margin][strokes] = 255
+        return mask
+
+    def erase_bubble(self, image: np.ndarray, bubble: Bubble) -> np.ndarray:
+        """
+        مسح نص فقاعة واحدة
+        Erase the text of one bubble in place
+
+        Args:
+            image: صورة الصفحة
+            bubble: الفقاعة
+
+        Returns:
+            الصورة بعد المسح
+        """
+        try:
+            x, y, w, h = bubble
+            roi = image[y:y+h, x:x+w]
+            if roi.size == 0 or roi.shape[:2] != (h, w):
+                self.stats['skipped'] += 1
+                return image
+
+            mask = self.build_mask(image, bubble)
+            if mask is None:
+                self.stats['skipped'] += 1
+                return image
+
+            text = mask > 0
+
+            # الخلفية: داخل الفقاعة وخارج النص
+            background = ~text
+            roi_mask = bubble.roi_mask()
+            if roi_mask is not None:
+                background &= roi_mask > 0
+
+            pixels = roi[background]
+            if len(pixels) and pixels.reshape(len(pixels), -1).std(axis=0).max() <= self.uniform_std:
+                # فقاعة موحدة اللون: تعبئة مسطحة بلون الخلفية
+                roi[text] = np.median(pixels.reshape(len(pixels), -1), axis=0).astype(image.dtype)
+                self.stats['flat_fill'] += 1
+            else:
+                roi[...] = cv2.inpaint(roi, mask, self.inpaint_radius, self.inpaint_flag)
+                self.stats['inpainted'] += 1
+
+            return image
+
+        except Exception as e:
+            logger.error(f"خطأ في مسح نص الفقاعة: {str(e)}")
+            return image
+
+    def erase_page(self, image: np.ndarray, page: Page) -> np.ndarray:
+        """
+        مسح نصوص جميع فقاعات الصفحة
+        Erase the source text of every text bubble of a page
+
+        Args:
+            image: صورة الصفحة بدقتها الأصلية
+            page: الصفحة بعد الاستخراج
+
+        Returns:
+            الصورة بعد المسح
+        """
+        for bubble in page.text_bubbles():
+            image = self.erase_bubble(image, bubble)
+        return image
+
+    def get_stats(self) -> Dict[str, int]:
+        """إحصائيات طرق المسح"""
+        return self.stats.copy()
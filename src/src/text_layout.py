@@ -0,0 +1,287 @@
+"""
+قياس النصوص وتقسيمها إلى سطور
+Text measurement cache and line wrapping
+"""
+
+import logging
+from collections import OrderedDict
+from typing import Callable, Hashable, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class TextMeasureCache:
+    """
+    ذاكرة مؤقتة لقياسات النصوص
+    LRU cache of text measurements keyed by (font, scale, thickness, token)
+
+    عرض السطر يُحسب بجمع عروض الكلمات المخزنة مع طرح الزيادة الثابتة التي
+    يضيفها cv2.getTextSize لكل قياس، فلا يُعاد قياس السطر المتنامي
+    Line widths are sums of cached word widths minus the constant per-call overhead
+    of cv2.getTextSize, so a growing line is never re-measured.
+    """
+
+    def __init__(self, max_entries: int = 50000):
+        """
+        Args:
+            max_entries: أقصى عدد من القياسات المخزنة
+        """
+        self.max_entries = max_entries
+        self._sizes: "OrderedDict[Hashable, Tuple[int, int, int]]" = OrderedDict()
+        self._overheads = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+    def measure(self, token: str, font: int, scale: float,
+                thickness: int) -> Tuple[int, int, int]:
+        """
+        قياس نص (مع التخزين)
+        Measure a token with cv2.getTextSize, cached
+
+        Returns:
+            (العرض، الارتفاع، خط الأساس)
+        """
+        key = (font, scale, thickness, token)
+        size = self._sizes.get(key)
+
+        if size is not None:
+            self.hits += 1
+            self._sizes.move_to_end(key)
+            return size
+
+        self.misses += 1
+        (width, height), baseline = cv2.getTextSize(token, font, scale, thickness)
+        size = (width, height, baseline)
+
+        self._sizes[key] = size
+        if len(self._sizes) > self.max_entries:
+            self._sizes.popitem(last=False)
+        return size
+
+    def width(self, token: str, font: int, scale: float, thickness: int) -> int:
+        """عرض النص بالبكسل"""
+        return self.measure(token, font, scale, thickness)[0]
+
+    def overhead(self, font: int, scale: float, thickness: int) -> int:
+        """
+        الزيادة الثابتة التي يضيفها كل قياس (تُطرح عند جمع العروض)
+        Constant per-measurement overhead subtracted when summing widths
+        """
+        key = (font, scale, thickness)
+        if key not in self._overheads:
+            single = cv2.getTextSize('n', font, scale, thickness)[0][0]
+            double = cv2.getTextSize('nn', font, scale, thickness)[0][0]
+            self._overheads[key] = max(0, 2 * single - double)
+        return self._overheads[key]
+
+    def line_width(self, line: str, font: int, scale: float, thickness: int) -> int:
+        """
+        عرض سطر كامل من عروض كلماته المخزنة
+        Width of a line summed from cached word widths
+        """
+        words = line.split()
+        if not words:
+            return 0
+
+        overhead = self.overhead(font, scale, thickness)
+        total = sum(self.width(word, font, scale, thickness) for word in words)
+        spaces = (len(words) - 1) * (self.width(' ', font, scale, thickness) - 2 * overhead)
+        return total + spaces
+
+    def line_height(self, font: int, scale: float, thickness: int) -> int:
+        """ارتفاع السطر (الارتفاع مع خط الأساس)"""
+        _, height, baseline = self.measure('Hg', font, scale, thickness)
+        return height + baseline
+
+    def wrap(self, text: str, max_width: int, font: int, scale: float,
+             thickness: int) -> List[str]:
+        """
+        تقسيم النص إلى سطور باستخدام القياسات المخزنة
+        Wrap text using cached word widths
+        """
+        return wrap_words(text.split(), max_width,
+                          lambda token: self.width(token, font, scale, thickness),
+                          self.width(' ', font, scale, thickness),
+                          self.overhead(font, scale, thickness))
+
+
+def wrap_words(words: List[str], max_width: int, measure: Callable[[str], int],
+               space_width: int, overhead: int = 0) -> List[str]:
+    """
+    تقسيم الكلمات إلى سطور في زمن خطي
+    Greedy line wrapping in linear time
+
+    كل كلمة تُقاس مرة واحدة ويُحدَّث عرض السطر بالجمع
+    Each word is measured once and the line width is updated incrementally.
+
+    Args:
+        words: الكلمات
+        max_width: أقصى عرض للسطر
+        measure: دالة تعيد عرض الكلمة
+        space_width: عرض المسافة
+        overhead: الزيادة الثابتة لكل قياس
+
+    Returns:
+        قائمة السطور
+    """
+    lines = []
+    current: List[str] = []
+    current_width = 0
+
+    for word in words:
+        word_width = measure(word)
+
+        if current:
+            candidate = current_width + space_width + word_width - 2 * overhead
+            if candidate <= max_width:
+                current.append(word)
+                current_width = candidate
+                continue
+            lines.append(' '.join(current))
+
+        current = [word]
+        current_width = word_width
+
+    if current:
+        lines.append(' '.join(current))
+
+    return lines
+
+
+class HersheyMetrics:
+    """
+    مقاييس خطوط Hershey بأحجام بالبكسل
+    Pixel-size metrics for OpenCV Hershey fonts backed by a TextMeasureCache
+    """
+
+    def __init__(self, cache: TextMeasureCache, font: int, thickness: int):
+        self.cache = cache
+        self.font = font
+        self.thickness = thickness
+        self._scales = {}
+
+    def scale(self, size: int) -> float:
+        """معامل التحجيم المقابل لارتفاع الخط بالبكسل"""
+        if size not in self._scales:
+            self._scales[size] = cv2.getFontScaleFromHeight(self.font, size, self.thickness)
+        return self._scales[size]
+
+    def wrap(self, text: str, max_width: int, size: int) -> List[str]:
+        return self.cache.wrap(text, max_width, self.font, self.scale(size), self.thickness)
+
+    def line_width(self, line: str, size: int) -> int:
+        return self.cache.line_width(line, self.font, self.scale(size), self.thickness)
+
+    def line_height(self, size: int) -> int:
+        return self.cache.line_height(self.font, self.scale(size), self.thickness)
+
+    def ascent(self, size: int) -> int:
+        """المسافة من أعلى السطر إلى خط الأساس"""
+        return self.cache.measure('Hg', self.font, self.scale(size), self.thickness)[1]
+
+    def draw_line(self, image: np.ndarray, line: str, x: int, baseline: int,
+                  size: int, color: Tuple) -> np.ndarray:
+        """رسم سطر بـ cv2.putText"""
+        cv2.putText(image, line, (x, baseline), self.font, self.scale(size),
+                    color, self.thickness)
+        return image
+
+    def rasterize_line(self, layer: np.ndarray, line: str, x: int, baseline: int,
+                       size: int) -> np.ndarray:
+        """رسم تغطية السطر (0-255) في طبقة ألفا"""
+        cv2.putText(layer, line, (x, baseline), self.font, self.scale(size),
+                    255, self.thickness, cv2.LINE_AA)
+        return layer
+
+
+def layout_fits(lines: List[str], size: int, box_w: int, box_h: int, metrics,
+                row_widths: Optional[np.ndarray] = None, line_spacing: float = 0.2) -> bool:
+    """
+    هل يتسع التخطيط داخل الصندوق (أو القناع)؟
+    Check whether a wrapped layout fits the box, and the mask rows if given
+
+    Args:
+        lines: السطور
+        size: حجم الخط بالبكسل
+        box_w: عرض الصندوق
+        box_h: ارتفاع الصندوق
+        metrics: مقاييس الخط (wrap, line_width, line_height)
+        row_widths: العرض المتاح لكل صف من القناع - اختياري
+        line_spacing: المسافة بين السطور كنسبة من ارتفاع السطر
+
+    Returns:
+        True إذا اتسع التخطيط
+    """
+    line_h = metrics.line_height(size)
+    gap = int(line_h * line_spacing)
+    total_h = len(lines) * line_h + (len(lines) - 1) * gap
+
+    if total_h > box_h:
+        return False
+
+    widths = [metrics.line_width(line, size) for line in lines]
+    if max(widths, default=0) > box_w:
+        return False
+
+    if row_widths is None:
+        return True
+
+    # كل سطر يجب أن يتسع في أضيق صف من نطاقه داخل القناع
+    top = (len(row_widths) - total_h) // 2
+    for i, width in enumerate(widths):
+        band = row_widths[top + i * (line_h + gap): top + i * (line_h + gap) + line_h]
+        if len(band) and width > band.min():
+            return False
+
+    return True
+
+
+def fit_font_size(text: str, box_w: int, box_h: int, metrics, sizes: Sequence[int],
+                  row_widths: Optional[np.ndarray] = None,
+                  line_spacing: float = 0.2) -> Tuple[int, List[str]]:
+    """
+    البحث الثنائي عن أكبر حجم خط يتسع تخطيطه داخل الفقاعة
+    Binary-search the largest font size whose wrapped layout fits
+
+    كل محاولة تكلف تمرير تخطيط واحد بالقياسات المخزنة، أي O(log عدد الأحجام)
+    Each probe is one layout pass over cached metrics, so a bubble costs
+    O(log len(sizes)) passes.
+
+    Args:
+        text: النص
+        box_w: العرض المتاح
+        box_h: الارتفاع المتاح
+        metrics: مقاييس الخط
+        sizes: الأحجام المرشحة بترتيب تصاعدي
+        row_widths: العرض المتاح لكل صف من القناع - اختياري
+        line_spacing: المسافة بين السطور كنسبة من ارتفاع السطر
+
+    Returns:
+        (حجم الخط، السطور)
+    """
+    def layout(size: int) -> List[str]:
+        return metrics.wrap(text, box_w, size)
+
+    lo, hi = 0, len(sizes) - 1
+    best_size, best_lines = sizes[0], None
+
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        lines = layout(sizes[mid])
+        if layout_fits(lines, sizes[mid], box_w, box_h, metrics, row_widths, line_spacing):
+            best_size, best_lines = sizes[mid], lines
+            lo = mid + 1
+        else:
+            hi = mid - 1
+
+    # لا يوجد حجم يتسع: استخدام أصغر حجم
+    if best_lines is None:
+        best_lines = layout(best_size)
+
+    return best_size, best_lines
@@ -0,0 +1,43 @@
+"""
+إعدادات الاختبارات المشتركة
+Shared pytest fixtures
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+
+def draw_page(width: int = 800, height: int = 1100, texts=('HELLO', 'WORLD')) -> np.ndarray:
+    """
+    صفحة مانجا اصطناعية: خلفية رمادية وفقاعات بيضاء بحدود سوداء وبداخلها نص
+    Synthetic manga page: gray background, outlined white bubbles, dark text
+    """
+    page = np.full((height, width, 3), 110, dtype=np.uint8)
+    for i, text in enumerate(texts):
+        cx, cy = width // 2, 200 + i * 350
+        cv2.ellipse(page, (cx, cy), (220, 120), 0, 0, 360, (255, 255, 255), -1)
+        cv2.ellipse(page, (cx, cy), (220, 120), 0, 0, 360, (0, 0, 0), 3)
+        cv2.putText(page, text, (cx - 120, cy + 15), cv2.FONT_HERSHEY_SIMPLEX,
+                    1.6, (20, 20, 20), 4, cv2.LINE_AA)
+    return page
+
+
+@pytest.fixture
+def page_image() -> np.ndarray:
+    """صفحة ملونة (BGR) بفقاعتين"""
+    return draw_page()
+
+
+@pytest.fixture
+def gray_page(page_image) -> np.ndarray:
+    """نفس الصفحة بقناة واحدة"""
+    return cv2.cvtColor(page_image, cv2.COLOR_BGR2GRAY)
+
+
+@pytest.fixture
+def noisy_page(page_image) -> np.ndarray:
+    """الصفحة مع ضوضاء غاوسية قوية"""
+    rng = np.random.default_rng(0)
+    noise = rng.normal(0, 25, page_image.shape)
+    return np.clip(page_image.astype(np.float32) + noise, 0, 255).astype(np.uint8)
@@ -0,0 +1,47 @@
+"""
+اختبارات سجل JSON Lines
+Tests for AppendOnlyLog
+"""
+
+import pytest
+
+from src.append_log import AppendOnlyLog
+
+
+@pytest.mark.unit
+def test_records_round_trip(tmp_path):
+    with AppendOnlyLog(tmp_path / 'log.jsonl', fsync=False) as log:
+        log.append({'page': '1.png', 'path': tmp_path})
+        log.append({'page': 'صفحة', 'status': 'done'})
+
+    assert list(AppendOnlyLog(tmp_path / 'log.jsonl').records()) == [
+        {'page': '1.png', 'path': str(tmp_path)}, {'page': 'صفحة', 'status': 'done'}]
+
+
+@pytest.mark.unit
+def test_missing_file_has_no_records(tmp_path):
+    assert list(AppendOnlyLog(tmp_path / 'missing.jsonl').records()) == []
+
+
+@pytest.mark.unit
+def test_torn_last_line_is_skipped_and_closed(tmp_path):
+    """السطر الأخير غير المكتمل يُتجاهل والإضافة التالية تبدأ بسطر جديد"""
+    path = tmp_path / 'log.jsonl'
+    path.write_bytes(b'{"n":1}\n{"n":2}\n{"n":3,"sta')
+
+    log = AppendOnlyLog(path, fsync=False)
+    assert list(log.records()) == [{'n': 1}, {'n': 2}]
+
+    log.append({'n': 4})
+    log.close()
+
+    assert list(AppendOnlyLog(path).records()) == [{'n': 1}, {'n': 2}, {'n': 4}]
+    assert path.read_bytes().endswith(b'{"n":3,"sta\n{"n":4}\n')
+
+
+@pytest.mark.unit
+def test_torn_multibyte_character_is_skipped(tmp_path):
+    path = tmp_path / 'log.jsonl'
+    path.write_bytes(b'{"n":1}\n' + '{"page":"صفحة"}'.encode('utf-8')[:12])
+
+    assert list(AppendOnlyLog(path).records()) == [{'n': 1}]
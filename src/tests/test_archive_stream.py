@@ -0,0 +1,124 @@
+"""
+اختبارات قراءة وكتابة الأرشيفات
+Tests for ArchiveReader and ArchiveWriter
+"""
+
+import zipfile
+
+import pytest
+
+from src.archive_stream import ArchiveReader, ArchiveWriter
+
+
+def make_zip(path, names):
+    with zipfile.ZipFile(path, 'w') as archive:
+        for name in names:
+            archive.writestr(zipfile.ZipInfo(name), name.encode('utf-8'))
+    return path
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('name, expected', [
+    ('ch1/001.jpg', 'ch1/001.jpg'),
+    ('ch1\\002.jpg', 'ch1/002.jpg'),
+    ('ch1/./sub/../003.jpg', 'ch1/003.jpg'),
+    ('../../x.jpg', None),
+    ('ch1/../../x.jpg', None),
+    ('/abs.jpg', None),
+    ('C:/x.jpg', None),
+    ('c:x.jpg', None),
+])
+def test_safe_name(name, expected):
+    assert ArchiveReader.safe_name(name) == expected
+
+
+@pytest.mark.unit
+def test_traversal_members_are_skipped(tmp_path):
+    archive = make_zip(tmp_path / 'chapter.cbz',
+                       ['10.jpg', '2.jpg', '../../evil.jpg', '/abs.jpg', 'sub/../../up.png',
+                        '__MACOSX/._2.jpg', 'notes.txt'])
+
+    with ArchiveReader(str(archive)) as reader:
+        pages = list(reader)
+
+    assert [name for name, _ in pages] == ['2.jpg', '10.jpg']
+    assert pages[0][1] == b'2.jpg'
+
+
+@pytest.mark.unit
+def test_normalized_names_read_original_members(tmp_path):
+    """الاسم المطبع يقرأ العضو الأصلي"""
+    archive = make_zip(tmp_path / 'chapter.cbz', ['a/./001.jpg', 'a\\002.jpg'])
+
+    with ArchiveReader(str(archive)) as reader:
+        pages = dict(reader)
+
+    assert pages == {'a/001.jpg': b'a/./001.jpg', 'a/002.jpg': b'a\\002.jpg'}
+
+
+@pytest.mark.unit
+def test_zip_round_trip_stores_images(tmp_path):
+    target = tmp_path / 'out.cbz'
+    with ArchiveWriter(str(target)) as writer:
+        writer.add('002.jpg', b'\xff\xd8page2')
+        writer.add('001.jpg', b'\xff\xd8page1')
+        writer.add('info.txt', b'x' * 1000)
+
+    with zipfile.ZipFile(target) as archive:
+        types = {info.filename: info.compress_type for info in archive.infolist()}
+    assert types['001.jpg'] == zipfile.ZIP_STORED
+    assert types['info.txt'] == zipfile.ZIP_DEFLATED
+
+    with ArchiveReader(str(target)) as reader:
+        assert list(reader) == [('001.jpg', b'\xff\xd8page1'), ('002.jpg', b'\xff\xd8page2')]
+
+
+@pytest.mark.unit
+def test_failed_write_leaves_target_untouched(tmp_path):
+    target = tmp_path / 'out.cbz'
+    target.write_bytes(b'old')
+
+    with pytest.raises(RuntimeError):
+        with ArchiveWriter(str(target)) as writer:
+            writer.add('001.jpg', b'data')
+            raise RuntimeError('boom')
+
+    assert target.read_bytes() == b'old'
+    assert list(tmp_path.iterdir()) == [target]
+
+
+@pytest.mark.unit
+def test_solid_7z_pages_in_natural_order(tmp_path):
+    py7zr = pytest.importorskip('py7zr')
+    archive = tmp_path / 'chapter.cb7'
+    names = [f'{i}.png' for i in range(1, 21)]
+    with py7zr.SevenZipFile(archive, 'w') as writer:
+        for name in reversed(names):
+            writer.writestr(name.encode('ascii') * 100, name)
+
+    with ArchiveReader(str(archive)) as reader:
+        pages = list(reader)
+
+    assert [name for name, _ in pages] == names
+    assert all(data == name.encode('ascii') * 100 for name, data in pages)
+
+
+@pytest.mark.unit
+def test_7z_compresses_only_non_image_members(tmp_path):
+    py7zr = pytest.importorskip('py7zr')
+    target = tmp_path / 'out.cb7'
+    text = b'ComicInfo ' * 2000
+    with ArchiveWriter(str(target)) as writer:
+        writer.add('001.jpg', b'\xff\xd8page1')
+        writer.add('ComicInfo.xml', text)
+        writer.add('002.jpg', b'\xff\xd8page2')
+
+    with py7zr.SevenZipFile(target, 'r') as archive:
+        methods = {entry.filename: entry.folder.coders[0]['method'] for entry in archive.files}
+        contents = {name: stream.read() for name, stream in archive.readall().items()}
+
+    assert methods['001.jpg'] == methods['002.jpg'] == py7zr.properties.CompressionMethod.COPY
+    assert methods['ComicInfo.xml'] == py7zr.properties.CompressionMethod.LZMA2
+    assert contents == {'001.jpg': b'\xff\xd8page1', '002.jpg': b'\xff\xd8page2',
+                        'ComicInfo.xml': text}
+    assert target.stat().st_size < len(text)
@@ -0,0 +1,101 @@
+"""
+اختبارات ذاكرة تخزين مخرجات المراحل
+Tests for ArtifactCache
+"""
+
+import pickle
+
+import numpy as np
+import pytest
+
+from src.artifact_cache import ArtifactCache, content_key
+
+
+def entry_size(value):
+    return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ArtifactCache(tmp_path / 'cache', max_bytes=10 ** 6)
+    yield cache
+    cache.close()
+
+
+@pytest.mark.unit
+def test_put_get_round_trip(cache):
+    key = cache.stage_key('detect', 'page', {'backend': 'contour'})
+    assert cache.get(key, 'detect') is None
+
+    assert cache.put(key, 'detect', [(1, 2, 3, 4)])
+
+    assert cache.get(key, 'detect') == [(1, 2, 3, 4)]
+    assert cache.stats['detect'] == {'hits': 1, 'misses': 1, 'stored': 1}
+
+
+@pytest.mark.unit
+def test_stage_keys_chain_on_fingerprint():
+    ocr = ArtifactCache.stage_key('ocr', 'detect-key', {'lang': 'ja'})
+
+    assert ocr == ArtifactCache.stage_key('ocr', 'detect-key', {'lang': 'ja'})
+    assert ocr != ArtifactCache.stage_key('ocr', 'detect-key', {'lang': 'en'})
+    assert ocr != ArtifactCache.stage_key('ocr', 'other-key', {'lang': 'ja'})
+
+
+@pytest.mark.unit
+def test_content_key_depends_on_pixels_and_shape():
+    image = np.zeros((4, 6), np.uint8)
+
+    assert content_key(image) == content_key(image.copy())
+    assert content_key(image) != content_key(image.reshape(6, 4))
+    changed = image.copy()
+    changed[0, 0] = 1
+    assert content_key(image) != content_key(changed)
+
+
+@pytest.mark.unit
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr('src.artifact_cache.time.time', lambda: clock[0])
+
+    value = b'x' * 1000
+    cache = ArtifactCache(tmp_path / 'cache', max_bytes=entry_size(value) * 3)
+    for key in ('a', 'b', 'c'):
+        clock[0] += 1
+        cache.put(key * 40, 'ocr', value)
+
+    # قراءة 'a' تجعله الأحدث استخداماً
+    clock[0] += 1
+    assert cache.get('a' * 40) == value
+
+    clock[0] += 1
+    cache.put('d' * 40, 'ocr', value)
+
+    assert cache.get('b' * 40) is None
+    assert cache.get('a' * 40) == value
+    assert cache.get('d' * 40) == value
+    assert cache.total_bytes <= cache.max_bytes * 0.9
+    assert not (tmp_path / 'cache' / 'objects' / 'bb' / ('b' * 40)).exists()
+    cache.close()
+
+
+@pytest.mark.unit
+def test_total_size_survives_reopen(tmp_path):
+    cache = ArtifactCache(tmp_path / 'cache')
+    cache.put('a' * 40, 'ocr', b'x' * 100)
+    cache.put('a' * 40, 'ocr', b'x' * 200)
+    total = cache.total_bytes
+    cache.close()
+
+    reopened = ArtifactCache(tmp_path / 'cache')
+    assert reopened.total_bytes == total == entry_size(b'x' * 200)
+    reopened.close()
+
+
+@pytest.mark.unit
+def test_corrupt_entry_is_dropped(cache):
+    cache.put('a' * 40, 'ocr', {'text': 'hello'})
+    cache._path('a' * 40).write_bytes(b'not a pickle')
+
+    assert cache.get('a' * 40, 'ocr') is None
+    assert cache.total_bytes == 0
@@ -0,0 +1,81 @@
+"""
+اختبارات واجهات كشف الفقاعات
+Tests for the bubble detector backends
+"""
+
+import numpy as np
+import pytest
+
+from src.bubble_detectors import (ContourBubbleDetector, OnnxBubbleDetector,
+                                  create_detector)
+
+
+class FakeSession:
+    """جلسة ONNX بديلة بدفعة ثابتة تسجل أبعاد مدخلاتها"""
+
+    def __init__(self, batch: int, candidates: int = 3):
+        self.batch = batch
+        self.candidates = candidates
+        self.shapes = []
+
+    def run(self, outputs, feeds):
+        (batch,) = feeds.values()
+        if batch.shape[0] != self.batch:
+            raise ValueError(f"expected batch {self.batch}, got {batch.shape[0]}")
+        self.shapes.append(batch.shape)
+
+        # مرشح واحد واثق في منتصف كل صورة (cx, cy, w, h, score)
+        prediction = np.zeros((batch.shape[0], 5, self.candidates), dtype=np.float32)
+        prediction[:, :4, 0] = [320, 320, 100, 60]
+        prediction[:, 4, 0] = 0.9
+        return [prediction]
+
+
+@pytest.fixture
+def fixed_batch_detector():
+    detector = OnnxBubbleDetector('missing.onnx', input_size=640)
+    detector.session = FakeSession(batch=4)
+    detector.input_name = 'images'
+    detector.batch_size = 4
+    detector.fixed_batch = True
+    return detector
+
+
+@pytest.mark.unit
+def test_create_detector_by_name():
+    assert isinstance(create_detector('contour'), ContourBubbleDetector)
+    with pytest.raises(ValueError):
+        create_detector('missing')
+
+
+@pytest.mark.unit
+def test_contour_detector_finds_bubbles(page_image):
+    (detections,) = ContourBubbleDetector().detect_batch([page_image])
+
+    large = [d for d in detections if d['bbox'][2] > 300]
+    assert len(large) == 2
+    assert all(d['mask'].shape == d['bbox'][:1:-1] for d in large)
+
+
+@pytest.mark.unit
+def test_fixed_batch_pads_last_partial_chunk(fixed_batch_detector):
+    """6 صفحات بدفعة ثابتة 4: الدفعة الثانية تُكمل ونتائج الحشوة تُحذف"""
+    pages = [np.full((640, 640, 3), 255, np.uint8) for _ in range(6)]
+
+    results = fixed_batch_detector.detect_batch(pages)
+
+    assert len(results) == 6
+    assert [shape[0] for shape in fixed_batch_detector.session.shapes] == [4, 4]
+    assert all(len(found) == 1 for found in results)
+
+
+@pytest.mark.unit
+def test_onnx_boxes_map_back_to_page(fixed_batch_detector):
+    """الصندوق في فضاء النموذج يعاد إلى إحداثيات الصفحة الأصلية"""
+    page = np.full((1280, 640, 3), 255, np.uint8)
+
+    (found,) = fixed_batch_detector.detect_batch([page])
+
+    # النسبة 0.5 والحشوة الأفقية 160
+    assert found[0]['bbox'] == (220, 580, 200, 120)
+    assert found[0]['mask'] is None
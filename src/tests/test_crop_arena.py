@@ -0,0 +1,96 @@
+"""
+اختبارات مخزن قصاصات الفقاعات
+Tests for CropArena and arena-based OCR
+"""
+
+import numpy as np
+import pytest
+
+from src.crop_arena import CropArena
+
+
+def gradient_page(width=600, height=400):
+    """صفحة بقيم مختلفة لكل بكسل لكشف أي إزاحة في القص"""
+    ys, xs = np.mgrid[0:height, 0:width]
+    return ((xs + 3 * ys) % 251).astype(np.uint8)
+
+
+@pytest.mark.unit
+def test_crops_are_views_with_page_offsets():
+    page = gradient_page()
+    arena = CropArena(width=256, height=128)
+
+    views = arena.add_page(page, [(10, 20, 50, 30), (100, 150, 80, 40)])
+
+    assert np.array_equal(views[0], page[20:50, 10:60])
+    assert np.array_equal(views[1], page[150:190, 100:180])
+    table = arena.get_offsets()
+    assert list(table['x']) == [10, 100] and list(table['y']) == [20, 150]
+
+
+@pytest.mark.unit
+def test_crop_at_page_edge_is_clamped_not_shifted():
+    """صندوق يتجاوز حافة الصفحة يُقص دون إزاحة المحتوى"""
+    page = gradient_page()
+    arena = CropArena()
+
+    (view,) = arena.add_page(page, [(-20, -10, 60, 40)])
+
+    assert view.shape == (30, 40)
+    assert np.array_equal(view, page[0:30, 0:40])
+    entry = arena.get_offsets()[0]
+    points = arena.to_page_coords(0, [[entry['arena_x'], entry['arena_y']]])
+    assert points.tolist() == [[0.0, 0.0]]
+
+
+@pytest.mark.unit
+def test_crop_past_right_and_bottom_edges():
+    page = gradient_page()
+    arena = CropArena()
+
+    (view,) = arena.add_page(page, [(580, 390, 50, 50)])
+
+    assert np.array_equal(view, page[390:400, 580:600])
+
+
+@pytest.mark.unit
+def test_reset_recycles_buffer():
+    arena = CropArena(width=256, height=128)
+    arena.add_page(gradient_page(), [(0, 0, 100, 100)])
+    arena.reset()
+
+    assert len(arena) == 0
+    assert (arena.buffer == arena.fill_value).all()
+
+
+@pytest.mark.unit
+def test_packed_slices_respect_side_limit():
+    """الأجزاء لا تتجاوز الحد ولا تقطع أي قصاصة"""
+    page = gradient_page(2000, 2000)
+    arena = CropArena(width=512, height=256)
+    arena.add_page(page, [(0, i * 50, 400, 120) for i in range(30)])
+
+    slices = arena.packed_slices(600)
+
+    assert len(slices) > 1
+    assert all(tile.shape[0] <= 600 for _, tile in slices)
+    for entry in arena.get_offsets():
+        assert any(top <= entry['arena_y'] and entry['arena_y'] + entry['h'] <= top + tile.shape[0]
+                   for top, tile in slices)
+
+
+
+@pytest.mark.unit
+def test_overlapping_finds_every_slot_a_box_touches():
+    arena = CropArena(width=1024, height=256)
+    arena.add_page(gradient_page(), [(0, 0, 100, 50), (200, 0, 100, 50)])
+    first, second = arena.get_offsets()
+
+    gap = (first['arena_x'] + first['w'] + 1, first['arena_y'],
+           second['arena_x'] - 1, first['arena_y'] + 10)
+    span = (first['arena_x'] + 50, first['arena_y'], second['arena_x'] + 10,
+            first['arena_y'] + 10)
+
+    assert arena.overlapping(*gap).tolist() == []
+    assert arena.overlapping(*span).tolist() == [0, 1]
+    assert second['arena_x'] - (first['arena_x'] + first['w']) == arena.padding
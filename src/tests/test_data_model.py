@@ -0,0 +1,112 @@
+"""
+اختبارات سجلات الصفحة والفقاعات
+Tests for Page, Bubble, TextItem and PageTransform
+"""
+
+import json
+import pickle
+
+import numpy as np
+import pytest
+
+from src.data_model import Bubble, Page, PageTransform, TextItem, TextStyle
+from src.rle_mask import RLEMask
+
+
+@pytest.fixture
+def page():
+    mask = np.zeros((40, 60), np.uint8)
+    mask[10:30, 10:50] = 1
+    bubble = Bubble(10, 20, 60, 40, 0.9, RLEMask.encode(mask, (10, 20), (200, 100)),
+                    [TextItem('hi', 0.8, [(20, 30), (40, 30), (40, 40), (20, 40)])],
+                    text='hi', translation='مرحبا')
+    empty = Bubble(50, 100, 30, 30)
+    return Page('ch1/001.png', 100, 200, 3, page_hash=123, bubbles=[bubble, empty])
+
+
+@pytest.mark.unit
+def test_bubble_behaves_like_box_tuple():
+    bubble = Bubble(1, 2, 30, 40)
+    x, y, w, h = bubble
+
+    assert (x, y, w, h) == bubble.bbox == tuple(bubble) == (1, 2, 30, 40)
+    assert len(bubble) == 4 and bubble[2] == 30 and bubble[-1] == 40
+    assert bubble.area == 1200
+    assert bubble.roi_mask() is None
+
+
+@pytest.mark.unit
+def test_text_item_dict_access():
+    item = TextItem('hello', 0.5, [(1, 2), (11, 2), (11, 7), (1, 7)])
+
+    assert item['text'] == 'hello' and item.get('confidence') == 0.5
+    assert item.get('missing', 'x') == 'x'
+    assert item.box == (1, 2, 10, 5)
+    with pytest.raises(KeyError):
+        item['missing']
+
+
+@pytest.mark.unit
+def test_transform_maps_boxes_outwards():
+    transform = PageTransform(1000, 1500, 400, 600)
+
+    assert transform.scale_x == transform.scale_y == 2.5
+    assert not transform.is_identity
+    assert transform.to_original_box((1, 1, 3, 3)) == (2, 2, 8, 8)
+    assert transform.to_original_box((390, 590, 20, 20)) == (975, 1475, 25, 25)
+    assert transform.to_original_points([(4, 6)]) == [(10.0, 15.0)]
+
+
+@pytest.mark.unit
+def test_page_map_to_original_scales_bubbles(page):
+    page.map_to_original(PageTransform(200, 400, 100, 200))
+
+    bubble = page.bubbles[0]
+    assert page.size == (200, 400)
+    assert bubble.bbox == (20, 40, 120, 80)
+    assert bubble.mask.height == 400 and bubble.mask.width == 200
+    assert bubble.mask.bbox() == (40, 60, 80, 40)
+    assert bubble.items[0].bbox[0] == (40.0, 60.0)
+
+
+@pytest.mark.unit
+def test_identity_transform_changes_nothing(page):
+    page.map_to_original(PageTransform(100, 200, 100, 200))
+
+    assert page.bubbles[0].bbox == (10, 20, 60, 40)
+
+
+@pytest.mark.unit
+def test_bytes_round_trip_keeps_masks_and_items(page):
+    restored = Page.from_bytes(page.to_bytes())
+
+    assert repr(restored) == repr(page)
+    assert restored.page_hash == 123
+    assert restored.bubbles[0].items[0].text == 'hi'
+    assert np.array_equal(restored.bubbles[0].roi_mask(), page.bubbles[0].roi_mask())
+
+
+@pytest.mark.unit
+def test_text_style_pickles():
+    style = TextStyle((0, 0, 0), (255, 255, 255), font_size=12, padding=4)
+
+    assert repr(pickle.loads(pickle.dumps(style))) == repr(style)
+
+
+@pytest.mark.unit
+def test_dict_round_trip_keeps_text_bubbles_only(page):
+    data = json.loads(json.dumps(page.to_dict()))
+    restored = Page.from_dict(data)
+
+    assert data['bubbles'] == [[10, 20, 60, 40]]
+    assert [b.translation for b in restored.bubbles] == ['مرحبا']
+    assert restored.name == page.name and restored.size == page.size
+    assert Page.from_dict(data, name='other').name == 'other'
+    assert page.boxes().shape == (2, 4) and Page('x', 1, 1).boxes().shape == (0, 4)
+
+
+@pytest.mark.unit
+def test_from_image_reads_channels():
+    assert Page.from_image('a', np.zeros((5, 7), np.uint8)).channels == 1
+    color = Page.from_image('b', np.zeros((5, 7, 3), np.uint8), page_hash=9)
+    assert (color.size, color.channels, color.page_hash) == ((7, 5), 3, 9)
@@ -0,0 +1,109 @@
+"""
+اختبارات فهرس المجلدات
+Tests for DirectoryIndex
+"""
+
+import os
+
+import pytest
+
+from src.dir_index import DirectoryIndex
+
+
+def touch(path, data=b'x'):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+
+@pytest.fixture
+def library(tmp_path):
+    root = tmp_path / 'library'
+    touch(root / '10.png')
+    touch(root / '2.png')
+    touch(root / 'notes.txt')
+    touch(root / 'sub' / 'b.png')
+    touch(root / 'sub' / 'deep' / 'c.png')
+    return root
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = DirectoryIndex(tmp_path / 'index.sqlite')
+    yield index
+    index.close()
+
+
+def names(files, root):
+    return [os.path.relpath(path, root) for path in files]
+
+
+@pytest.mark.unit
+def test_recursive_scan_in_natural_order(index, library):
+    files = index.scan(library, ('.png',))
+
+    assert names(files, library) == ['2.png', '10.png', os.path.join('sub', 'b.png'),
+                                     os.path.join('sub', 'deep', 'c.png')]
+
+
+@pytest.mark.unit
+def test_non_recursive_scan_skips_subdirectories(index, library):
+    assert names(index.scan(library, ('.png',), recursive=False), library) == ['2.png', '10.png']
+
+
+@pytest.mark.unit
+def test_recursive_scan_after_non_recursive_scan(index, library):
+    """الفحص المتكرر بعد فحص غير متكرر يجد ملفات المجلدات الفرعية"""
+    index.scan(library, ('.png',), recursive=False)
+
+    files = index.scan(library, ('.png',), recursive=True)
+
+    assert names(files, library) == ['2.png', '10.png', os.path.join('sub', 'b.png'),
+                                     os.path.join('sub', 'deep', 'c.png')]
+    assert index.stats['dirs_reused'] == 1
+
+
+@pytest.mark.unit
+def test_subdirectory_scanned_as_root_stays_in_parent(index, library):
+    index.scan(library, ('.png',))
+    touch(library / 'sub' / 'a.png')
+    index.scan(library / 'sub', ('.png',))
+
+    files = index.scan(library, ('.png',))
+
+    assert os.path.join('sub', 'a.png') in names(files, library)
+
+
+@pytest.mark.unit
+def test_unchanged_directories_are_reused(index, library):
+    index.scan(library, ('.png',))
+
+    index.scan(library, ('.png',))
+    assert index.stats == {'dirs_reused': 3, 'dirs_listed': 0, 'files_stat': 0}
+
+    touch(library / 'sub' / 'new.png')
+    files = index.scan(library, ('.png',))
+    assert index.stats['dirs_listed'] == 1
+    assert os.path.join('sub', 'new.png') in names(files, library)
+
+
+@pytest.mark.unit
+def test_removed_directory_is_forgotten(index, library):
+    index.scan(library, ('.png',))
+    for path in (library / 'sub' / 'deep' / 'c.png', library / 'sub' / 'b.png'):
+        path.unlink()
+    (library / 'sub' / 'deep').rmdir()
+    (library / 'sub').rmdir()
+
+    assert names(index.scan(library, ('.png',)), library) == ['2.png', '10.png']
+    assert index.file_info(library / 'sub' / 'b.png') is None
+
+
+@pytest.mark.unit
+def test_content_hash_is_cached_until_file_changes(index, library):
+    path = library / '2.png'
+    first = index.content_hash(path)
+    assert index.file_info(path)['hash'] == first
+
+    touch(path, b'changed')
+    assert index.content_hash(path) != first
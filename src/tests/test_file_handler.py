@@ -0,0 +1,187 @@
+"""
+اختبارات معالج الملفات والأرشيفات
+Tests for FileHandler
+"""
+
+import os
+import time
+import zipfile
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from src.file_handler import FileHandler, benchmark_zip_extraction
+from src.image_processor import ImageProcessor
+
+
+@pytest.fixture
+def handler():
+    return FileHandler()
+
+
+def make_zip(path, members):
+    """أرشيف ZIP من قائمة (الاسم، البايتات، التاريخ أو None)"""
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data, date_time in members:
+            info = zipfile.ZipInfo(name, date_time or (2021, 6, 1, 12, 0, 0))
+            info.compress_type = zipfile.ZIP_DEFLATED
+            archive.writestr(info, data)
+    return path
+
+
+def tree(root):
+    """محتوى كل ملف في المجلد بمساره النسبي"""
+    return {str(path.relative_to(root)): path.read_bytes()
+            for path in sorted(root.rglob('*')) if path.is_file()}
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('name', ['../evil.txt', 'pages/../../evil.txt', '/evil.txt',
+                                  'C:/evil.txt'])
+def test_member_escaping_target_is_rejected(handler, tmp_path, name):
+    """لا يُكتب أي ملف إذا خرج مسار أحد الأعضاء عن مجلد الاستخراج"""
+    archive = make_zip(tmp_path / 'chapter.zip', [('001.png', b'page', None),
+                                                  (name, b'evil', None)])
+    target = tmp_path / 'out' / 'chapter'
+
+    assert not handler.extract_archive(str(archive), str(target))
+    assert not (tmp_path / 'out' / 'evil.txt').exists()
+    assert not (tmp_path / 'evil.txt').exists()
+    assert tree(target) == {}
+
+
+@pytest.mark.unit
+def test_extracted_files_keep_zip_date_time(handler, tmp_path):
+    date_time = (2019, 3, 14, 15, 9, 26)
+    archive = make_zip(tmp_path / 'chapter.zip', [('pages/001.png', b'page', date_time)])
+
+    assert handler.extract_archive(str(archive), str(tmp_path / 'out'))
+
+    expected = time.mktime(datetime(*date_time).timetuple())
+    assert os.stat(tmp_path / 'out' / 'pages' / '001.png').st_mtime == expected
+
+
+@pytest.mark.unit
+def test_parallel_extraction_matches_extractall(handler, tmp_path):
+    """الاستخراج المتوازي يطابق extractall بايتاً ببايت"""
+    members = [(f'vol{i % 3}/page{i}.png', os.urandom(1000 + i * 997) * (i % 4 + 1), None)
+               for i in range(40)]
+    members.append(('empty.txt', b'', None))
+    archive = make_zip(tmp_path / 'volume.zip', members)
+
+    handler.parallel_min_bytes = 0
+    handler.extract_workers = 4
+    assert handler.extract_archive(str(archive), str(tmp_path / 'parallel'))
+
+    with zipfile.ZipFile(archive) as zip_ref:
+        zip_ref.extractall(tmp_path / 'reference')
+
+    assert tree(tmp_path / 'parallel') == tree(tmp_path / 'reference')
+    assert len(tree(tmp_path / 'parallel')) == 41
+
+
+@pytest.mark.unit
+def test_benchmark_reports_every_worker_count(tmp_path):
+    archive = make_zip(tmp_path / 'volume.zip',
+                       [(f'{i}.png', os.urandom(4096), None) for i in range(8)])
+
+    report = benchmark_zip_extraction(str(archive), workers=[1, 2], work_dir=str(tmp_path))
+
+    assert set(report) == {'extractall', 'parallel_1', 'parallel_2'}
+    assert report['extractall']['speedup'] == 1.0
+    assert all(entry['mb_per_second'] > 0 for entry in report.values())
+    assert list(tmp_path.iterdir()) == [archive]
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'src' / '001.png'
+    path.parent.mkdir()
+    path.write_bytes(os.urandom(2048))
+    return path
+
+
+def leftovers(folder):
+    """ملفات .part مؤقتة متبقية"""
+    return [path.name for path in folder.iterdir() if path.name.endswith('.part')]
+
+
+@pytest.mark.unit
+def test_hardlink_shares_the_inode(handler, tmp_path, source):
+    destination = tmp_path / 'out' / '001.png'
+
+    method = handler.link_file(str(source), str(destination), 'hardlink')
+
+    if method != 'hardlink':
+        pytest.skip('نظام الملفات لا يدعم الربط الصلب')
+    assert os.stat(destination).st_nlink == 2
+    assert os.path.samefile(source, destination)
+    # إعادة الربط إلى نفس الملف لا تغير شيئاً
+    assert handler.link_file(str(source), str(destination), 'hardlink') == 'hardlink'
+    assert os.stat(source).st_nlink == 2
+    assert leftovers(destination.parent) == []
+
+
+@pytest.mark.unit
+def test_copy_is_independent(handler, tmp_path, source):
+    destination = tmp_path / 'out' / '001.png'
+    destination.parent.mkdir()
+    destination.write_bytes(b'old output')
+
+    method = handler.link_file(str(source), str(destination), 'copy')
+
+    assert method in ('reflink', 'copy')
+    assert destination.read_bytes() == source.read_bytes()
+    assert not os.path.samefile(source, destination)
+    assert os.stat(source).st_nlink == 1
+    assert handler.copy_file(str(source), str(tmp_path / 'out' / '002.png'))
+    assert leftovers(destination.parent) == []
+
+
+@pytest.mark.unit
+def test_auto_falls_back_to_byte_copy(handler, tmp_path, source, monkeypatch):
+    """عند فشل reflink والربط الصلب يُنسخ الملف"""
+    def no_link(*args):
+        raise OSError(18, 'Invalid cross-device link')
+
+    monkeypatch.setattr(handler, '_reflink', lambda *args: False)
+    monkeypatch.setattr(os, 'link', no_link)
+    destination = tmp_path / 'out' / '001.png'
+
+    assert handler.link_file(str(source), str(destination)) == 'copy'
+    assert destination.read_bytes() == source.read_bytes()
+    assert os.stat(source).st_nlink == 1
+    assert leftovers(destination.parent) == []
+
+
+@pytest.mark.unit
+def test_unsupported_reflink_is_not_retried(handler, tmp_path, source, monkeypatch):
+    calls = []
+
+    def ioctl(*args):
+        calls.append(args)
+        raise OSError(95, 'Operation not supported')
+
+    fcntl = pytest.importorskip('fcntl')
+    monkeypatch.setattr(fcntl, 'ioctl', ioctl)
+
+    assert not handler._reflink(source, tmp_path / 'a.png')
+    assert not handler._reflink(source, tmp_path / 'b.png')
+    assert len(calls) == 1
+
+
+@pytest.mark.unit
+def test_saving_over_hardlinked_output_keeps_source(handler, tmp_path, source):
+    """حفظ صورة فوق مخرج مربوط بالمصدر لا يعدل المصدر"""
+    original = source.read_bytes()
+    destination = tmp_path / 'out' / '001.png'
+    if handler.link_file(str(source), str(destination), 'hardlink') != 'hardlink':
+        pytest.skip('نظام الملفات لا يدعم الربط الصلب')
+
+    image = np.full((20, 30, 3), 200, np.uint8)
+    assert ImageProcessor('contour').save_image(image, str(destination))
+
+    assert source.read_bytes() == original
+    assert os.stat(source).st_nlink == 1
+    assert destination.read_bytes() != original
@@ -0,0 +1,147 @@
+"""
+اختبارات مراقبة مجلد الإدخال
+Tests for FolderWatcher and ProcessedLedger
+"""
+
+import time
+
+import pytest
+
+from src.folder_watcher import FolderWatcher
+
+
+class Handler:
+    """دالة معالجة بديلة تُرجع نتائج محددة مسبقاً وتسجل المدخلات"""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = []
+
+    def __call__(self, path):
+        self.calls.append(path.name)
+        return self.results.pop(0) if self.results else 1
+
+
+def make_watcher(tmp_path, handler):
+    return FolderWatcher(tmp_path / 'inbox', handler, tmp_path / 'ledger.jsonl',
+                         input_suffixes=('.cbz',), page_suffixes=('.png',),
+                         settle_seconds=0, use_inotify=False)
+
+
+@pytest.fixture
+def inbox(tmp_path):
+    root = tmp_path / 'inbox'
+    (root / 'chapter').mkdir(parents=True)
+    (root / 'chapter' / '1.png').write_bytes(b'page')
+    (root / 'chapter' / 'extras').mkdir()
+    (root / 'chapter' / 'extras' / '2.png').write_bytes(b'page')
+    return root
+
+
+@pytest.mark.unit
+def test_signature_counts_top_level_pages_only(tmp_path, inbox):
+    watcher = make_watcher(tmp_path, Handler())
+
+    assert watcher.signature(inbox / 'chapter', True)[0] == 1
+
+    (inbox / 'nested').mkdir()
+    (inbox / 'nested' / 'sub').mkdir()
+    (inbox / 'nested' / 'sub' / '1.png').write_bytes(b'page')
+    assert watcher.signature(inbox / 'nested', True) is None
+    watcher.close()
+
+
+@pytest.mark.unit
+def test_done_inputs_are_skipped_on_restart(tmp_path, inbox):
+    handler = Handler(1)
+    watcher = make_watcher(tmp_path, handler)
+    watcher.run(once=True)
+    assert handler.calls == ['chapter']
+
+    watcher = make_watcher(tmp_path, handler)
+    watcher.run(once=True)
+    assert handler.calls == ['chapter']
+    assert watcher.stats['skipped'] == 1
+
+
+@pytest.mark.unit
+def test_failed_input_is_retried_after_backoff(tmp_path, inbox, monkeypatch):
+    handler = Handler(0, 0, 1)
+    watcher = make_watcher(tmp_path, handler)
+    clock = [time.time()]
+    monkeypatch.setattr('src.folder_watcher.time.time', lambda: clock[0])
+
+    watcher.run(once=True)
+    assert handler.calls == ['chapter']
+
+    # قبل انتهاء المهلة لا يُعاد المدخل
+    watcher = make_watcher(tmp_path, handler)
+    clock[0] += watcher.RETRY_DELAY / 2
+    watcher.run(once=True)
+    assert handler.calls == ['chapter']
+
+    clock[0] += watcher.RETRY_DELAY
+    watcher = make_watcher(tmp_path, handler)
+    watcher.run(once=True)
+    assert handler.calls == ['chapter'] * 2
+    assert watcher.ledger.entries[str(inbox / 'chapter')]['attempts'] == 2
+
+    # المهلة تتضاعف بعد المحاولة الثانية
+    clock[0] += watcher.RETRY_DELAY * 1.5
+    watcher = make_watcher(tmp_path, handler)
+    watcher.run(once=True)
+    assert handler.calls == ['chapter'] * 2
+
+    clock[0] += watcher.RETRY_DELAY
+    watcher = make_watcher(tmp_path, handler)
+    watcher.run(once=True)
+    assert handler.calls == ['chapter'] * 3
+    assert watcher.ledger.entries[str(inbox / 'chapter')]['status'] == 'done'
+
+
+@pytest.mark.unit
+def test_retries_stop_after_max_attempts(tmp_path, inbox, monkeypatch):
+    handler = Handler(*[0] * 10)
+    clock = [time.time()]
+    monkeypatch.setattr('src.folder_watcher.time.time', lambda: clock[0])
+
+    for _ in range(FolderWatcher.MAX_ATTEMPTS + 2):
+        make_watcher(tmp_path, handler).run(once=True)
+        clock[0] += FolderWatcher.RETRY_MAX_DELAY
+
+    assert len(handler.calls) == FolderWatcher.MAX_ATTEMPTS
+
+
+@pytest.mark.unit
+def test_changed_input_is_processed_again(tmp_path, inbox):
+    handler = Handler(0, 1)
+    make_watcher(tmp_path, handler).run(once=True)
+
+    (inbox / 'chapter' / '3.png').write_bytes(b'new page')
+    make_watcher(tmp_path, handler).run(once=True)
+
+    assert handler.calls == ['chapter', 'chapter']
+
+
+@pytest.mark.unit
+def test_exhausted_input_is_not_rescanned(tmp_path, inbox, monkeypatch):
+    """المدخل الذي استنفد محاولاته لا تُفحص محتوياته في كل مرور"""
+    handler = Handler(*[0] * 10)
+    clock = [time.time()]
+    monkeypatch.setattr('src.folder_watcher.time.time', lambda: clock[0])
+    for _ in range(FolderWatcher.MAX_ATTEMPTS):
+        make_watcher(tmp_path, handler).run(once=True)
+        clock[0] += FolderWatcher.RETRY_MAX_DELAY
+
+    watcher = make_watcher(tmp_path, handler)
+    signatures = []
+    original = watcher.signature
+    monkeypatch.setattr(watcher, 'signature',
+                        lambda path, is_dir: signatures.append(path.name) or original(path, is_dir))
+
+    watcher.scan()
+    watcher.scan()
+
+    assert signatures == ['chapter']
+    assert len(handler.calls) == FolderWatcher.MAX_ATTEMPTS
+    watcher.close()
@@ -0,0 +1,161 @@
+"""
+اختبارات واجهة الخطوط FreeType
+Tests for the FreeType text backend
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from src import font_backend
+from src.font_backend import FreeTypeTextBackend
+
+bidi = pytest.importorskip('bidi.algorithm')
+arabic_reshaper = pytest.importorskip('arabic_reshaper')
+
+LINE = 'قرأت 3 كتب عن Python اليوم'
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    """واجهة بدون libraqm حتى يُستخدم get_display"""
+    monkeypatch.setattr(font_backend, '_HAS_RAQM', False)
+    return FreeTypeTextBackend(None, rtl=True)
+
+
+def shaped(word: str) -> str:
+    return bidi.get_display(arabic_reshaper.reshape(word))
+
+
+@pytest.mark.unit
+def test_numbers_and_latin_keep_order_in_rtl_line(backend):
+    """الرقم والكلمة اللاتينية يبقيان في موضعهما الصحيح داخل السطر العربي"""
+    pieces, visual = backend.visual_order(LINE)
+
+    assert visual
+    assert pieces == [shaped('اليوم'), 'Python', shaped('عن'), shaped('كتب'), '3',
+                      shaped('قرأت')]
+
+
+@pytest.mark.unit
+def test_latin_run_is_not_reversed(backend):
+    pieces, _ = backend.visual_order('مرحبا hello world')
+
+    assert pieces[:2] == ['hello', 'world']
+
+
+@pytest.mark.unit
+def test_ltr_backend_keeps_logical_order():
+    backend = FreeTypeTextBackend(None, rtl=False)
+
+    assert backend.visual_order('hello big world') == (['hello', 'big', 'world'], False)
+
+
+@pytest.mark.unit
+def test_raqm_shapes_the_whole_line(monkeypatch):
+    monkeypatch.setattr(font_backend, '_HAS_RAQM', True)
+    backend = FreeTypeTextBackend(None, rtl=True)
+
+    assert backend.visual_order(LINE) == ([LINE], False)
+
+
+FONT_CANDIDATES = ('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+                   '/usr/share/fonts/dejavu/DejaVuSans.ttf',
+                   '/Library/Fonts/Arial Unicode.ttf',
+                   'C:/Windows/Fonts/arial.ttf')
+
+
+@pytest.fixture
+def font_path():
+    """خط نظام يحتوي على الحروف العربية"""
+    for path in FONT_CANDIDATES:
+        if os.path.exists(path):
+            return path
+    pytest.skip('لا يوجد خط TrueType في النظام')
+
+
+@pytest.mark.unit
+def test_missing_font_is_unavailable(tmp_path):
+    assert not FreeTypeTextBackend(tmp_path / 'missing.ttf').is_available()
+    assert not FreeTypeTextBackend(None).is_available()
+
+
+@pytest.mark.unit
+def test_word_runs_are_cached_and_bounded(font_path):
+    backend = FreeTypeTextBackend(font_path, rtl=False, max_runs=2)
+    assert backend.is_available()
+
+    first = backend.run('hello', 20)
+    assert backend.run('hello', 20) is first
+    assert (backend.hits, backend.misses) == (1, 1)
+    assert first.alpha.max() == 255 and first.advance > 0
+
+    backend.run('big', 20)
+    backend.run('world', 20)
+    assert backend.run('hello', 20) is not first
+    assert backend.misses == 4
+
+
+@pytest.mark.unit
+def test_line_width_and_wrap_measure_without_rasterizing(font_path):
+    backend = FreeTypeTextBackend(font_path, rtl=True)
+    line = 'مرحبا بالعالم'
+
+    pieces, visual = backend.visual_order(line)
+    assert backend.line_width(line, 24) == (
+        sum(backend.advance(piece, 24, visual) for piece in pieces) + backend.space_width(24))
+    assert backend.line_width('', 24) == 0
+
+    text = ' '.join(['كلمة'] * 12)
+    lines = backend.wrap(text, 150, 24)
+    assert len(lines) > 1
+    assert all(backend.line_width(l, 24) <= 150 for l in lines)
+    assert backend.line_height(24) > backend.ascent(24) > 0
+
+    # القياس لا يرسّم أي كلمة
+    assert backend.misses == 0 and not backend._runs
+
+
+@pytest.mark.unit
+def test_measured_pieces_are_the_drawn_pieces(font_path):
+    """الرسم يرسّم كل جزء مقاس مرة واحدة وعرضه المرسوم يساوي المقاس"""
+    backend = FreeTypeTextBackend(font_path, rtl=True)
+    line = 'قرأت 3 كتب'
+    width = backend.line_width(line, 24)
+    measured = len(backend._advances)
+
+    backend.draw_line(np.full((60, 300), 255, np.uint8), line, 10, 40, 24, (0,))
+    runs = backend._line_runs(line, 24)
+
+    assert len(backend._advances) == measured
+    assert backend.misses == len(runs)
+    assert sum(r.advance for r in runs) + (len(runs) - 1) * backend.space_width(24) == width
+
+
+@pytest.mark.unit
+def test_draw_line_matches_rasterized_layer(font_path):
+    backend = FreeTypeTextBackend(font_path, rtl=True)
+    line = 'قرأت 3 كتب'
+
+    image = np.full((60, 300, 3), 255, np.uint8)
+    backend.draw_line(image, line, 10, 40, 24, (0, 0, 0))
+    layer = backend.rasterize_line(np.zeros((60, 300), np.uint8), line, 10, 40, 24)
+
+    drawn = image[:, :, 0] < 128
+    assert drawn.any()
+    assert np.array_equal(drawn, layer >= 128)
+    # الحبر بين بداية السطر ونهايته فقط
+    columns = np.where(drawn.any(axis=0))[0]
+    assert columns.min() >= 10 and columns.max() <= 10 + backend.line_width(line, 24)
+
+
+@pytest.mark.unit
+def test_drawing_is_clipped_at_image_edges(font_path):
+    backend = FreeTypeTextBackend(font_path, rtl=False)
+    image = np.full((20, 40), 255, np.uint8)
+
+    backend.draw_line(image, 'clipped text', -15, 15, 24, (0,))
+    backend.draw_line(image, 'outside', 500, 15, 24, (0,))
+
+    assert image.shape == (20, 40) and (image < 128).any()
@@ -0,0 +1,200 @@
+"""
+اختبارات معالج الصور
+Tests for ImageProcessor
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from src.data_model import Bubble, Page
+from src.image_processor import ImageProcessor
+from src.rle_mask import RLEMask
+from src.text_renderer import TextRenderer
+
+
+@pytest.fixture
+def processor():
+    return ImageProcessor('contour')
+
+
+@pytest.mark.unit
+def test_clean_page_skips_distortion_correction(processor, page_image):
+    """الصفحة النظيفة تُعاد كما هي دون ترشيح"""
+    result = processor.correct_distortion(page_image)
+
+    assert result is page_image
+    assert processor.get_processing_stats()['distortion_skipped'] == 1
+    assert processor.get_processing_stats()['distortion_applied'] == 0
+
+
+@pytest.mark.unit
+def test_noisy_page_is_filtered(processor, noisy_page):
+    """الصفحة المشوشة تُرشح وتنخفض ضوضاؤها"""
+    assert processor.needs_distortion_correction(noisy_page)
+
+    result = processor.correct_distortion(noisy_page)
+
+    assert result.shape == noisy_page.shape
+    assert processor.estimate_noise_level(result) < processor.estimate_noise_level(noisy_page)
+    assert processor.get_processing_stats()['distortion_applied'] == 1
+
+
+@pytest.mark.unit
+def test_bubble_rois_only_are_filtered(processor, noisy_page):
+    """عند تمرير الفقاعات يبقى ما خارجها دون تغيير"""
+    bubble = (100, 100, 200, 150)
+    result = processor.correct_distortion(noisy_page, [bubble])
+
+    x, y, w, h = bubble
+    outside = np.ones(noisy_page.shape[:2], dtype=bool)
+    outside[y:y+h, x:x+w] = False
+    assert np.array_equal(result[outside], noisy_page[outside])
+    assert not np.array_equal(result[y:y+h, x:x+w], noisy_page[y:y+h, x:x+w])
+
+
+@pytest.mark.unit
+def test_reset_processing_stats(processor, page_image):
+    processor.correct_distortion(page_image)
+    processor.reset_processing_stats()
+
+    assert processor.get_processing_stats() == {key: 0 for key in processor.processing_stats}
+
+
+def text_page() -> np.ndarray:
+    """صفحة أسطر نص أفقية لتقدير الميل"""
+    page = np.full((1100, 800, 3), 235, dtype=np.uint8)
+    for i in range(20):
+        cv2.putText(page, f'THE QUICK BROWN FOX {i}', (60, 80 + i * 50),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.2, (20, 20, 20), 3, cv2.LINE_AA)
+    return page
+
+
+def rotate(image: np.ndarray, angle: float, center=None) -> np.ndarray:
+    h, w = image.shape[:2]
+    M = cv2.getRotationMatrix2D(center or (w / 2, h / 2), angle, 1.0)
+    return cv2.warpAffine(image, M, (w, h), borderMode=cv2.BORDER_CONSTANT,
+                          borderValue=(235, 235, 235))
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('angle', [-4.0, -1.3, 0.8, 2.5])
+def test_skew_estimate_matches_applied_angle(processor, angle):
+    """الزاوية المقدرة تعكس زاوية التدوير المطبقة بدقة ±0.2°"""
+    estimate = processor.estimate_skew_angle(rotate(text_page(), angle))
+
+    assert abs(estimate + angle) <= 0.2
+
+
+@pytest.mark.unit
+def test_straightened_page_is_level(processor):
+    result = processor.straighten_image(rotate(text_page(), 3.0))
+
+    assert abs(processor.estimate_skew_angle(result)) <= 0.2
+    assert processor.get_processing_stats()['deskew_applied'] == 1
+
+
+@pytest.mark.unit
+def test_small_skew_returns_same_array(processor):
+    """الزاوية الأقل من deskew_tolerance لا تستدعي التدوير"""
+    page = rotate(text_page(), processor.deskew_tolerance / 4)
+
+    assert processor.straighten_image(page) is page
+    assert processor.get_processing_stats()['deskew_skipped'] == 1
+
+
+@pytest.mark.unit
+def test_bubble_rois_only_are_straightened(processor):
+    """ما خارج الفقاعات لا يتغير، وزوايا الصندوق تأتي من الصفحة لا من تكرار حوافه"""
+    page = rotate(text_page(), 3.0)
+    x, y, w, h = bubble = (200, 300, 300, 200)
+
+    result = processor.straighten_image(page, [bubble])
+
+    outside = np.ones(page.shape[:2], dtype=bool)
+    outside[y:y+h, x:x+w] = False
+    assert np.array_equal(result[outside], page[outside])
+
+    # مطابق لتدوير الصفحة كاملة حول مركز الفقاعة
+    expected = rotate(page, processor.last_skew_angle, (x + w / 2, y + h / 2))
+    diff = np.abs(result[y:y+h, x:x+w].astype(int) - expected[y:y+h, x:x+w])
+    assert diff.max() <= 1
+
+
+@pytest.mark.unit
+def test_bubble_mask_limits_straightened_pixels(processor):
+    page = rotate(text_page(), 3.0)
+    x, y, w, h = 200, 300, 300, 200
+    mask = np.zeros((h, w), np.uint8)
+    cv2.ellipse(mask, (w // 2, h // 2), (w // 2 - 10, h // 2 - 10), 0, 0, 360, 1, -1)
+    bubble = Bubble(x, y, w, h, mask=RLEMask.encode(mask, (x, y), page.shape[:2]))
+
+    result = processor.straighten_image(page, [bubble])
+
+    roi, before = result[y:y+h, x:x+w], page[y:y+h, x:x+w]
+    assert np.array_equal(roi[mask == 0], before[mask == 0])
+    assert not np.array_equal(roi[mask > 0], before[mask > 0])
+
+
+def run_pipeline(processor, data: bytes, extension: str):
+    """فك الترميز ثم الكشف والرسم وإعادة الترميز، مع عدد قنوات كل مرحلة"""
+    image = processor.decode_image(data)
+    page = Page.from_image('page', image)
+    page.bubbles = processor.detect_bubbles(image)
+    for bubble in page.bubbles:
+        bubble.translation = 'HI THERE'
+    rendered = TextRenderer(None).render_page(image.copy(), page)
+    decoded = processor.decode_image(processor.encode_image(rendered, extension))
+    return page, (image.ndim, rendered.ndim, decoded.ndim)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('extension', ['.png', '.jpg'])
+def test_gray_page_stays_single_channel(processor, gray_page, page_image, extension):
+    """الصفحة الرمادية (أو شبه الرمادية بعد JPEG) تبقى بقناة واحدة في كل المراحل"""
+    for source in (gray_page, page_image):
+        page, channels = run_pipeline(processor, processor.encode_image(source, extension),
+                                      extension)
+
+        assert channels == (2, 2, 2)
+        assert len(page.bubbles) == 2
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('extension', ['.png', '.jpg'])
+def test_color_page_keeps_its_channels(processor, page_image, extension):
+    color = page_image.copy()
+    cv2.rectangle(color, (20, 20), (120, 120), (0, 0, 255), -1)
+
+    page, channels = run_pipeline(processor, processor.encode_image(color, extension),
+                                  extension)
+
+    assert channels == (3, 3, 3)
+    assert len(page.bubbles) == 2
+
+
+@pytest.mark.unit
+def test_grayscale_detection_tolerates_faint_tint(processor, page_image):
+    tinted = page_image.copy()
+    tinted[..., 2] = np.clip(tinted[..., 2].astype(int) + processor.grayscale_tolerance, 0, 255)
+
+    assert processor.is_grayscale_content(page_image)
+    assert processor.is_grayscale_content(tinted)
+    tinted[..., 2] = np.clip(tinted[..., 2].astype(int) + 20, 0, 255)
+    assert not processor.is_grayscale_content(tinted)
+
+
+@pytest.mark.unit
+def test_to_gray_does_not_copy_gray_images(processor, gray_page):
+    assert processor.to_gray(gray_page) is gray_page
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('backend, options', [('onnx', {}), ('onnx', {'model_path': None}),
+                                              ('unknown', {})])
+def test_detector_construction_error_falls_back_to_contour(backend, options):
+    """خيارات واجهة ناقصة لا تمنع إنشاء المعالج"""
+    processor = ImageProcessor(backend, options)
+
+    assert processor.detector.name == 'contour'
+    assert processor.detector_options == {'min_bubble_area': processor.min_bubble_area}
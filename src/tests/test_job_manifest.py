@@ -0,0 +1,134 @@
+"""
+اختبارات سجل تقدم المهام
+Tests for JobManifest
+"""
+
+import pytest
+
+from src.job_manifest import JobManifest, source_signature
+
+
+@pytest.fixture
+def pages(tmp_path):
+    """ثلاث صفحات مصدر ومجلد مخرج"""
+    source = tmp_path / 'chapter'
+    source.mkdir()
+    for i in range(1, 4):
+        (source / f'{i}.png').write_bytes(b'page %d' % i)
+    (tmp_path / 'out').mkdir()
+    return source
+
+
+def translate(manifest, source, output_dir, names):
+    """معالجة بديلة: تنسخ الصفحات غير المكتملة وتُرجع أسماء ما عولج"""
+    processed = []
+    for name in names:
+        path = source / name
+        if manifest.is_done(name, source_signature(path)):
+            continue
+        output = output_dir / name
+        output.write_bytes(path.read_bytes().upper())
+        manifest.mark_done(name, output, source_signature(path))
+        processed.append(name)
+    return processed
+
+
+@pytest.mark.unit
+def test_resume_skips_completed_pages(tmp_path, pages):
+    names = ['1.png', '2.png', '3.png']
+    manifest = JobManifest.for_job(tmp_path / 'jobs', pages, tmp_path / 'out', target='ar')
+    assert translate(manifest, pages, tmp_path / 'out', names[:2]) == names[:2]
+    manifest.close()
+
+    # توقف ثم إعادة تشغيل نفس المهمة
+    manifest = JobManifest.for_job(tmp_path / 'jobs', pages, tmp_path / 'out', target='ar')
+    assert translate(manifest, pages, tmp_path / 'out', names) == ['3.png']
+    assert manifest.summary() == {'done': 3}
+    manifest.close()
+
+
+@pytest.mark.unit
+def test_changed_params_use_a_different_manifest(tmp_path, pages):
+    first = JobManifest.for_job(tmp_path / 'jobs', pages, tmp_path / 'out', target='ar')
+    second = JobManifest.for_job(tmp_path / 'jobs', pages, tmp_path / 'out', target='fa')
+
+    assert first.path != second.path
+
+
+@pytest.mark.unit
+def test_job_mismatch_starts_a_new_manifest(tmp_path, pages):
+    """سجل في مسار ثابت لمهمة بوصف مختلف لا يُستأنف"""
+    path = tmp_path / 'out' / JobManifest.FILE_NAME
+    job = {'input': str(pages), 'params': {'target_language': 'ar', 'model': 'v1'}}
+    manifest = JobManifest(path, job)
+    translate(manifest, pages, tmp_path / 'out', ['1.png', '2.png'])
+    manifest.close()
+
+    manifest = JobManifest(path, job)
+    assert manifest.summary() == {'done': 2}
+    manifest.close()
+
+    changed = dict(job, params={'target_language': 'ar', 'model': 'v2'})
+    manifest = JobManifest(path, changed)
+    assert manifest.summary() == {}
+    assert translate(manifest, pages, tmp_path / 'out', ['1.png']) == ['1.png']
+    manifest.close()
+
+    reloaded = JobManifest(path, changed)
+    assert reloaded.job['params']['model'] == 'v2'
+    assert reloaded.summary() == {'done': 1}
+
+    # السجل السابق محفوظ جانباً
+    previous = JobManifest(path.with_suffix('.old.jsonl'))
+    assert previous.job['params']['model'] == 'v1'
+    assert previous.summary() == {'done': 2}
+
+
+@pytest.mark.unit
+def test_changed_output_or_source_is_redone(tmp_path, pages):
+    manifest = JobManifest(tmp_path / 'job.jsonl')
+    translate(manifest, pages, tmp_path / 'out', ['1.png', '2.png', '3.png'])
+
+    # نفس الحجم ومحتوى مختلف
+    (tmp_path / 'out' / '1.png').write_bytes(b'PAGE X')
+    # المصدر تغير
+    (pages / '2.png').write_bytes(b'page 2 edited')
+    # المخرج حُذف
+    (tmp_path / 'out' / '3.png').unlink()
+
+    assert translate(manifest, pages, tmp_path / 'out', ['1.png', '2.png', '3.png']) == \
+        ['1.png', '2.png', '3.png']
+
+
+@pytest.mark.unit
+def test_results_and_failures_are_replayed(tmp_path):
+    path = tmp_path / 'job.jsonl'
+    manifest = JobManifest(path)
+    manifest.mark_done('1.png', result={'bubbles': 2})
+    manifest.mark_failed('2.png', 'boom')
+    manifest.close()
+
+    # سطر غير مكتمل من عملية متوقفة
+    with open(path, 'ab') as f:
+        f.write(b'{"page":"3.png","status":"do')
+
+    manifest = JobManifest(path)
+    assert manifest.is_done('1.png')
+    assert manifest.result('1.png') == {'bubbles': 2}
+    assert not manifest.is_done('2.png')
+    assert not manifest.is_done('3.png')
+    assert manifest.summary() == {'done': 1, 'failed': 1}
+
+
+@pytest.mark.unit
+def test_read_only_output_can_be_checkpointed(tmp_path, pages):
+    """المخرج للقراءة فقط (مثل رابط صلب لمصدره) لا يمنع تسجيل الصفحة"""
+    output = tmp_path / 'out' / '1.png'
+    output.write_bytes(b'page')
+    output.chmod(0o444)
+
+    manifest = JobManifest(tmp_path / 'job.jsonl')
+    manifest.mark_done('1.png', output)
+
+    assert manifest.is_done('1.png')
+    output.chmod(0o644)
@@ -0,0 +1,143 @@
+"""
+اختبارات تخزين الطبقات وإعادة الرسم الجزئي
+Tests for LayerStore
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from src.data_model import Bubble, Page
+from src.image_processor import ImageProcessor
+from src.layer_store import LayerStore
+
+
+class FakeRenderer:
+    """معالج رسم بسيط: يرسم النص بخط Hershey ويسجل المهام المرسومة"""
+
+    def __init__(self):
+        self.rasterized = []
+
+    def rasterize_jobs(self, jobs):
+        results = []
+        for bubble, text, _ in jobs:
+            self.rasterized.append(text)
+            layer = np.zeros((bubble.h, bubble.w), np.uint8)
+            cv2.putText(layer, text, (10, bubble.h // 2), cv2.FONT_HERSHEY_SIMPLEX,
+                        1.0, 255, 2)
+            results.append((24, [text], layer))
+        return results
+
+    def blend_layer(self, image, bubble, layer, style=None, clip=None):
+        x, y, w, h = bubble
+        roi = image[y:y+h, x:x+w]
+        roi[layer > 0] = 0
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LayerStore(tmp_path / 'layers', FakeRenderer(), ImageProcessor('contour'))
+
+
+@pytest.fixture
+def page():
+    doc = Page('chapter/001.jpg', 400, 300, 3)
+    doc.bubbles = [Bubble(20, 20, 200, 80, text='a', translation='one'),
+                   Bubble(150, 150, 200, 80, text='b', translation='two')]
+    return doc
+
+
+def base_image():
+    rng = np.random.default_rng(1)
+    return rng.integers(180, 255, (300, 400, 3), dtype=np.uint8)
+
+
+@pytest.mark.unit
+def test_only_edited_bubbles_are_rasterized(store, page, tmp_path):
+    output = tmp_path / 'out' / '001.png'
+    store.image_processor.save_image(store.save_page(page, base_image(), str(output)),
+                                     str(output))
+    store.renderer.rasterized.clear()
+
+    assert store.update_translations(page.name, {1: 'edited'})
+
+    assert store.renderer.rasterized == ['edited']
+    reloaded, meta = store.load_page(page.name)
+    assert [b.translation for b in reloaded.bubbles] == ['one', 'edited']
+
+
+@pytest.mark.unit
+def test_repeated_edits_do_not_degrade_jpeg_output(store, page, tmp_path):
+    """التعديل ثم التراجع عنه يعيد نفس المخرج تماماً (لا تراكم لفقد JPEG)"""
+    output = tmp_path / 'out' / '001.jpg'
+    composed = store.save_page(page, base_image(), str(output))
+    store.image_processor.save_image(composed, str(output))
+    original = output.read_bytes()
+
+    for text in ('first', 'second', 'third', 'two'):
+        assert store.update_translations(page.name, {1: text})
+
+    assert output.read_bytes() == original
+
+
+@pytest.mark.unit
+def test_edit_matches_full_render(store, page, tmp_path):
+    output = tmp_path / 'out' / '001.png'
+    store.save_page(page, base_image(), str(output))
+
+    store.update_translations(page.name, {0: 'changed'})
+
+    expected = base_image()
+    page.bubbles[0].translation = 'changed'
+    for bubble, (_, _, layer) in zip(page.bubbles, FakeRenderer().rasterize_jobs(
+            [(b, b.translation, None) for b in page.bubbles])):
+        store.renderer.blend_layer(expected, bubble, layer)
+    assert np.array_equal(cv2.imread(str(output)), expected)
+
+
+@pytest.mark.unit
+def test_container_pages_are_not_rerendered(store, page, tmp_path):
+    """صفحة داخل أرشيف لا تُحدث ولا يُنشأ ملف شارد"""
+    store.save_page(page, base_image(), None, container=str(tmp_path / 'out' / 'ch.cbz'))
+
+    assert not store.update_translations(page.name, {0: 'edited'})
+    assert not (tmp_path / 'out').exists()
+
+
+@pytest.mark.unit
+def test_list_pages(store, page, tmp_path):
+    store.save_page(page, base_image(), str(tmp_path / 'o.png'))
+
+    assert store.list_pages() == ['chapter/001']
+
+
+@pytest.mark.unit
+def test_same_file_name_in_two_folders_is_kept_apart(store, page, tmp_path):
+    other = Page('chapter2/001.jpg', 400, 300, 3)
+    other.bubbles = [Bubble(20, 20, 200, 80, text='c', translation='three')]
+
+    store.save_page(page, base_image(), str(tmp_path / 'a.png'))
+    store.save_page(other, base_image(), str(tmp_path / 'b.png'))
+
+    assert store.list_pages() == ['chapter/001', 'chapter2/001']
+    assert store.load_page(page.name)[1]['output'] == str(tmp_path / 'a.png')
+    assert store.load_page(other.name)[1]['output'] == str(tmp_path / 'b.png')
+
+
+@pytest.mark.unit
+def test_interrupted_layout_write_keeps_previous_layout(store, page, tmp_path, monkeypatch):
+    """توقف الكتابة في منتصفها لا يترك layout.json تالفاً"""
+    store.save_page(page, base_image(), str(tmp_path / 'o.png'))
+
+    def torn_dump(obj, f, **kwargs):
+        f.write('{"page": ')
+        raise OSError('disk full')
+
+    monkeypatch.setattr('src.layer_store.json.dump', torn_dump)
+    assert not store.update_translations(page.name, {0: 'edited'})
+    monkeypatch.undo()
+
+    reloaded, meta = store.load_page(page.name)
+    assert meta['page']['translations'] == ['one', 'two']
+    page_dir = store.page_dir(page.name)
+    assert sorted(p.name for p in page_dir.iterdir()) == ['base.png', 'layers', 'layout.json']
@@ -0,0 +1,66 @@
+"""
+اختبارات تهيئة خط المعالجة الرئيسي
+Tests for building the main MangaTranslator pipeline
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+import main
+
+
+class _StubExtractor:
+    """بديل خفيف لمستخرج النصوص (دون تحميل نموذج OCR)"""
+
+
+class _StubTranslator:
+    """بديل خفيف للمترجم (دون تحميل نموذج الترجمة)"""
+
+    def __init__(self, source_lang, target_lang):
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+
+
+@pytest.fixture
+def translator(tmp_path, monkeypatch):
+    """MangaTranslator بمسارات مؤقتة ونماذج بديلة"""
+    monkeypatch.setattr(main, 'TextExtractor', _StubExtractor)
+    monkeypatch.setattr(main, 'AITranslator', _StubTranslator)
+    monkeypatch.setattr(main, 'OUTPUT_DIR', tmp_path / 'output')
+    monkeypatch.setattr(main, 'DATA_DIR', tmp_path / 'data')
+    monkeypatch.setattr(main, 'LAYERS_DIR', tmp_path / 'layers')
+    monkeypatch.setattr(main, 'PAGE_INDEX_FILE', tmp_path / 'page_index.jsonl')
+    monkeypatch.setattr(main, 'DIRECTORY_INDEX_FILE', tmp_path / 'dir_index.sqlite')
+    monkeypatch.setattr(main, 'ARTIFACT_CACHE_DIR', tmp_path / 'cache')
+    return main.MangaTranslator()
+
+
+@pytest.mark.integration
+def test_manga_translator_builds(translator):
+    """بناء المترجم بالإعدادات الافتراضية ينجح"""
+    assert translator.text_renderer is not None
+    assert translator.text_eraser is not None
+    assert translator.layer_store.renderer is translator.text_renderer
+
+
+
+@pytest.mark.integration
+def test_passthrough_links_source_and_save_keeps_it(translator, tmp_path, monkeypatch):
+    """الصفحة بدون نص تُخرج كرابط، وحفظ صورة فوق المخرج لا يعدل المصدر"""
+    monkeypatch.setattr(main, 'PASSTHROUGH_LINK_MODE', 'hardlink')
+    source = tmp_path / 'chapter' / '001.png'
+    source.parent.mkdir()
+    source.write_bytes(b'original page bytes')
+    output = translator.output_dir / source.name
+
+    assert translator._passthrough_file(source, output)
+    assert output.read_bytes() == source.read_bytes()
+    if os.stat(output).st_nlink != 2:
+        pytest.skip('نظام الملفات لا يدعم الربط الصلب')
+
+    image = np.full((10, 10, 3), 255, np.uint8)
+    assert translator.image_processor.save_image(image, str(output))
+    assert source.read_bytes() == b'original page bytes'
+    assert os.stat(source).st_nlink == 1
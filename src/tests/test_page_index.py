@@ -0,0 +1,99 @@
+"""
+اختبارات فهرس الصفحات المعالجة
+Tests for PageIndex
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from src.image_processor import ImageProcessor
+from src.page_index import PageIndex
+from conftest import draw_page
+
+BUBBLES = [[180, 80, 440, 240], [180, 430, 440, 240]]
+
+
+def page_result(image, texts):
+    height, width = image.shape[:2]
+    return {'name': 'p.png', 'size': [width, height], 'channels': 3,
+            'bubbles': BUBBLES, 'texts': list(texts), 'translations': ['..'] * len(texts)}
+
+
+@pytest.fixture
+def phash():
+    return ImageProcessor('contour').compute_perceptual_hash
+
+
+@pytest.mark.unit
+def test_same_layout_different_dialogue_is_not_reused(phash):
+    """صفحتان بنفس البصمة تقريباً وحوار مختلف لا تتشاركان النتائج"""
+    first = draw_page(texts=('HELLO', 'WORLD'))
+    second = draw_page(texts=('GOOD', 'NIGHT'))
+    index = PageIndex(max_distance=8)
+    index.add(phash(first), page_result(first, ('HELLO', 'WORLD')), first)
+
+    # البصمة وحدها تعتبرهما متطابقتين
+    assert index.find(phash(second)) is not None
+    assert index.find(phash(second), image=second) is None
+
+
+@pytest.mark.unit
+def test_reencoded_duplicate_is_reused(phash):
+    """نسخة JPEG من نفس الصفحة تُعاد نتائجها"""
+    page = draw_page()
+    ok, data = cv2.imencode('.jpg', page, [cv2.IMWRITE_JPEG_QUALITY, 70])
+    copy = cv2.imdecode(data, cv2.IMREAD_COLOR)
+    index = PageIndex()
+    index.add(phash(page), page_result(page, ('HELLO', 'WORLD')), page)
+
+    result = index.find(phash(copy), image=copy)
+
+    assert result is not None
+    assert result['texts'] == ['HELLO', 'WORLD']
+
+
+@pytest.mark.unit
+def test_resized_duplicate_rescales_bubbles(phash):
+    page = draw_page()
+    small = cv2.resize(page, (400, 550), interpolation=cv2.INTER_AREA)
+    index = PageIndex()
+    index.add(phash(page), page_result(page, ('HELLO', 'WORLD')), page)
+
+    result = index.find(phash(small), image=small)
+
+    assert result is not None
+    assert result['size'] == [400, 550]
+    assert result['bubbles'][0] == [90, 40, 220, 120]
+
+
+@pytest.mark.unit
+def test_entries_without_signatures_are_not_reused_when_verifying(phash):
+    page = draw_page()
+    index = PageIndex()
+    index.add(phash(page), page_result(page, ('HELLO', 'WORLD')))
+
+    assert index.find(phash(page), image=page) is None
+    assert index.find(phash(page)) is not None
+
+
+@pytest.mark.unit
+def test_index_persists_signatures(tmp_path, phash):
+    page = draw_page()
+    path = tmp_path / 'index.jsonl'
+    PageIndex(str(path)).add(phash(page), page_result(page, ('HELLO', 'WORLD')), page)
+
+    reloaded = PageIndex(str(path))
+
+    assert len(reloaded) == 1
+    assert reloaded.find(phash(page), image=page)['texts'] == ['HELLO', 'WORLD']
+
+
+@pytest.mark.unit
+def test_blank_page_does_not_match_page_with_text(phash):
+    page = draw_page()
+    blank = np.full_like(page, 110)
+    index = PageIndex(max_distance=64)
+    index.add(phash(page), page_result(page, ('HELLO', 'WORLD')), page)
+
+    assert index.find(phash(blank), image=blank) is None
@@ -0,0 +1,128 @@
+"""
+اختبارات قراءة صفحات PDF
+Tests for PdfPageSource
+"""
+
+import shutil
+
+import numpy as np
+import pytest
+from PIL import Image
+
+pytest.importorskip('PyPDF2')
+from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2.generic import ArrayObject, DecodedStreamObject, NameObject, NumberObject
+
+from src.pdf_source import PdfPageSource, parse_page_range
+
+
+def image_pdf(path, mode='RGB', size=(200, 300)):
+    """ملف PDF بصفحة واحدة هي صورة JPEG تغطيها (كما يكتبه Pillow)"""
+    rng = np.random.default_rng(0)
+    channels = {'RGB': 3, 'L': 1, 'CMYK': 4}[mode]
+    pixels = rng.integers(0, 255, (size[1], size[0], channels), dtype=np.uint8)
+    Image.fromarray(pixels.squeeze(), mode).save(path)
+    return path
+
+
+def edit_pdf(source, target, edit):
+    """نسخة من الملف بعد تعديل صفحته الأولى"""
+    writer = PdfWriter()
+    writer.add_page(PdfReader(str(source)).pages[0])
+    page = writer.pages[0]
+    edit(writer, page, page['/Resources']['/XObject']['/image'].get_object())
+    with open(target, 'wb') as f:
+        writer.write(f)
+    return target
+
+
+def set_contents(writer, page, data):
+    stream = DecodedStreamObject()
+    stream.set_data(data)
+    page[NameObject('/Contents')] = writer._add_object(stream)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('spec, expected', [
+    (None, [1, 2, 3, 4, 5]),
+    ('2-3,5', [2, 3, 5]),
+    ('4-', [4, 5]),
+    ('-2,2,9', [1, 2]),
+    ([3, 1, 3], [3, 1]),
+])
+def test_parse_page_range(spec, expected):
+    assert parse_page_range(spec, 5) == expected
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('mode', ['RGB', 'L'])
+def test_plain_jpeg_page_is_passed_through(tmp_path, mode):
+    pdf = image_pdf(tmp_path / 'scan.pdf', mode)
+
+    page = PdfPageSource(str(pdf)).embedded_image(1)
+
+    assert page is not None and page.is_embedded
+    assert page.name == 'scan_0001.jpg'
+    assert page.data[:2] == b'\xff\xd8'
+
+
+@pytest.mark.unit
+def test_adobe_cmyk_page_is_rasterized(tmp_path):
+    pdf = image_pdf(tmp_path / 'cmyk.pdf', 'CMYK')
+    assert PdfPageSource(str(pdf)).embedded_image(1) is None
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('edit', [
+    # قناع شفافية
+    lambda writer, page, image: image.__setitem__(NameObject('/SMask'), image.indirect_reference),
+    # عكس القيم
+    lambda writer, page, image: image.__setitem__(
+        NameObject('/Decode'), ArrayObject([NumberObject(1), NumberObject(0)] * 3)),
+    # نص فوق الصورة
+    lambda writer, page, image: set_contents(
+        writer, page, b'q 200 0 0 300 0 0 cm /image Do Q BT /F1 12 Tf 10 10 Td (x) Tj ET'),
+    # رسم فوق الصورة
+    lambda writer, page, image: set_contents(
+        writer, page, b'q 200 0 0 300 0 0 cm /image Do Q 0 0 50 50 re f'),
+    # الصورة تغطي ربع الصفحة فقط
+    lambda writer, page, image: set_contents(writer, page, b'q 100 0 0 150 0 0 cm /image Do Q'),
+    # الصفحة مدورة
+    lambda writer, page, image: page.__setitem__(NameObject('/Rotate'), NumberObject(90)),
+], ids=['smask', 'decode', 'text', 'overlay', 'partial', 'rotated'])
+def test_composited_pages_are_rasterized(tmp_path, edit):
+    source = image_pdf(tmp_path / 'scan.pdf')
+    pdf = edit_pdf(source, tmp_path / 'edited.pdf', edit)
+
+    assert PdfPageSource(str(pdf)).embedded_image(1) is None
+
+
+@pytest.mark.unit
+def test_iteration_yields_embedded_pages_in_order(tmp_path):
+    writer = PdfWriter()
+    for i, mode in enumerate(['RGB', 'L', 'RGB']):
+        writer.add_page(PdfReader(str(image_pdf(tmp_path / f'{i}.pdf', mode))).pages[0])
+    with open(tmp_path / 'volume.pdf', 'wb') as f:
+        writer.write(f)
+
+    source = PdfPageSource(str(tmp_path / 'volume.pdf'), pages='1,3', workers=1)
+    pages = list(source)
+
+    assert [page.number for page in pages] == [1, 3]
+    assert source.stats == {'embedded': 2, 'rasterized': 0}
+
+
+@pytest.mark.integration
+@pytest.mark.skipif(shutil.which('pdftoppm') is None, reason='poppler غير مثبت')
+def test_composited_page_is_rasterized_with_poppler(tmp_path):
+    source = image_pdf(tmp_path / 'scan.pdf')
+    pdf = edit_pdf(source, tmp_path / 'edited.pdf', lambda writer, page, image: set_contents(
+        writer, page, b'q 200 0 0 300 0 0 cm /image Do Q 0 0 50 50 re f'))
+
+    source = PdfPageSource(str(pdf), dpi=72, workers=1)
+    pages = list(source)
+
+    assert source.stats == {'embedded': 0, 'rasterized': 1}
+    assert pages[0].image.shape == (300, 200, 3)
+    # المربع الأسود في الزاوية السفلية اليسرى مرسوم فوق الصورة
+    assert pages[0].image[-40:, :40].max() < 10
@@ -0,0 +1,98 @@
+"""
+اختبارات كتابة ملفات PDF
+Tests for StreamingPdfWriter
+"""
+
+import zlib
+
+import cv2
+import numpy as np
+import pytest
+
+from src.pdf_writer import StreamingPdfWriter, parse_jpeg_header
+
+PdfReader = pytest.importorskip('PyPDF2').PdfReader
+
+
+def page_images(pdf_path):
+    """(قاموس الصورة، بياناتها الخام) لكل صفحة"""
+    pages = []
+    for page in PdfReader(str(pdf_path)).pages:
+        xobject = page['/Resources']['/XObject']['/Im0'].get_object()
+        pages.append((xobject, xobject._data))
+    return pages
+
+
+@pytest.mark.unit
+def test_parse_jpeg_header(page_image, gray_page):
+    for image, components in ((page_image, 3), (gray_page, 1)):
+        ok, buffer = cv2.imencode('.jpg', image)
+        width, height, channels, adobe = parse_jpeg_header(buffer.tobytes())
+        assert (width, height, channels) == (image.shape[1], image.shape[0], components)
+        assert not adobe
+
+    with pytest.raises(ValueError):
+        parse_jpeg_header(b'\x89PNG')
+
+
+@pytest.mark.unit
+def test_jpeg_pages_are_embedded_byte_for_byte(tmp_path, page_image):
+    jpeg = tmp_path / '001.jpg'
+    cv2.imwrite(str(jpeg), page_image)
+
+    with StreamingPdfWriter(str(tmp_path / 'out.pdf'), dpi=72) as writer:
+        writer.add_file(str(jpeg))
+
+    reader = PdfReader(str(tmp_path / 'out.pdf'))
+    box = reader.pages[0].mediabox
+    assert (float(box.width), float(box.height)) == (page_image.shape[1], page_image.shape[0])
+    (xobject, data), = page_images(tmp_path / 'out.pdf')
+    assert xobject['/Filter'] == '/DCTDecode'
+    assert data == jpeg.read_bytes()
+
+
+@pytest.mark.unit
+def test_gray_png_is_written_as_device_gray(tmp_path, gray_page):
+    png = tmp_path / '001.png'
+    cv2.imwrite(str(png), gray_page)
+
+    with StreamingPdfWriter(str(tmp_path / 'out.pdf')) as writer:
+        writer.add_file(str(png))
+
+    (xobject, data), = page_images(tmp_path / 'out.pdf')
+    assert xobject['/ColorSpace'] == '/DeviceGray'
+    pixels = np.frombuffer(zlib.decompress(data), np.uint8)
+    assert np.array_equal(pixels.reshape(gray_page.shape), gray_page)
+
+
+@pytest.mark.unit
+def test_color_and_alpha_pngs_are_lossless_rgb(tmp_path, page_image):
+    bgra = cv2.cvtColor(page_image, cv2.COLOR_BGR2BGRA)
+    bgra[:10, :10, 3] = 0
+    cv2.imwrite(str(tmp_path / '1.png'), page_image)
+    cv2.imwrite(str(tmp_path / '2.png'), bgra)
+
+    with StreamingPdfWriter(str(tmp_path / 'out.pdf')) as writer:
+        writer.add_file(str(tmp_path / '1.png'))
+        writer.add_file(str(tmp_path / '2.png'))
+
+    expected = cv2.cvtColor(page_image, cv2.COLOR_BGR2RGB)
+    (first, first_data), (second, second_data) = page_images(tmp_path / 'out.pdf')
+    assert first['/ColorSpace'] == second['/ColorSpace'] == '/DeviceRGB'
+    assert np.array_equal(np.frombuffer(zlib.decompress(first_data), np.uint8)
+                          .reshape(expected.shape), expected)
+
+    composited = np.frombuffer(zlib.decompress(second_data), np.uint8).reshape(expected.shape)
+    assert (composited[:10, :10] == 255).all()
+    assert np.array_equal(composited[10:, 10:], expected[10:, 10:])
+
+
+@pytest.mark.unit
+def test_failed_export_leaves_no_file(tmp_path, page_image):
+    target = tmp_path / 'out.pdf'
+    with pytest.raises(RuntimeError):
+        with StreamingPdfWriter(str(target)) as writer:
+            writer.add_image(page_image)
+            raise RuntimeError('boom')
+
+    assert list(tmp_path.iterdir()) == []
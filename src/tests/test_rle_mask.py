@@ -0,0 +1,92 @@
+"""
+اختبارات الأقنعة المرمزة بطول التشغيل
+Tests for RLEMask
+"""
+
+import pickle
+
+import numpy as np
+import pytest
+
+from src.rle_mask import RLEMask
+
+
+@pytest.fixture
+def random_masks():
+    rng = np.random.default_rng(7)
+    return [(rng.random((40, 60)) > 0.6).astype(np.uint8) * 255 for _ in range(2)]
+
+
+@pytest.mark.unit
+def test_round_trip(random_masks):
+    mask = random_masks[0]
+
+    rle = RLEMask.encode(mask)
+
+    assert np.array_equal(rle.decode(), mask)
+    assert rle.area == np.count_nonzero(mask)
+
+
+@pytest.mark.unit
+def test_round_trip_edge_cases():
+    """قناع فارغ وقناع ممتلئ وتشغيلات عند حواف الصفوف"""
+    empty = np.zeros((5, 7), np.uint8)
+    full = np.full((5, 7), 255, np.uint8)
+
+    assert RLEMask.encode(empty).area == 0
+    assert RLEMask.encode(empty).bbox() == (0, 0, 0, 0)
+    assert np.array_equal(RLEMask.encode(full).decode(), full)
+    assert len(RLEMask.encode(full)) == 5
+
+
+@pytest.mark.unit
+def test_local_mask_placed_in_page():
+    local = np.zeros((4, 6), np.uint8)
+    local[1:3, 2:5] = 1
+
+    rle = RLEMask.encode(local, offset=(10, 20), page_shape=(50, 40))
+
+    assert rle.bbox() == (12, 21, 3, 2)
+    page = rle.decode()
+    assert page.shape == (50, 40)
+    assert np.array_equal(page[20:24, 10:16] > 0, local > 0)
+    assert np.count_nonzero(page) == 6
+
+
+@pytest.mark.unit
+def test_intersection_matches_dense(random_masks):
+    a, b = (RLEMask.encode(mask) for mask in random_masks)
+    dense_a, dense_b = (mask > 0 for mask in random_masks)
+    inter = np.count_nonzero(dense_a & dense_b)
+
+    assert a.intersection_area(b) == inter
+    assert np.array_equal(a.intersect(b).decode() > 0, dense_a & dense_b)
+    assert a.iou(b) == pytest.approx(inter / np.count_nonzero(dense_a | dense_b))
+
+
+@pytest.mark.unit
+def test_to_roi_crops_to_box(random_masks):
+    mask = random_masks[0]
+    rle = RLEMask.encode(mask)
+
+    assert np.array_equal(rle.to_roi((5, 8, 20, 10)), mask[8:18, 5:25])
+
+
+@pytest.mark.unit
+def test_resize_scales_into_new_box():
+    local = np.full((10, 10), 255, np.uint8)
+    rle = RLEMask.encode(local, offset=(0, 0), page_shape=(20, 20))
+
+    resized = rle.resize((4, 6, 20, 10), (40, 40))
+
+    assert resized.bbox() == (4, 6, 20, 10)
+    assert resized.area == 200
+
+
+@pytest.mark.unit
+def test_pickle_round_trip(random_masks):
+    rle = RLEMask.encode(random_masks[1])
+
+    restored = pickle.loads(pickle.dumps(rle))
+
+    assert np.array_equal(restored.decode(), rle.decode())
@@ -0,0 +1,82 @@
+"""
+اختبارات مسح النص الأصلي
+Tests for TextEraser
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from src.data_model import Bubble, Page, TextItem
+from src.rle_mask import RLEMask
+from src.text_eraser import TextEraser
+
+# صندوق الفقاعة الأولى في صفحة الاختبار (قطع ناقص حول (400, 200) بأنصاف أقطار 220x120)
+BOX = (180, 80, 441, 241)
+TEXT_AREA = (slice(160, 230), slice(270, 530))
+
+
+def page_with(bubble: Bubble) -> Page:
+    page = Page('p', 800, 1100, 3)
+    page.bubbles = [bubble]
+    return page
+
+
+def dark_pixels(image, area=TEXT_AREA) -> int:
+    return int((image[area].min(axis=-1) < 100).sum())
+
+
+@pytest.mark.unit
+def test_bubble_without_mask_or_items_is_erased(page_image):
+    """فقاعة من الفهرس (بدون قناع ولا مضلعات) يُمسح نصها"""
+    assert dark_pixels(page_image) > 500
+
+    erased = TextEraser().erase_page(page_image.copy(), page_with(Bubble(*BOX, text='HELLO')))
+
+    assert dark_pixels(erased) == 0
+
+
+@pytest.mark.unit
+def test_box_fallback_keeps_bubble_outline(page_image):
+    """إطار الفقاعة والرسم المحيط لا يُعتبران نصاً"""
+    original = page_image.copy()
+    erased = TextEraser().erase_page(page_image, page_with(Bubble(*BOX, text='HELLO')))
+
+    outside = np.ones(original.shape[:2], dtype=bool)
+    outside[TEXT_AREA] = False
+    assert np.array_equal(erased[outside], original[outside])
+
+
+@pytest.mark.unit
+def test_mask_from_ocr_polygons(page_image):
+    item = TextItem('HELLO', 0.9, np.array([[275, 165], [525, 165], [525, 225], [275, 225]]))
+    eraser = TextEraser()
+
+    mask = eraser.build_mask(page_image, Bubble(*BOX, items=[item], text='HELLO'))
+
+    x, y = BOX[:2]
+    assert mask[200 - y, 400 - x] == 255
+    assert mask[5, 5] == 0
+
+
+@pytest.mark.unit
+def test_mask_from_bubble_mask(page_image):
+    x, y, w, h = BOX
+    ellipse = np.zeros((h, w), np.uint8)
+    cv2.ellipse(ellipse, (220, 120), (216, 116), 0, 0, 360, 255, -1)
+    bubble = Bubble(*BOX, mask=RLEMask.encode(ellipse, (x, y), page_image.shape[:2]),
+                    text='HELLO')
+
+    erased = TextEraser().erase_page(page_image, page_with(bubble))
+
+    assert dark_pixels(erased) == 0
+
+
+@pytest.mark.unit
+def test_blank_bubble_is_skipped():
+    image = np.full((300, 500, 3), 255, np.uint8)
+    eraser = TextEraser()
+
+    eraser.erase_page(image, page_with(Bubble(50, 50, 300, 200, text='x')))
+
+    assert eraser.get_stats()['skipped'] == 1
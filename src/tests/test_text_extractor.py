@@ -0,0 +1,91 @@
+"""
+اختبارات استخراج النصوص
+Tests for TextExtractor
+"""
+
+import numpy as np
+import pytest
+
+from src.crop_arena import CropArena
+from src.data_model import Bubble, Page
+from src.text_extractor import TextExtractor
+
+
+class FakeOCR:
+    """بديل PaddleOCR: سطر واحد في منتصف كل قصاصة ويسجل أبعاد المدخلات"""
+
+    def __init__(self, arena):
+        self.arena = arena
+        self.shapes = []
+
+    def ocr(self, image, cls=True):
+        top = sum(shape[0] for shape in self.shapes)
+        self.shapes.append(image.shape)
+        lines = []
+        for entry in self.arena.get_offsets():
+            cx = entry['arena_x'] + entry['w'] / 2
+            cy = entry['arena_y'] + entry['h'] / 2 - top
+            if 0 <= cy < image.shape[0]:
+                box = [[cx - 5, cy - 5], [cx + 5, cy - 5], [cx + 5, cy + 5], [cx - 5, cy + 5]]
+                lines.append([box, (f"bubble {entry['bubble']}", 0.9)])
+        return [lines]
+
+
+@pytest.mark.unit
+def test_arena_ocr_maps_lines_back_to_bubbles():
+    page = np.full((2000, 2000), 255, np.uint8)
+    bubbles = [Bubble(0, i * 60, 400, 120) for i in range(30)]
+    doc = Page('p', 2000, 2000, 1)
+    doc.bubbles = bubbles
+    arena = CropArena(width=512, height=256)
+    extractor = TextExtractor()
+    extractor.det_limit_side_len = 600
+    extractor.ocr = FakeOCR(arena)
+
+    extractor.extract_page_text(doc, page, arena)
+
+    assert all(shape[0] <= 600 for shape in extractor.ocr.shapes)
+    assert len(extractor.ocr.shapes) > 1
+    for i, bubble in enumerate(doc.bubbles):
+        assert bubble.text == f"bubble {i}"
+        cx, cy = np.asarray(bubble.items[0].bbox).mean(axis=0)
+        assert (cx, cy) == (200.0, i * 60 + 60.0)
+
+
+class MergingOCR:
+    """بديل PaddleOCR يدمج سطري أول قصاصتين في المخزن ويقرأ القصاصة المنفردة صحيحاً"""
+
+    def __init__(self, arena):
+        self.arena = arena
+        self.calls = 0
+
+    def ocr(self, image, cls=True):
+        self.calls += 1
+        table = self.arena.get_offsets()
+        if image.shape[0] > max(table['h']):
+            first, second = table[0], table[1]
+            y = first['arena_y'] + first['h'] / 2
+            box = [[first['arena_x'] + 10, y - 5], [second['arena_x'] + 50, y - 5],
+                   [second['arena_x'] + 50, y + 5], [first['arena_x'] + 10, y + 5]]
+            return [[[box, ('one two', 0.9)]]]
+        # القصاصة المنفردة: عرضها يحدد رقمها
+        bubble = int(np.flatnonzero(table['w'] == image.shape[1])[0])
+        box = [[10, 10], [60, 10], [60, 30], [10, 30]]
+        return [[[box, (f'bubble {bubble}', 0.9)]]]
+
+
+@pytest.mark.unit
+def test_line_spanning_two_crops_is_split():
+    """السطر المدمج عبر قصاصتين يُستبدل بقراءة كل قصاصة منفردة"""
+    page = np.full((600, 800), 255, np.uint8)
+    doc = Page('p', 800, 600, 1)
+    doc.bubbles = [Bubble(0, 0, 200, 80), Bubble(300, 0, 240, 80), Bubble(0, 300, 280, 80)]
+    arena = CropArena(width=1024, height=256)
+    extractor = TextExtractor()
+    extractor.ocr = MergingOCR(arena)
+
+    extractor.extract_page_text(doc, page, arena)
+
+    assert [b.text for b in doc.bubbles] == ['bubble 0', 'bubble 1', '']
+    assert extractor.ocr.calls == 3
+    assert np.asarray(doc.bubbles[1].items[0].bbox).min(axis=0).tolist() == [310.0, 10.0]
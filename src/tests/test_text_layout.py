@@ -0,0 +1,72 @@
+"""
+اختبارات قياس النصوص وتقسيمها
+Tests for the text measurement cache and layout fitting
+"""
+
+import cv2
+import pytest
+
+from src.text_layout import HersheyMetrics, TextMeasureCache, fit_font_size, layout_fits
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+LINES = ['hello', 'hello world', 'the quick brown fox jumps', 'a  b', 'WWW iii 123']
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('scale,thickness', [(0.5, 1), (0.8, 2), (1.6, 3)])
+@pytest.mark.parametrize('line', LINES)
+def test_line_width_matches_get_text_size(line, scale, thickness):
+    """العرض المجمع من الكلمات يساوي قياس السطر كاملاً"""
+    cache = TextMeasureCache()
+    normalized = ' '.join(line.split())
+
+    expected = cv2.getTextSize(normalized, FONT, scale, thickness)[0][0]
+
+    assert cache.line_width(normalized, FONT, scale, thickness) == expected
+
+
+@pytest.mark.unit
+def test_wrapped_lines_fit_width():
+    cache = TextMeasureCache()
+    text = 'the quick brown fox jumps over the lazy dog ' * 3
+
+    lines = cache.wrap(text, 200, FONT, 0.8, 2)
+
+    assert ' '.join(lines).split() == text.split()
+    assert all(cv2.getTextSize(line, FONT, 0.8, 2)[0][0] <= 200
+               for line in lines if ' ' in line)
+
+
+@pytest.mark.unit
+def test_measurements_are_cached():
+    cache = TextMeasureCache()
+    cache.line_width('hello world', FONT, 0.8, 2)
+    misses = cache.misses
+
+    cache.line_width('world hello', FONT, 0.8, 2)
+
+    assert cache.misses == misses
+    assert cache.hits > 0
+
+
+@pytest.mark.unit
+def test_cache_is_bounded():
+    cache = TextMeasureCache(max_entries=3)
+    for token in 'abcdef':
+        cache.width(token, FONT, 0.8, 2)
+
+    assert len(cache) == 3
+
+
+@pytest.mark.unit
+def test_fit_font_size_picks_largest_fitting_size():
+    metrics = HersheyMetrics(TextMeasureCache(), FONT, 2)
+    sizes = list(range(8, 61, 2))
+    text = 'the quick brown fox jumps over the lazy dog'
+
+    size, lines = fit_font_size(text, 300, 150, metrics, sizes)
+
+    assert layout_fits(lines, size, 300, 150, metrics)
+    if size != sizes[-1]:
+        bigger = sizes[sizes.index(size) + 1]
+        assert not layout_fits(metrics.wrap(text, 300, bigger), bigger, 300, 150, metrics)
@@ -0,0 +1,81 @@
+"""
+اختبارات تركيب نصوص الصفحة
+Tests for TextRenderer page composition
+"""
+
+import numpy as np
+import pytest
+
+from src.data_model import Bubble, Page, TextStyle
+from src.text_renderer import TextRenderer
+
+
+@pytest.fixture
+def renderer():
+    return TextRenderer(None)
+
+
+@pytest.fixture
+def page(page_image):
+    """صفحة الاختبار مع ترجمة لكل فقاعة"""
+    page = Page.from_image('page', page_image)
+    page.bubbles = [Bubble(180, 80, 440, 240, text='HELLO', translation='HI THERE'),
+                    Bubble(180, 430, 440, 240, text='WORLD', translation='GOOD DAY'),
+                    Bubble(20, 900, 100, 100)]
+    return page
+
+
+def outside_boxes(shape, bubbles) -> np.ndarray:
+    outside = np.ones(shape[:2], dtype=bool)
+    for x, y, w, h in bubbles:
+        outside[y:y+h, x:x+w] = False
+    return outside
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('style', [None, TextStyle(background=(255, 255, 255))])
+def test_pixels_outside_bubbles_are_untouched(renderer, page, page_image, style):
+    original = page_image.copy()
+
+    result = renderer.render_page(page_image, page, style)
+
+    outside = outside_boxes(result.shape, page.bubbles)
+    assert result.tobytes() != original.tobytes()
+    assert result[outside].tobytes() == original[outside].tobytes()
+
+
+@pytest.mark.unit
+def test_gray_page_outside_bubbles_is_untouched(renderer, page, gray_page):
+    original = gray_page.copy()
+
+    result = renderer.render_page(gray_page, page)
+
+    assert result.ndim == 2
+    outside = outside_boxes(result.shape, page.bubbles)
+    assert result[outside].tobytes() == original[outside].tobytes()
+
+
+@pytest.mark.unit
+def test_duplicate_jobs_blend_once(renderer):
+    job = ((20, 20, 240, 100), 'HELLO WORLD', None)
+
+    once = renderer.compose_page(np.full((140, 280, 3), 255, np.uint8), [job])
+    twice = renderer.compose_page(np.full((140, 280, 3), 255, np.uint8), [job, job])
+
+    assert np.array_equal(once, twice)
+
+
+@pytest.mark.unit
+def test_overlapping_jobs_blend_each_pixel_once(renderer):
+    """البكسل المغطى بنصين متداخلين لا يصبح أغمق من رسم أي منهما منفرداً"""
+    first = ((20, 20, 240, 100), 'HELLO WORLD', None)
+    second = ((26, 22, 240, 100), 'HELLO WORLD', None)
+
+    def render(jobs):
+        return renderer.compose_page(np.full((140, 300), 255, np.uint8), jobs)
+
+    both = render([first, second])
+    darkest = np.minimum(render([first]), render([second]))
+
+    assert (both < 255).sum() > (darkest < 255).sum() * 0.9
+    assert np.all(both >= darkest)